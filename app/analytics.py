@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+from cachetools import LRUCache
+
+
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "256"))
+
+# A mérések írás után nem változnak, ezért az eredmények mérés-azonosítónként
+# (és paraméterenként) memoizálhatók; törléskor az invalidate() üríti őket.
+_results = LRUCache(maxsize=ANALYTICS_CACHE_SIZE)
+
+
+def cached(measurement_id, kind, *params):
+    return _results.get((measurement_id, kind, *params))
+
+
+def remember(measurement_id, kind, *params, value):
+    _results[(measurement_id, kind, *params)] = value
+    return value
+
+
+def invalidate(measurement_id=None):
+    if measurement_id is None:
+        _results.clear()
+        return
+    for key in [key for key in _results if key[0] == measurement_id]:
+        _results.pop(key, None)
+
+
+def _value(v):
+    # A JSON nem ismeri a NaN-t; a nem értelmezhető értékek None-ként mennek ki.
+    return float(v) if np.isfinite(v) else None
+
+
+def point_stats(xy):
+    n = len(xy)
+    if n == 0:
+        return {"count": 0, "bbox": None, "centroid": None, "std": None, "regression": None}
+
+    x, y = xy[:, 0], xy[:, 1]
+    mean = xy.mean(axis=0)
+    # Középre igazított összegek: nagy abszolút értékeknél is pontos.
+    dx, dy = x - mean[0], y - mean[1]
+    sxx, syy, sxy = dx @ dx, dy @ dy, dx @ dy
+    lo, hi = xy.min(axis=0), xy.max(axis=0)
+
+    slope = sxy / sxx if sxx > 0 else np.nan
+    r = sxy / np.sqrt(sxx * syy) if sxx > 0 and syy > 0 else np.nan
+    return {
+        "count": n,
+        "bbox": {"x_min": float(lo[0]), "x_max": float(hi[0]), "y_min": float(lo[1]), "y_max": float(hi[1])},
+        "centroid": {"x": float(mean[0]), "y": float(mean[1])},
+        "std": {"x": float(np.sqrt(sxx / n)), "y": float(np.sqrt(syy / n))},
+        "regression": {"slope": _value(slope), "intercept": _value(mean[1] - slope * mean[0]), "r": _value(r)},
+    }
+
+
+def histogram2d(xy, bins_x, bins_y, x_range=(None, None), y_range=(None, None)):
+    # A hiányzó tartományvégek az adatok szélső értékei.
+    if len(xy):
+        lo, hi = xy.min(axis=0), xy.max(axis=0)
+    else:
+        lo, hi = (0.0, 0.0), (1.0, 1.0)
+    x_range = (lo[0] if x_range[0] is None else x_range[0], hi[0] if x_range[1] is None else x_range[1])
+    y_range = (lo[1] if y_range[0] is None else y_range[0], hi[1] if y_range[1] is None else y_range[1])
+
+    counts, x_edges, y_edges = np.histogram2d(xy[:, 0], xy[:, 1], bins=(bins_x, bins_y), range=(x_range, y_range))
+    return {
+        "x_edges": x_edges.tolist(),
+        "y_edges": y_edges.tolist(),
+        "counts": counts.astype(np.int64).tolist(),
+    }
@@ -0,0 +1,67 @@
+import asyncio
+import hashlib
+import time
+from datetime import datetime
+
+import httpx
+
+from . import crud, metrics
+from .soup import SCRAPER_BASE_URL, BookScraper, page_url
+
+
+async def sync_books(session, max_pages=2, base_url=SCRAPER_BASE_URL, scraper=None):
+    # Az oldalak párhuzamosan töltődnek le (a tárolt ETag/Last-Modified
+    # feltételes GET-tel), az adatbázis-írás sorban, egy tranzakcióban történik.
+    # A 304-es vagy változatlan kivonatú oldalak feldolgozása kimarad.
+    urls = [page_url(base_url, page) for page in range(1, max_pages + 1)]
+    known = await crud.get_scraped_pages(session, urls)
+
+    own_scraper = scraper is None
+    scraper = scraper or BookScraper(base_url=base_url)
+    try:
+        responses = await asyncio.gather(*(_fetch(scraper, url, known.get(url)) for url in urls))
+    finally:
+        if own_scraper:
+            await scraper.aclose()
+
+    stats = {"pages": max_pages, "updated": 0, "unchanged": 0, "failed": 0, "books": 0}
+    for url, response in zip(urls, responses):
+        record = known.get(url)
+        if response is None:
+            stats["failed"] += 1
+            continue
+        if response.status_code == 304:
+            record.scraped_at = datetime.utcnow()
+            stats["unchanged"] += 1
+            continue
+
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        if record is not None and record.content_hash == content_hash:
+            book_count = record.book_count
+            stats["unchanged"] += 1
+        else:
+            start = time.perf_counter()
+            books = scraper.parse(response.text, url)
+            metrics.SCRAPER_PARSE_SECONDS.observe(time.perf_counter() - start, "inline")
+            book_count = await crud.upsert_books(session, books, url)
+            stats["updated"] += 1
+            stats["books"] += book_count
+        await crud.save_scraped_page(
+            session, url, content_hash, response.headers.get("etag"),
+            response.headers.get("last-modified"), book_count
+        )
+
+    await session.commit()
+    return stats
+
+
+async def _fetch(scraper, url, record):
+    headers = {}
+    if record is not None and record.etag:
+        headers["If-None-Match"] = record.etag
+    if record is not None and record.last_modified:
+        headers["If-Modified-Since"] = record.last_modified
+    try:
+        return await scraper.fetch(url, headers)
+    except httpx.HTTPError:
+        return None
@@ -0,0 +1,205 @@
+import os
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # opcionális kódolás
+    zstandard = None
+try:
+    import brotli
+except ImportError:  # opcionális kódolás
+    brotli = None
+
+
+# Ennél kisebb, egy darabban küldött válasz tömörítetlenül megy; a folyam mindig tömörül.
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+# Nagy JSON válaszoknál az 1-es szint töredék idő alatt közel ugyanakkorát tömörít, mint a 6-os.
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "1"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# Már tömörített tartalom, újratömörítése csak CPU-t visz.
+_SKIP_MEDIA_TYPES = ("image/", "video/", "audio/", "application/zip", "application/gzip", "application/x-gzip")
+
+
+class _GzipEncoder:
+    def __init__(self):
+        self._compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data, flush=False):
+        return self._compressor.compress(data) + (self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else b"")
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _ZstdEncoder:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compressobj()
+
+    def compress(self, data, flush=False):
+        return self._compressor.compress(data) + (
+            self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK) if flush else b""
+        )
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data, flush=False):
+        return self._compressor.process(data) + (self._compressor.flush() if flush else b"")
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+# Kódolás -> kódoló; azonos q-értéknél az előrébb álló nyer (gyorsabb és jobb arány).
+ENCODERS = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = _ZstdEncoder
+if brotli is not None:
+    ENCODERS["br"] = _BrotliEncoder
+ENCODERS["gzip"] = _GzipEncoder
+
+
+def compress(body, encoding):
+    encoder = ENCODERS[encoding]()
+    return encoder.compress(body) + encoder.finish()
+
+
+def negotiate(accept_encoding, available=None):
+    # Az Accept-Encoding alapján választott kódolás, vagy None (RFC 9110 12.5.3).
+    available = list(ENCODERS if available is None else available)
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            weights[name] = q
+    best, best_q = None, 0.0
+    for name in available:
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+class CompressionMiddleware:
+    # Tiszta ASGI middleware: a kliens által elfogadott kódolással tömöríti a
+    # legalább minimum_size bájtos válaszokat. Folyamként küldött válasznál
+    # darabonként tömörít és üríti a kódolót, így a darabok azonnal kimennek.
+    def __init__(self, app, minimum_size=COMPRESSION_MIN_BYTES, encodings=None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = list(ENCODERS if encodings is None else encodings)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ",".join(
+            value.decode("latin-1") for key, value in scope["headers"] if key == b"accept-encoding"
+        )
+        encoding = negotiate(accept_encoding, self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponse(self, encoding, send).run(scope, receive)
+
+
+class _CompressedResponse:
+    def __init__(self, middleware, encoding, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start = None
+        self.encoder = None
+        self.passthrough = False
+
+    async def run(self, scope, receive):
+        await self.middleware.app(scope, receive, self.send_wrapper)
+
+    async def send_wrapper(self, message):
+        if self.passthrough:
+            await self.send(message)
+            return
+        if message["type"] == "http.response.start":
+            self.start = message
+            if not _compressible(message):
+                self.passthrough = True
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.encoder is None:
+            if not more_body:
+                if len(body) < self.middleware.minimum_size:
+                    # Kis válasz: érintetlenül, de a Vary jelzi, hogy más kódolás is lehetséges.
+                    await self.send(_with_headers(self.start))
+                else:
+                    # Egy darabban érkezett válasz: a tömörített hossz előre ismert.
+                    body = compress(body, self.encoding)
+                    await self.send(_with_headers(self.start, self.encoding, len(body)))
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            # Folyam: a darabokat nem gyűjti a küszöbig, különben az élő (pl. NDJSON
+            # esemény-) folyam első darabjai csak jóval később érnének a klienshez.
+            self.encoder = ENCODERS[self.encoding]()
+            await self.send(_with_headers(self.start, self.encoding))
+
+        if more_body:
+            chunk = self.encoder.compress(body, flush=True)
+            if chunk:
+                await self.send({"type": "http.response.body", "body": chunk, "more_body": True})
+        else:
+            await self.send({"type": "http.response.body", "body": self.encoder.compress(body) + self.encoder.finish()})
+
+
+def _compressible(start):
+    headers = {key.lower(): value for key, value in start.get("headers", [])}
+    if start["status"] < 200 or start["status"] in (204, 304) or b"content-encoding" in headers:
+        return False
+    media_type = headers.get(b"content-type", b"").decode("latin-1").lower()
+    return not media_type.startswith(_SKIP_MEDIA_TYPES)
+
+
+def _with_headers(start, encoding=None, length=None):
+    # Vary: Accept-Encoding mindig; kódolásnál Content-Encoding, új (vagy folyamnál
+    # elhagyott) Content-Length és gyenge ETag, mert a tömörített bájtok mások.
+    headers = []
+    vary = []
+    for key, value in start.get("headers", []):
+        name = key.lower()
+        if name == b"vary":
+            vary.append(value)
+            continue
+        if encoding is not None:
+            if name == b"content-length":
+                continue
+            if name == b"etag" and not value.startswith(b"W/"):
+                value = b"W/" + value
+        headers.append((key, value))
+    headers.append((b"vary", b", ".join([*vary, b"Accept-Encoding"])))
+    if encoding is not None:
+        headers.append((b"content-encoding", encoding.encode("latin-1")))
+        if length is not None:
+            headers.append((b"content-length", str(length).encode("latin-1")))
+    return {**start, "headers": headers}
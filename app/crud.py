@@ -1,34 +1,468 @@
-from .database import SessionLocal
-from .models import User, Measurement, MeasurementPoint
+import os
+import tempfile
+from datetime import datetime
+from itertools import chain
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import bindparam, delete, or_, select
+
+from .models import Book, User, Measurement, MeasurementPoint, ScrapedPage
+from .points import POINT_DTYPE, pack_points, points_to_array, unpack_points
 from .schemas import MeasurementCreateDTO, UserCreateDTO
+from .spatial import PointGrid, extend_bounds
+
+
+BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", "10000"))
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "50000"))
+# A folyamként érkező pontok eddig a méretig memóriában, fölötte ideiglenes fájlban gyűlnek.
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(16 * 1024 * 1024)))
+# Ennyi mérés azonosítója kerül egy IN (...) listába a több mérést olvasó lekérdezésekben.
+MULTI_GET_BATCH_SIZE = int(os.getenv("MULTI_GET_BATCH_SIZE", "500"))
+
+# Ezeken natív (ON CONFLICT / ON DUPLICATE KEY) upsert fut, máshol lekérdezés + UPDATE/INSERT.
+UPSERT_DIALECTS = ("sqlite", "postgresql", "mysql", "mariadb")
+
+STORAGE_ROWS = "rows"
+STORAGE_BLOB = "blob"
+POINT_STORAGE = os.getenv("POINT_STORAGE", STORAGE_ROWS)
 
 
 async def create_user(session ,data: UserCreateDTO):
     user = User(name=data.name)
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
     return user
 
 
+async def get_user(session, user_id: int):
+    return await session.get(User, user_id)
+
+
 async def add_measurement(session,user_id: int, data: MeasurementCreateDTO):
+    if POINT_STORAGE == STORAGE_BLOB:
+        return await add_measurement_bulk(session, user_id, data)
 
-    m = Measurement(user_id=user_id)
+    xy = points_to_array(data.points)
+    grid = PointGrid.for_points(extend_bounds(xy))
+    m = Measurement(user_id=user_id, storage=STORAGE_ROWS, **grid_columns(grid))
     session.add(m)
-    session.flush()
+    await session.flush()
 
-    for point in data.points:
+    for point, cell in zip(data.points, _cells(grid, xy)):
         mp = MeasurementPoint(
             x=point.x,
             y=point.y,
+            cell=cell,
             measurement_id=m.id
         )
         session.add(mp)
 
-    session.commit()
-    session.refresh(m)
+    await session.commit()
+    # Aszinkron sessionben nincs lusta betöltés, ezért a pontokat itt töltjük be.
+    await session.refresh(m, attribute_names=["points"])
+    return m
+
+
+async def add_measurement_bulk(session, user_id: int, data: MeasurementCreateDTO,
+                               chunk_size: int = BULK_INSERT_CHUNK_SIZE):
+    # A pontok Core executemany-vel (vagy egyetlen blobként) kerülnek be,
+    # ORM objektumok és identity map nélkül; a válaszhoz a hívó a bemeneti
+    # pontokat használja.
+    if POINT_STORAGE == STORAGE_BLOB:
+        m = Measurement(
+            user_id=user_id,
+            storage=STORAGE_BLOB,
+            points_blob=pack_points(points_to_array(data.points))
+        )
+        session.add(m)
+        await session.commit()
+        return m
+
+    xy = points_to_array(data.points)
+    grid = PointGrid.for_points(extend_bounds(xy))
+    m = Measurement(user_id=user_id, storage=STORAGE_ROWS, **grid_columns(grid))
+    session.add(m)
+    await session.flush()
+    measurement_id = m.id
+
+    stmt = MeasurementPoint.__table__.insert()
+    for start in range(0, len(xy), chunk_size):
+        await session.execute(stmt, point_rows(measurement_id, xy[start:start + chunk_size], grid))
+
+    await session.commit()
+    return m
+
+
+async def add_measurement_stream(session, user_id: int, blocks, chunk_size: int = BULK_INSERT_CHUNK_SIZE):
+    # A pontok (n, 2) tömbök folyamaként érkeznek (pl. hálózatról), és olvasás közben
+    # egy ideiglenes fájlba gyűlnek (UPLOAD_SPOOL_BYTES alatt memóriában). Írási
+    # tranzakció csak a folyam végén nyílik, így a lassú kliens nem tartja a zárat,
+    # és hibás bemenetnél semmi sem íródik be.
+    count = 0
+    bounds = None
+    with tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES) as staged:
+        async for xy in blocks:
+            staged.write(pack_points(xy))
+            count += len(xy)
+            bounds = extend_bounds(xy, bounds)
+        staged.seek(0)
+        m = await _insert_measurement(session, user_id, _read_staged(staged, chunk_size), chunk_size, bounds)
+    return m, count
+
+
+def _read_staged(staged, chunk_size):
+    while block := staged.read(chunk_size * POINT_DTYPE.itemsize * 2):
+        yield unpack_points(block)
+
+
+async def add_measurement_array(session, user_id: int, xy, chunk_size: int = BULK_INSERT_CHUNK_SIZE):
+    return await _insert_measurement(session, user_id, [xy], chunk_size, extend_bounds(xy))
+
+
+async def _insert_measurement(session, user_id: int, arrays, chunk_size: int, bounds):
+    # Egyetlen tranzakcióban írja a már teljesen rendelkezésre álló pontokat; a
+    # befoglaló téglalap (bounds) előre ismert, ebből lesz a sorok rács-indexe.
+    # Blob tárolásnál a tömörített (pontonként 16 bájtos) blob egy mezőbe kerül.
+    if POINT_STORAGE == STORAGE_BLOB:
+        m = Measurement(user_id=user_id, storage=STORAGE_BLOB, points_blob=b"".join(map(pack_points, arrays)))
+        session.add(m)
+        await session.commit()
+        return m
+
+    grid = PointGrid.for_points(bounds)
+    m = Measurement(user_id=user_id, storage=STORAGE_ROWS, **grid_columns(grid))
+    session.add(m)
+    await session.flush()
+    measurement_id = m.id
+
+    stmt = MeasurementPoint.__table__.insert()
+    for xy in arrays:
+        for start in range(0, len(xy), chunk_size):
+            await session.execute(stmt, point_rows(measurement_id, xy[start:start + chunk_size], grid))
+
+    await session.commit()
     return m
 
 
+def point_rows(measurement_id, xy, grid=None):
+    # A measurement_points executemany sorai a rácscellával együtt.
+    return [
+        {"measurement_id": measurement_id, "x": x, "y": y, "cell": cell}
+        for (x, y), cell in zip(xy.tolist(), _cells(grid, xy))
+    ]
+
+
+def _cells(grid, xy):
+    return grid.cells(xy).tolist() if grid is not None else [None] * len(xy)
+
+
+def grid_columns(grid):
+    return grid.columns() if grid is not None else {}
+
+
+async def delete_measurement(session, measurement_id: int):
+    measurement = await session.get(Measurement, measurement_id)
+    if measurement is None:
+        return False
+    # A pontsorok Core DELETE-tel mennek, hogy a kaszkád ne töltse be őket ORM objektumként.
+    await session.execute(delete(MeasurementPoint).where(MeasurementPoint.measurement_id == measurement_id))
+    await session.delete(measurement)
+    await session.commit()
+    return True
+
+
+async def delete_user(session, user_id: int):
+    user = await session.get(User, user_id)
+    if user is None:
+        return False
+    measurement_ids = select(Measurement.id).where(Measurement.user_id == user_id).scalar_subquery()
+    await session.execute(delete(MeasurementPoint).where(MeasurementPoint.measurement_id.in_(measurement_ids)))
+    # A mérések az ORM kaszkádján át törlődnek, így a törlési hookok is lefutnak.
+    await session.delete(user)
+    await session.commit()
+    return True
+
+
 async def get_measurement(session,measurement_id: int):
-    return session.query(Measurement).filter_by(id=measurement_id).first()
+    result = await session.execute(select(Measurement).filter_by(id=measurement_id))
+    return result.scalars().first()
+
+
+async def get_points(session, measurement, x_min: Optional[float] = None, x_max: Optional[float] = None,
+                     cursor: Optional[int] = None, offset: int = 0, limit: Optional[int] = None,
+                     with_keys: bool = False):
+    # A pontokat (n, 2) alakú float64 tömbként adja vissza, tárolási módtól függetlenül.
+    # with_keys=True esetén (kulcsok, pontok) párt ad; a kulcs a lapozási kurzor
+    # értéke: sor-tárolásnál a pont id-je, blob-tárolásnál a pont indexe.
+    window = (x_min, x_max, cursor, offset, limit)
+    if measurement.storage == STORAGE_BLOB:
+        xy = unpack_points(await _read_blob(session, measurement.id))
+        if window == _FULL_WINDOW and not with_keys:
+            return xy
+        keys, xy = _blob_window(xy, *window)
+    elif window == _FULL_WINDOW and not with_keys:
+        return _rows_to_array(await session.execute(_point_xy_stmt(measurement.id)))
+    else:
+        rows = _rows_to_array(await session.execute(_point_rows_stmt(measurement.id, *window)), width=3)
+        keys, xy = rows[:, 0].astype(np.int64), rows[:, 1:]
+    return (keys, xy) if with_keys else xy
+
+
+async def iter_point_chunks(session, measurement, chunk_size: Optional[int] = None,
+                            x_min: Optional[float] = None, x_max: Optional[float] = None,
+                            cursor: Optional[int] = None, offset: int = 0, limit: Optional[int] = None):
+    # Legfeljebb chunk_size pontos (k, 2) tömböket ad vissza sorban. Sor-tárolásnál
+    # a lekérdezés csomagonként olvas, blob-tárolásnál a csomagolt blob
+    # másolás nélküli szeleteit adja, így pontonkénti Python objektum nem keletkezik.
+    chunk_size = chunk_size or STREAM_CHUNK_SIZE
+    window = (x_min, x_max, cursor, offset, limit)
+    if measurement.storage == STORAGE_BLOB:
+        xy = await get_points(session, measurement, *window)
+        for start in range(0, len(xy), chunk_size):
+            yield xy[start:start + chunk_size]
+        return
+
+    result = await session.stream(
+        _point_rows_stmt(measurement.id, *window).execution_options(yield_per=chunk_size)
+    )
+    async for rows in result.partitions():
+        yield _rows_to_array(rows, width=3)[:, 1:]
+
+
+async def get_points_in_box(session, measurement, x_min: float, x_max: float, y_min: float, y_max: float):
+    # A téglalapba eső pontok tárolási sorrendben. Sor-tárolásnál a téglalapot
+    # lefedő rácscella-tartományokat a (measurement_id, cell) index szűri; a szélső
+    # cellák túlnyúlhatnak a téglalapon, ezért a pontos feltétel NumPy-ban fut.
+    # Rács nélküli (régi) mérésnél az x-tartományt a (measurement_id, x) index szűri.
+    box = (x_min, x_max, y_min, y_max)
+    if measurement.storage == STORAGE_BLOB:
+        xy = unpack_points(await _read_blob(session, measurement.id))
+        return xy[_in_box(xy, *box)]
+    grid = PointGrid.of(measurement)
+    if grid is None:
+        stmt = _point_xy_stmt(measurement.id).where(
+            MeasurementPoint.x.between(x_min, x_max), MeasurementPoint.y.between(y_min, y_max)
+        )
+        return _rows_to_array(await session.execute(stmt))
+    ranges = grid.ranges(*box)
+    if not ranges:
+        return np.empty((0, 2), dtype=POINT_DTYPE)
+    xy = _rows_to_array(await session.execute(cell_ranges_stmt(measurement.id, ranges)))
+    return xy[_in_box(xy, *box)]
+
+
+def cell_ranges_stmt(measurement_id: int, ranges):
+    # Tartományonként teljes (measurement_id, cell) feltétel, így az SQLite minden
+    # tartományt külön indexkereséssel olvas (MULTI-INDEX OR). Az x-feltétel szándékosan
+    # marad ki: mellette a tervező a (measurement_id, x) indexet is választhatná.
+    return select(MeasurementPoint.x, MeasurementPoint.y).where(or_(*(
+        (MeasurementPoint.measurement_id == measurement_id) & MeasurementPoint.cell.between(lo, hi)
+        for lo, hi in ranges
+    ))).order_by(MeasurementPoint.id)
+
+
+def _in_box(xy, x_min, x_max, y_min, y_max):
+    return (xy[:, 0] >= x_min) & (xy[:, 0] <= x_max) & (xy[:, 1] >= y_min) & (xy[:, 1] <= y_max)
+
+
+def read_point_rows(session, measurement_id: int):
+    # Szinkron Session-höz (migrációk, parancssori eszközök).
+    return _rows_to_array(session.execute(_point_xy_stmt(measurement_id)))
+
+
+async def get_measurements(session, user_id: Optional[int] = None, ids=None,
+                           since: Optional[datetime] = None, until: Optional[datetime] = None,
+                           offset: int = 0, limit: Optional[int] = None):
+    # A (user_id, timestamp) index szolgálja ki a felhasználó szerinti időablakot.
+    stmt = select(Measurement)
+    if user_id is not None:
+        stmt = stmt.where(Measurement.user_id == user_id)
+    if ids is not None:
+        stmt = stmt.where(Measurement.id.in_(ids))
+    if since is not None:
+        stmt = stmt.where(Measurement.timestamp >= since)
+    if until is not None:
+        stmt = stmt.where(Measurement.timestamp < until)
+    stmt = stmt.order_by(Measurement.timestamp, Measurement.id).offset(offset).limit(limit)
+    return (await session.execute(stmt)).scalars().all()
+
+
+async def get_points_many(session, measurements, batch_size: int = MULTI_GET_BATCH_SIZE):
+    # Mérés-azonosító -> (n, 2) tömb, méréscsomagonként egyetlen oszlopos
+    # lekérdezéssel (sor-tárolás) vagy egyetlen blob-lekérdezéssel.
+    points = {m.id: np.empty((0, 2), dtype=POINT_DTYPE) for m in measurements}
+    row_ids = [m.id for m in measurements if m.storage != STORAGE_BLOB]
+    blob_ids = [m.id for m in measurements if m.storage == STORAGE_BLOB]
+
+    for start in range(0, len(row_ids), batch_size):
+        stmt = (
+            select(MeasurementPoint.measurement_id, MeasurementPoint.x, MeasurementPoint.y)
+            .where(MeasurementPoint.measurement_id.in_(row_ids[start:start + batch_size]))
+            .order_by(MeasurementPoint.measurement_id, MeasurementPoint.id)
+        )
+        rows = _rows_to_array(await session.execute(stmt), width=3)
+        # A rendezett measurement_id oszlop váltásainál vágjuk szét a tömböt.
+        boundaries = np.flatnonzero(np.diff(rows[:, 0])) + 1
+        for part in np.split(rows, boundaries):
+            if len(part):
+                points[int(part[0, 0])] = np.ascontiguousarray(part[:, 1:])
+
+    for start in range(0, len(blob_ids), batch_size):
+        result = await session.execute(
+            select(Measurement.id, Measurement.points_blob)
+            .where(Measurement.id.in_(blob_ids[start:start + batch_size]))
+        )
+        for measurement_id, blob in result:
+            points[measurement_id] = unpack_points(blob)
+    return points
+
+
+_FULL_WINDOW = (None, None, None, 0, None)
+
+
+RATING_STARS = {"One": 1, "Two": 2, "Three": 3, "Four": 4, "Five": 5}
+
+
+async def get_scraped_pages(session, urls):
+    result = await session.execute(select(ScrapedPage).where(ScrapedPage.url.in_(urls)))
+    return {page.url: page for page in result.scalars()}
+
+
+async def save_scraped_page(session, url: str, content_hash: str, etag: Optional[str] = None,
+                            last_modified: Optional[str] = None, book_count: int = 0):
+    await session.merge(ScrapedPage(
+        url=url, content_hash=content_hash, etag=etag, last_modified=last_modified,
+        book_count=book_count, scraped_at=datetime.utcnow()
+    ))
+
+
+async def upsert_books(session, books, page_url: str, chunk_size: int = BULK_INSERT_CHUNK_SIZE):
+    # Termék URL szerinti upsert executemany-vel; az URL nélküli sorok kimaradnak.
+    now = datetime.utcnow()
+    rows = [
+        {
+            "url": book["url"], "title": book["title"], "price": book["price"],
+            "stock": book["stock"], "rating": book["rating"],
+            "stars": RATING_STARS.get(book["rating"], 0), "page_url": page_url, "updated_at": now,
+        }
+        for book in books
+        if book.get("url")
+    ]
+    dialect_name = session.bind.dialect.name
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        if dialect_name in UPSERT_DIALECTS:
+            await session.execute(_upsert_stmt(dialect_name, Book.__table__, "url"), chunk)
+        else:
+            await _upsert_generic(session, Book.__table__, "url", chunk)
+    return len(rows)
+
+
+async def query_books(session, min_price: Optional[float] = None, max_price: Optional[float] = None,
+                      min_rating: Optional[int] = None, max_rating: Optional[int] = None,
+                      offset: int = 0, limit: int = 100):
+    stmt = select(Book)
+    if min_price is not None:
+        stmt = stmt.where(Book.price >= min_price)
+    if max_price is not None:
+        stmt = stmt.where(Book.price <= max_price)
+    if min_rating is not None:
+        stmt = stmt.where(Book.stars >= min_rating)
+    if max_rating is not None:
+        stmt = stmt.where(Book.stars <= max_rating)
+    stmt = stmt.order_by(Book.price, Book.id).offset(offset).limit(limit)
+    return (await session.execute(stmt)).scalars().all()
+
+
+def _upsert_stmt(dialect_name, table, key):
+    # Az ütköző kulcsú sor minden más oszlopa felülíródik (UPSERT_DIALECTS).
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.mysql import insert
+
+    stmt = insert(table)
+    columns = _upsert_columns(table, key)
+    if dialect_name in ("mysql", "mariadb"):
+        return stmt.on_duplicate_key_update({name: stmt.inserted[name] for name in columns})
+    return stmt.on_conflict_do_update(index_elements=[key], set_={name: stmt.excluded[name] for name in columns})
+
+
+async def _upsert_generic(session, table, key, rows):
+    # Natív upsert nélküli adatbázison: a meglévő kulcsok lekérdezése után a
+    # meglévő sorok executemany UPDATE-tel frissülnek, az újak beszúródnak. Egy
+    # csomagon belül az azonos kulcsú sorok közül az utolsó nyer, mint a natív úton.
+    rows = list({row[key]: row for row in rows}.values())
+    existing = set((await session.execute(
+        select(table.c[key]).where(table.c[key].in_([row[key] for row in rows]))
+    )).scalars())
+    updates = [{**row, "_key": row[key]} for row in rows if row[key] in existing]
+    inserts = [row for row in rows if row[key] not in existing]
+    if updates:
+        stmt = table.update().where(table.c[key] == bindparam("_key")).values(
+            {name: bindparam(name) for name in _upsert_columns(table, key)}
+        )
+        await session.execute(stmt, updates)
+    if inserts:
+        await session.execute(table.insert(), inserts)
+
+
+def _upsert_columns(table, key):
+    return [c.name for c in table.c if not c.primary_key and c.name != key]
+
+
+async def _read_blob(session, measurement_id: int):
+    result = await session.execute(
+        select(Measurement.points_blob).where(Measurement.id == measurement_id)
+    )
+    return result.scalar_one()
+
+
+def _point_xy_stmt(measurement_id):
+    return (
+        select(MeasurementPoint.x, MeasurementPoint.y)
+        .where(MeasurementPoint.measurement_id == measurement_id)
+        .order_by(MeasurementPoint.id)
+    )
+
+
+def _point_rows_stmt(measurement_id, x_min=None, x_max=None, cursor=None, offset=0, limit=None):
+    # Az x-tartomány szűrését a (measurement_id, x) index szolgálja ki.
+    stmt = select(MeasurementPoint.id, MeasurementPoint.x, MeasurementPoint.y).where(
+        MeasurementPoint.measurement_id == measurement_id
+    )
+    if x_min is not None:
+        stmt = stmt.where(MeasurementPoint.x >= x_min)
+    if x_max is not None:
+        stmt = stmt.where(MeasurementPoint.x <= x_max)
+    if cursor is not None:
+        stmt = stmt.where(MeasurementPoint.id > cursor)
+    stmt = stmt.order_by(MeasurementPoint.id)
+    if offset:
+        stmt = stmt.offset(offset)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def _blob_window(xy, x_min=None, x_max=None, cursor=None, offset=0, limit=None):
+    mask = np.ones(len(xy), dtype=bool)
+    if x_min is not None:
+        mask &= xy[:, 0] >= x_min
+    if x_max is not None:
+        mask &= xy[:, 0] <= x_max
+    if cursor is not None:
+        mask[:cursor + 1] = False
+    keys = np.flatnonzero(mask)
+    keys = keys[offset:None if limit is None else offset + limit]
+    return keys, xy[keys]
+
+
+def _rows_to_array(rows, width: int = 2):
+    # A Row objektumokat laposan, skalárként olvassa be; a NumPy így nem
+    # próbálgatja soronként a tömb-interfészeket.
+    return np.fromiter(chain.from_iterable(rows), dtype=POINT_DTYPE).reshape(-1, width)
@@ -1,5 +1,7 @@
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 import pathlib
 import os
@@ -10,15 +12,143 @@ load_dotenv(env_path)
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///data.db")
 
+# "tuned": az alábbi SQLite pragmák és kapcsolatkészlet-beállítások érvényesek,
+# "default": a SQLAlchemy és a SQLite alapbeállításai (összehasonlításhoz).
+DB_PROFILE = os.getenv("DB_PROFILE", "tuned")
+
+
+def _env_setting(name, default, cast=str):
+    # Üres érték esetén a beállítás kimarad.
+    value = os.getenv(name, default)
+    return cast(value) if value != "" else None
+
+
+def _env_flag(name, default):
+    return os.getenv(name, default).lower() in ("1", "true", "yes", "on")
+
+
+# A busy_timeout kerül előre, hogy a többi pragma is várjon a zárolásokra.
+SQLITE_PRAGMAS = {
+    "busy_timeout": _env_setting("DB_SQLITE_BUSY_TIMEOUT", "5000", int),
+    "journal_mode": _env_setting("DB_SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": _env_setting("DB_SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": _env_setting("DB_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024), int),
+    "cache_size": _env_setting("DB_SQLITE_CACHE_SIZE", "-65536", int),
+}
+
+POOL_OPTIONS = {
+    "pool_size": _env_setting("DB_POOL_SIZE", "5", int),
+    "max_overflow": _env_setting("DB_MAX_OVERFLOW", "10", int),
+    "pool_timeout": _env_setting("DB_POOL_TIMEOUT", "30", int),
+}
+
+# Csak szerveres adatbázisoknál: a megszakadt vagy elavult kapcsolatok kezelése.
+SERVER_POOL_OPTIONS = {
+    "pool_recycle": _env_setting("DB_POOL_RECYCLE", "1800", int),
+    "pool_pre_ping": _env_flag("DB_POOL_PRE_PING", "true"),
+}
+
+# A DATABASE_URL megadható szinkron ("sqlite:///", "postgresql://") vagy
+# aszinkron ("sqlite+aiosqlite:///", "postgresql+asyncpg://") driverrel is;
+# az alkalmazás az aszinkron, a séma- és migrációs eszközök a szinkron párját használják.
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+_SYNC_DRIVERS = {
+    "sqlite+aiosqlite": "sqlite",
+    "postgresql+asyncpg": "postgresql",
+    "mysql+aiomysql": "mysql",
+}
+
+
+def async_url(url):
+    url = make_url(url)
+    return url.set(drivername=_ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+
+def sync_url(url):
+    url = make_url(url)
+    return url.set(drivername=_SYNC_DRIVERS.get(url.drivername, url.drivername))
+
+
+def _is_sqlite(url):
+    return url.get_backend_name() == "sqlite"
+
+
+def _is_memory_sqlite(url):
+    return _is_sqlite(url) and (url.database in (None, "", ":memory:") or "mode=memory" in str(url))
+
+
+def engine_options(url, profile=None, poolclass=None):
+    url = make_url(url)
+    if (profile or DB_PROFILE) != "tuned" or _is_memory_sqlite(url) or poolclass is not None:
+        return {}
+    options = dict(POOL_OPTIONS)
+    if not _is_sqlite(url):
+        options.update(SERVER_POOL_OPTIONS)
+    return {name: value for name, value in options.items() if value is not None}
+
+
+def _sqlite_pragmas():
+    pragmas = {}
+    for name, value in SQLITE_PRAGMAS.items():
+        if value is None:
+            continue
+        if isinstance(value, str) and not value.isalnum():
+            raise ValueError(f"Érvénytelen SQLite pragma érték: {name}={value!r}")
+        pragmas[name] = value
+    return pragmas
+
+
+def install_sqlite_pragmas(sync_engine):
+    pragmas = _sqlite_pragmas()
+
+    @event.listens_for(sync_engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                if name == "journal_mode":
+                    # A naplózási mód a fájlban marad; váltani csak akkor kell
+                    # (kizárólagos zárral), ha eltér.
+                    cursor.execute("PRAGMA journal_mode")
+                    if cursor.fetchone()[0].lower() == str(value).lower():
+                        continue
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def build_engine(url=DATABASE_URL, profile=None, **kwargs):
+    url = sync_url(url)
+    options = engine_options(url, profile, kwargs.get("poolclass"))
+    new_engine = create_engine(url, echo=False, **options, **kwargs)
+    if (profile or DB_PROFILE) == "tuned" and _is_sqlite(url):
+        install_sqlite_pragmas(new_engine)
+    return new_engine
+
+
+def build_async_engine(url=DATABASE_URL, profile=None, **kwargs):
+    url = async_url(url)
+    options = engine_options(url, profile, kwargs.get("poolclass"))
+    new_engine = create_async_engine(url, echo=False, **options, **kwargs)
+    if (profile or DB_PROFILE) == "tuned" and _is_sqlite(url):
+        install_sqlite_pragmas(new_engine.sync_engine)
+    return new_engine
+
+
 class Base(DeclarativeBase):
     pass
 
-engine = create_engine(DATABASE_URL, echo=False)
+engine = build_engine()
 SessionLocal = sessionmaker(bind=engine)
 
-def get_db():
-    db = SessionLocal(bind=engine)
-    try:
+async_engine = build_async_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
@@ -0,0 +1,107 @@
+from typing import Optional
+
+from .points import POINT_DTYPE
+
+
+JSON = "application/json"
+BINARY = "application/octet-stream"
+ARROW = "application/vnd.apache.arrow.stream"
+NDJSON = "application/x-ndjson"
+
+FORMAT_ALIASES = {
+    "json": JSON,
+    "binary": BINARY,
+    "arrow": ARROW,
+    "ndjson": NDJSON,
+}
+
+_MEDIA_TYPES = {
+    JSON: JSON,
+    BINARY: BINARY,
+    ARROW: ARROW,
+    NDJSON: NDJSON,
+    "application/ndjson": NDJSON,
+    "application/*": JSON,
+    "*/*": JSON,
+}
+
+
+def negotiate(accept: Optional[str], format: Optional[str] = None):
+    # A format query paraméter felülírja az Accept fejlécet; None, ha
+    # egyik kért formátum sem támogatott.
+    if format is not None:
+        return FORMAT_ALIASES.get(format.lower())
+    if not accept:
+        return JSON
+
+    candidates = []
+    for position, item in enumerate(accept.split(",")):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            candidates.append((-q, position, media_type.lower()))
+
+    for _, _, media_type in sorted(candidates):
+        if media_type in _MEDIA_TYPES:
+            return _MEDIA_TYPES[media_type]
+    return None
+
+
+async def encode_binary(chunks):
+    # Egymás után következő little-endian float64 (x, y) párok.
+    async for xy in chunks:
+        yield xy.astype(POINT_DTYPE, copy=False).tobytes()
+
+
+async def encode_ndjson(chunks):
+    async for xy in chunks:
+        yield "".join('{"x": %r, "y": %r}\n' % (x, y) for x, y in xy.tolist())
+
+
+class _ChunkSink:
+    # Fájlszerű cél a pyarrow stream íróhoz; a megírt bájtokat a drain() adja ki.
+    def __init__(self):
+        self._parts = []
+        self.closed = False
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+async def encode_arrow(chunks):
+    import pyarrow as pa
+
+    schema = pa.schema([("x", pa.float64()), ("y", pa.float64())])
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, schema)
+    yield sink.drain()
+    async for xy in chunks:
+        writer.write_batch(pa.record_batch([xy[:, 0], xy[:, 1]], schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {
+    BINARY: encode_binary,
+    ARROW: encode_arrow,
+    NDJSON: encode_ndjson,
+}
@@ -0,0 +1,40 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import analytics, spatial
+from .models import Measurement
+from .response_cache import response_cache
+
+# A törölt mérésekhez tartozó gyorsítótár-bejegyzések ürítése. A törölt mérések
+# a flush során gyűlnek (közvetlen törlés vagy a User kaszkádja), a hookok csak
+# sikeres commit után futnak; visszagörgetett törlés nem ürít.
+_hooks = []
+
+
+def on_measurement_deleted(func):
+    _hooks.append(func)
+    return func
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_deleted(session, flush_context):
+    deleted = {obj.id for obj in session.deleted if isinstance(obj, Measurement)}
+    if deleted:
+        session.info.setdefault("deleted_measurements", set()).update(deleted)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_hooks(session):
+    for measurement_id in session.info.pop("deleted_measurements", ()):
+        for hook in _hooks:
+            hook(measurement_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_deleted(session, previous_transaction):
+    session.info.pop("deleted_measurements", None)
+
+
+on_measurement_deleted(response_cache.invalidate)
+on_measurement_deleted(analytics.invalidate)
+on_measurement_deleted(spatial.invalidate)
@@ -0,0 +1,343 @@
+import argparse
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import undefer
+
+from . import crud
+from .database import AsyncSessionLocal, async_engine
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Legfeljebb ennyi várakozó feladat; a többit a beküldés visszautasítja.
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = {SUCCEEDED, FAILED, CANCELLED}
+INTERRUPTED_ERROR = "A feladat a szerver leállása vagy újraindítása miatt nem fejeződött be."
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+
+class JobContext:
+    # A futó feladat ezen keresztül jelent előrehaladást és kér adatbázis-sessiont.
+    def __init__(self, manager, job_id, payload=None):
+        self.manager = manager
+        self.job_id = job_id
+        self.payload = payload
+
+    def session(self):
+        return self.manager.session_factory()
+
+    async def progress(self, done, total=None):
+        await self.manager._update(self.job_id, done=done, total=total)
+
+
+class JobManager:
+    # Folyamaton belüli feladatsor külső bróker nélkül: korlátos várakozási sor,
+    # `workers` párhuzamos munkás, az állapot a jobs táblában. Az azonos
+    # paraméterű, még be nem fejezett feladatok összevonódnak.
+    def __init__(self, session_factory=AsyncSessionLocal, workers=JOB_WORKERS, queue_size=JOB_QUEUE_SIZE):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.queue_size = queue_size
+        self._loop = None
+        self._workers = []
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # Új eseményhurokban (újraindítás, teszt) a sor és a munkások is újak.
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._pending = 0
+        self._changed = asyncio.Condition()
+        self._inflight = {}
+        self._keys = {}
+        self._payloads = {}
+        self._running = {}
+        self._finished = {}
+        # Az első beküldő kérés kontextusát (pl. a kérésenkénti lekérdezés-statisztikát)
+        # a munkások nem örökölhetik, ezért üres kontextusban indulnak.
+        self._workers = [
+            loop.create_task(self._worker(), context=contextvars.Context()) for _ in range(self.workers)
+        ]
+
+    async def shutdown(self):
+        if self._loop is not asyncio.get_running_loop():
+            return
+        # A még várakozó feladatok a sorral együtt elvesznek: "cancelled" lesz az
+        # állapotuk, hogy a lekérdezés és a watch ne várjon rájuk örökké.
+        unfinished = list(self._finished)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        if unfinished:
+            async with self.session_factory() as session:
+                await session.execute(
+                    update(Job)
+                    .where(Job.id.in_(unfinished), Job.status.in_([QUEUED, RUNNING]))
+                    .values(status=CANCELLED, finished_at=datetime.utcnow())
+                )
+                await session.commit()
+            for job_id in unfinished:
+                self._release(job_id)
+            await self._notify()
+        self._loop = None
+        self._workers = []
+
+    async def recover(self):
+        # Induláskor: az előző futás (leállás, összeomlás) után "queued" vagy "running"
+        # állapotban maradt feladatokat már senki nem futtatja, ezért hibásnak jelöli őket.
+        # Több munkásnál csak egyszer, a munkások indulása előtt szabad hívni.
+        async with self.session_factory() as session:
+            result = await session.execute(
+                update(Job)
+                .where(Job.status.in_([QUEUED, RUNNING]))
+                .values(status=FAILED, error=INTERRUPTED_ERROR, finished_at=datetime.utcnow())
+            )
+            await session.commit()
+        if result.rowcount:
+            logger.warning("%d befejezetlen feladat hibásnak jelölve egy korábbi futásból.", result.rowcount)
+        return result.rowcount
+
+    async def submit(self, kind, params, payload=None, dedupe=True):
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Ismeretlen feladattípus: {kind}")
+        self._ensure_started()
+        key = f"{kind}:{json.dumps(params, sort_keys=True)}" if dedupe else None
+        if key in self._inflight:
+            return await self.get(self._inflight[key])
+        if self._pending >= self.queue_size:
+            raise JobQueueFull()
+
+        # A helyfoglalás és az összevonási kulcs még az első await előtt megtörténik.
+        self._pending += 1
+        job_id = uuid.uuid4().hex
+        if key is not None:
+            self._inflight[key] = job_id
+            self._keys[job_id] = key
+        if payload is not None:
+            self._payloads[job_id] = payload
+        self._finished[job_id] = self._loop.create_future()
+
+        job = Job(id=job_id, kind=kind, params=json.dumps(params), status=QUEUED)
+        try:
+            async with self.session_factory() as session:
+                session.add(job)
+                await session.commit()
+        except Exception:
+            self._pending -= 1
+            self._release(job_id)
+            raise
+        self._queue.put_nowait(job_id)
+        return job_to_dict(job, with_result=False)
+
+    async def get(self, job_id, with_result=True):
+        stmt = select(Job).where(Job.id == job_id)
+        if with_result:
+            stmt = stmt.options(undefer(Job.result))
+        async with self.session_factory() as session:
+            job = (await session.execute(stmt)).scalars().first()
+        return job_to_dict(job, with_result) if job is not None else None
+
+    async def cancel(self, job_id):
+        self._ensure_started()
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+            await asyncio.shield(self._finished[job_id])
+            return await self.get(job_id)
+
+        # Várakozó feladat: csak akkor, ha még tényleg nem indult el (akár egy
+        # másik worker folyamatban); a munkás a nem "queued" feladatot kihagyja.
+        async with self.session_factory() as session:
+            await session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == QUEUED)
+                .values(status=CANCELLED, finished_at=datetime.utcnow())
+            )
+            await session.commit()
+        self._release(job_id)
+        await self._notify()
+        return await self.get(job_id)
+
+    async def watch(self, job_id, timeout=1.0):
+        # Állapotváltozáskor (vagy `timeout` másodpercenként, más folyamatok
+        # írásai miatt) új pillanatkép; a befejezett állapot után vége.
+        self._ensure_started()
+        last = None
+        while True:
+            job = await self.get(job_id, with_result=False)
+            if job is None:
+                return
+            if job != last:
+                yield job
+                last = job
+            if job["status"] in FINISHED:
+                return
+            async with self._changed:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            self._pending -= 1
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Váratlan hiba a(z) %s feladat futtatása közben.", job_id)
+            finally:
+                self._release(job_id)
+
+    async def _run(self, job_id):
+        async with self.session_factory() as session:
+            job = await session.get(Job, job_id)
+        if job is None or job.status != QUEUED:
+            return
+
+        await self._update(job_id, status=RUNNING, started_at=datetime.utcnow())
+        context = JobContext(self, job_id, self._payloads.get(job_id))
+        task = asyncio.create_task(JOB_HANDLERS[job.kind](context, **json.loads(job.params)))
+        self._running[job_id] = task
+        try:
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            # Leállításkor a futó feladat is megszakad.
+            task.cancel()
+            await asyncio.wait({task})
+            await self._update(job_id, status=CANCELLED, finished_at=datetime.utcnow())
+            raise
+        finally:
+            self._running.pop(job_id, None)
+
+        if task.cancelled():
+            await self._update(job_id, status=CANCELLED, finished_at=datetime.utcnow())
+        elif task.exception() is not None:
+            logger.error("A(z) %s feladat hibával leállt: %s", job_id, task.exception())
+            await self._update(job_id, status=FAILED, error=str(task.exception()), finished_at=datetime.utcnow())
+        else:
+            await self._update(
+                job_id, status=SUCCEEDED, result=json.dumps(task.result()), finished_at=datetime.utcnow()
+            )
+
+    def _release(self, job_id):
+        key = self._keys.pop(job_id, None)
+        if key is not None and self._inflight.get(key) == job_id:
+            del self._inflight[key]
+        self._payloads.pop(job_id, None)
+        finished = self._finished.pop(job_id, None)
+        if finished is not None and not finished.done():
+            finished.set_result(None)
+
+    async def _update(self, job_id, **values):
+        async with self.session_factory() as session:
+            await session.execute(update(Job).where(Job.id == job_id).values(**values))
+            await session.commit()
+        await self._notify()
+
+    async def _notify(self):
+        async with self._changed:
+            self._changed.notify_all()
+
+
+def job_to_dict(job, with_result=True):
+    data = {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "params": json.loads(job.params),
+        "done": job.done,
+        "total": job.total,
+        "progress": job.done / job.total if job.total else (1.0 if job.status == SUCCEEDED else 0.0),
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if with_result:
+        data["result"] = json.loads(job.result) if job.result else None
+    return data
+
+
+@job_handler("scrape")
+async def run_scrape(context, pages, fetch_workers=None, parse_workers=None):
+    # A scraper modulok csak az első ilyen feladatnál töltődnek be.
+    from .soup import iter_books_toscrape
+    books = []
+    async for page, page_books in iter_books_toscrape(
+        max_pages=pages, fetch_workers=fetch_workers, parse_workers=parse_workers
+    ):
+        books.extend(page_books)
+        await context.progress(page, pages)
+    return {"count": len(books), "books": books}
+
+
+@job_handler("sync")
+async def run_sync(context, pages):
+    from .book_sync import sync_books
+    async with context.session() as session:
+        stats = await sync_books(session, max_pages=pages)
+    await context.progress(pages, pages)
+    return stats
+
+
+@job_handler("ingest")
+async def run_ingest(context, user_id, points, chunk_size=crud.BULK_INSERT_CHUNK_SIZE):
+    # A pontok (payload) csak memóriában vannak, a jobs táblába csak a darabszám kerül.
+    async with context.session() as session:
+        measurement = await crud.add_measurement_bulk(session, user_id, context.payload, chunk_size)
+    await context.progress(points, points)
+    return {"id": measurement.id, "user_id": user_id, "points": points}
+
+
+job_manager = JobManager()
+
+
+async def recover_jobs():
+    try:
+        return await job_manager.recover()
+    finally:
+        await async_engine.dispose()
+
+
+def main(argv=None):
+    # Többmunkás indításnál kézzel, a munkások előtt: python -m app.jobs recover
+    parser = argparse.ArgumentParser(prog="python -m app.jobs")
+    parser.add_argument("command", choices=["recover"])
+    parser.parse_args(argv)
+    print(f"{asyncio.run(recover_jobs())} befejezetlen feladat hibásnak jelölve.")
+
+
+if __name__ == "__main__":
+    main()
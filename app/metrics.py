@@ -0,0 +1,325 @@
+import collections
+import contextvars
+import logging
+import math
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Egy kérésen belül ennyiszer ismételt, azonos SELECT már N+1 gyanús.
+METRICS_N_PLUS_ONE_THRESHOLD = int(os.getenv("METRICS_N_PLUS_ONE_THRESHOLD", "10"))
+# Lassú kérések mintavételező profilozása: 0 esetén ki van kapcsolva.
+PROFILE_SLOW_REQUEST_MS = float(os.getenv("PROFILE_SLOW_REQUEST_MS") or 0)
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join('%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+                     for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _number(value):
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = collections.defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+        # Címkénként: [kumulálatlan vödörszámok..., összeg, darabszám].
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return series[-1] if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (_number(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, prefix, help, snapshot):
+        # A snapshot() számértékei lekéréskor gauge-ként jelennek meg (pl. gyorsítótár-statisztikák).
+        self._collectors.append((prefix, help, snapshot))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for prefix, help, snapshot in self._collectors:
+            for key, value in snapshot().items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"# HELP {prefix}_{key} {help}")
+                    lines.append(f"# TYPE {prefix}_{key} gauge")
+                    lines.append(f"{prefix}_{key} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "multibead_http_request_duration_seconds", "HTTP kérések ideje útvonalanként (a válasz végéig).",
+    ("method", "route", "status")))
+RESPONSE_BYTES = REGISTRY.register(Histogram(
+    "multibead_http_response_size_bytes", "A válasz törzsének mérete.", ("method", "route"), SIZE_BUCKETS))
+REQUEST_QUERIES = REGISTRY.register(Histogram(
+    "multibead_http_request_db_queries", "Adatbázis-lekérdezések száma kérésenként.", ("route",), COUNT_BUCKETS))
+REQUEST_QUERY_SECONDS = REGISTRY.register(Histogram(
+    "multibead_http_request_db_seconds", "Adatbázisban töltött idő kérésenként.", ("route",)))
+N_PLUS_ONE = REGISTRY.register(Counter(
+    "multibead_n_plus_one_requests_total", "N+1 gyanús kérések (ismételt azonos SELECT).", ("route",)))
+DB_QUERIES = REGISTRY.register(Counter(
+    "multibead_db_queries_total", "Összes adatbázis-lekérdezés (háttérfeladatokkal együtt)."))
+DB_QUERY_SECONDS = REGISTRY.register(Counter(
+    "multibead_db_query_seconds_total", "Adatbázis-lekérdezésekben töltött összes idő."))
+SCRAPER_FETCH_SECONDS = REGISTRY.register(Histogram(
+    "multibead_scraper_fetch_seconds", "Oldalletöltések ideje (próbálkozásonként).", ("status",)))
+SCRAPER_PARSE_SECONDS = REGISTRY.register(Histogram(
+    "multibead_scraper_parse_seconds", "Oldalfeldolgozás ideje (process: folyamatkészlettel együtt).", ("mode",)))
+
+
+class RequestStats:
+    __slots__ = ("queries", "query_seconds", "selects")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.selects = collections.Counter()
+
+    def most_repeated(self):
+        return self.selects.most_common(1)[0] if self.selects else (None, 0)
+
+
+# Az aktuális kérés számlálói; az SQLAlchemy greenletje is ezt a kontextust látja.
+_request_stats = contextvars.ContextVar("multibead_request_stats", default=None)
+
+
+def current_request_stats():
+    return _request_stats.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    DB_QUERIES.inc()
+    DB_QUERY_SECONDS.inc(amount=elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += elapsed
+        # A csomagolt (executemany) írások ismétlése szándékos, nem N+1.
+        if not executemany and statement.lstrip()[:6].upper() == "SELECT":
+            stats.selects[statement] += 1
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    # A hibás lekérdezés after_cursor_execute nélkül ér véget.
+    starts = context.connection.info.get("query_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+class SlowRequestProfiler:
+    # Mintavételező profilozó: amíg van folyamatban lévő kérés, `interval_ms`
+    # időközönként rögzíti a kérést kiszolgáló szál veremét. A `threshold_ms`-nél
+    # lassabb kérések mintái összevont ("collapsed") veremként, flamegraph.pl /
+    # speedscope számára kerülnek a `directory` könyvtárba. Az eseményhurok
+    # közös szálán az egyidejű kérések mintái egymás profiljába is bekerülnek.
+    def __init__(self, threshold_ms=PROFILE_SLOW_REQUEST_MS, interval_ms=PROFILE_INTERVAL_MS, directory=PROFILE_DIR):
+        self.threshold_ms = threshold_ms
+        self.interval = interval_ms / 1000
+        self.directory = directory
+        self._active = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return self.threshold_ms > 0
+
+    def begin(self):
+        if not self.enabled:
+            return None
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._sample, name="slow-request-profiler", daemon=True)
+            self._thread.start()
+        samples = collections.Counter()
+        with self._lock:
+            self._active[id(samples)] = (threading.get_ident(), samples)
+            self._wakeup.set()
+        return samples
+
+    def end(self, samples, elapsed, label):
+        if samples is None:
+            return None
+        with self._lock:
+            self._active.pop(id(samples), None)
+            if not self._active:
+                self._wakeup.clear()
+        if elapsed * 1000 < self.threshold_ms or not samples:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        name = re.sub(r"[^\w.-]+", "_", label).strip("_")
+        path = os.path.join(
+            self.directory, f"{datetime.now():%Y%m%d-%H%M%S-%f}_{name}_{int(elapsed * 1000)}ms.folded"
+        )
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        logger.warning("Lassú kérés (%s, %.0f ms), profil: %s", label, elapsed * 1000, path)
+        return path
+
+    def _sample(self):
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                active = list(self._active.values())
+            stacks = {}
+            for thread_id, samples in active:
+                if thread_id not in stacks:
+                    frame = frames.get(thread_id)
+                    stacks[thread_id] = _collapse(frame) if frame is not None else None
+                if stacks[thread_id]:
+                    samples[stacks[thread_id]] += 1
+
+
+def _collapse(frame):
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+profiler = SlowRequestProfiler()
+
+
+class MetricsMiddleware:
+    # Tiszta ASGI middleware: útvonalsablononkénti késleltetés, válaszméret és
+    # kérésenkénti lekérdezésszám. Folyamként küldött válasznál az utolsó bájtig mér.
+    def __init__(self, app, profiler=profiler, n_plus_one_threshold=METRICS_N_PLUS_ONE_THRESHOLD):
+        self.app = app
+        self.profiler = profiler
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        samples = self.profiler.begin()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            REQUEST_SECONDS.observe(elapsed, method, route, str(status))
+            RESPONSE_BYTES.observe(size, method, route)
+            REQUEST_QUERIES.observe(stats.queries, route)
+            REQUEST_QUERY_SECONDS.observe(stats.query_seconds, route)
+            statement, repeats = stats.most_repeated()
+            if repeats >= self.n_plus_one_threshold:
+                N_PLUS_ONE.inc(route)
+                logger.warning(
+                    "N+1 gyanú: %s %s - ugyanaz a lekérdezés %d-szor futott (%d lekérdezés összesen): %.200s",
+                    method, route, repeats, stats.queries, statement
+                )
+            self.profiler.end(samples, elapsed, f"{method} {route}")
@@ -0,0 +1,179 @@
+import argparse
+
+import numpy as np
+from sqlalchemy import MetaData, bindparam, delete, inspect, select, text, update
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.orm import sessionmaker
+
+from .database import Base, engine
+from .models import Measurement, MeasurementPoint
+from .points import pack_points, unpack_points
+from .spatial import PointGrid, extend_bounds
+from . import crud
+
+
+# Utólag felvett oszlopok táblánként: tárolási mód és rács-index.
+ADDED_COLUMNS = {
+    Measurement.__table__: ("storage", "points_blob", "grid_x_min", "grid_y_min", "grid_x_max", "grid_y_max", "grid_size"),
+    MeasurementPoint.__table__: ("cell",),
+}
+
+
+def ensure_columns(bind=engine):
+    # A create_all nem bővít meglévő táblát, ezért a régi adatbázisokhoz
+    # itt kerülnek fel az utólag felvett oszlopok.
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table, names in ADDED_COLUMNS.items():
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for name in names:
+                if name in existing:
+                    continue
+                column = table.c[name]
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {name} {column.type.compile(bind.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" NOT NULL DEFAULT '{column.server_default.arg}'"
+                conn.execute(text(ddl))
+
+
+def ensure_autoincrement(bind=engine):
+    # SQLite-on az AUTOINCREMENT csak a tábla újraépítésével kapcsolható be
+    # (https://www.sqlite.org/lang_altertable.html, 7. szakasz): új tábla, másolás,
+    # a régi eldobása, átnevezés. Az indexeket utána az ensure_indexes hozza létre.
+    table = Measurement.__table__
+    if bind.dialect.name != "sqlite":
+        return
+    with bind.begin() as conn:
+        ddl = conn.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table.name}
+        ).scalar()
+        if ddl is None or "AUTOINCREMENT" in ddl.upper():
+            return
+        columns = ", ".join(c.name for c in table.columns)
+        # A külön metadata-ba a hivatkozott táblák is kellenek a külső kulcsok miatt.
+        metadata = MetaData()
+        for other in Base.metadata.sorted_tables:
+            if other is not table:
+                other.to_metadata(metadata)
+        staging = table.to_metadata(metadata, name=f"_{table.name}_new")
+        conn.execute(CreateTable(staging))
+        conn.execute(text(f"INSERT INTO {staging.name} ({columns}) SELECT {columns} FROM {table.name}"))
+        conn.execute(text(f"DROP TABLE {table.name}"))
+        conn.execute(text(f"ALTER TABLE {staging.name} RENAME TO {table.name}"))
+
+
+def ensure_indexes(bind=engine):
+    # Meglévő táblákhoz a create_all nem hozza létre az utólag felvett indexeket.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
+
+
+def upgrade_schema(bind=engine):
+    Base.metadata.create_all(bind)
+    ensure_columns(bind)
+    ensure_autoincrement(bind)
+    ensure_indexes(bind)
+
+
+def _measurement_ids(session, storage, measurement_ids=None):
+    stmt = select(Measurement.id).where(Measurement.storage == storage).order_by(Measurement.id)
+    if measurement_ids:
+        stmt = stmt.where(Measurement.id.in_(measurement_ids))
+    return session.execute(stmt).scalars().all()
+
+
+def convert_to_blob(session, measurement_ids=None):
+    converted = 0
+    for measurement_id in _measurement_ids(session, crud.STORAGE_ROWS, measurement_ids):
+        xy = crud.read_point_rows(session, measurement_id)
+        session.execute(
+            update(Measurement)
+            .where(Measurement.id == measurement_id)
+            .values(storage=crud.STORAGE_BLOB, points_blob=pack_points(xy))
+        )
+        session.execute(delete(MeasurementPoint).where(MeasurementPoint.measurement_id == measurement_id))
+        session.commit()
+        converted += 1
+    return converted
+
+
+def convert_to_rows(session, measurement_ids=None, chunk_size=crud.BULK_INSERT_CHUNK_SIZE):
+    converted = 0
+    stmt = MeasurementPoint.__table__.insert()
+    for measurement_id in _measurement_ids(session, crud.STORAGE_BLOB, measurement_ids):
+        blob = session.execute(
+            select(Measurement.points_blob).where(Measurement.id == measurement_id)
+        ).scalar_one()
+        xy = unpack_points(blob)
+        grid = PointGrid.for_points(extend_bounds(xy))
+        for start in range(0, len(xy), chunk_size):
+            session.execute(stmt, crud.point_rows(measurement_id, xy[start:start + chunk_size], grid))
+        session.execute(
+            update(Measurement)
+            .where(Measurement.id == measurement_id)
+            .values(storage=crud.STORAGE_ROWS, points_blob=None, **crud.grid_columns(grid))
+        )
+        session.commit()
+        converted += 1
+    return converted
+
+
+def build_grids(session, measurement_ids=None):
+    # Rács nélküli (régi) sor-tárolású mérések rács-indexének felépítése.
+    built = 0
+    stmt = select(Measurement.id).where(
+        Measurement.storage == crud.STORAGE_ROWS, Measurement.grid_size.is_(None)
+    ).order_by(Measurement.id)
+    if measurement_ids:
+        stmt = stmt.where(Measurement.id.in_(measurement_ids))
+    set_cell = MeasurementPoint.__table__.update().where(
+        MeasurementPoint.id == bindparam("point_id")
+    ).values(cell=bindparam("cell"))
+    for measurement_id in session.execute(stmt).scalars().all():
+        rows = session.execute(
+            select(MeasurementPoint.id, MeasurementPoint.x, MeasurementPoint.y)
+            .where(MeasurementPoint.measurement_id == measurement_id)
+        ).all()
+        xy = np.array([(x, y) for _, x, y in rows], dtype=np.float64).reshape(-1, 2)
+        grid = PointGrid.for_points(extend_bounds(xy))
+        if grid is not None:
+            session.execute(set_cell, [
+                {"point_id": point_id, "cell": cell}
+                for (point_id, _, _), cell in zip(rows, grid.cells(xy).tolist())
+            ])
+            session.execute(
+                update(Measurement).where(Measurement.id == measurement_id).values(**crud.grid_columns(grid))
+            )
+        session.commit()
+        built += 1
+    return built
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.migrations")
+    parser.add_argument("command", choices=["schema", "to-blob", "to-rows", "grid"])
+    parser.add_argument("--ids", type=int, nargs="+", help="csak ezek a mérések (alapértelmezés: mind)")
+    args = parser.parse_args(argv)
+
+    upgrade_schema(engine)
+    if args.command == "schema":
+        return
+
+    session = sessionmaker(bind=engine)()
+    try:
+        if args.command == "to-blob":
+            n = convert_to_blob(session, args.ids)
+        elif args.command == "grid":
+            n = build_grids(session, args.ids)
+        else:
+            n = convert_to_rows(session, args.ids)
+    finally:
+        session.close()
+    print(f"{n} mérés átalakítva ({args.command}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import Integer, String, Float, ForeignKey, DateTime, LargeBinary, Index, Text
 from datetime import datetime
+from typing import Optional
 
 from .database import Base
 
@@ -19,6 +20,13 @@ class User(Base):
 
 class Measurement(Base):
     __tablename__ = "measurements"
+    __table_args__ = (
+        Index("ix_measurements_user_id_timestamp", "user_id", "timestamp"),
+        # SQLite-on a törölt legnagyobb azonosító sem kerül újra kiosztásra: a mérés
+        # azonosítója szerinti gyorsítótárak (válasz, statisztika, KD-fa) így egy
+        # másik folyamatban törölt mérés adatait sem adhatják ki egy újnak.
+        {"sqlite_autoincrement": True},
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -26,19 +34,92 @@ class Measurement(Base):
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
     user: Mapped["User"] = relationship(back_populates="measurements")
 
+    # "rows": egy measurement_points sor pontonként,
+    # "blob": a pontok egyetlen csomagolt <f8 (x, y) tömbként a points_blob oszlopban.
+    storage: Mapped[str] = mapped_column(String(8), default="rows", server_default="rows")
+    points_blob: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True, deferred=True)
+    # Sor-tárolásnál a pontok rács-indexe (app.spatial.PointGrid): a befoglaló
+    # téglalap és a tengelyenkénti cellaszám. Régi méréseknél NULL.
+    grid_x_min: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    grid_y_min: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    grid_x_max: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    grid_y_max: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    grid_size: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
     points: Mapped[list["MeasurementPoint"]] = relationship(
         back_populates="measurement",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        order_by="MeasurementPoint.id"
     )
 
 
 class MeasurementPoint(Base):
     __tablename__ = "measurement_points"
+    __table_args__ = (
+        Index("ix_measurement_points_measurement_id_x", "measurement_id", "x"),
+        Index("ix_measurement_points_measurement_id_cell", "measurement_id", "cell"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
     x: Mapped[float] = mapped_column(Float)
     y: Mapped[float] = mapped_column(Float)
+    # Rácscella a mérés PointGrid-jében; a téglalap-lekérdezés ezen szűr.
+    cell: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
     measurement_id: Mapped[int] = mapped_column(ForeignKey("measurements.id"))
     measurement: Mapped["Measurement"] = relationship(back_populates="points")
+
+
+class Book(Base):
+    __tablename__ = "books"
+    __table_args__ = (
+        Index("ix_books_price", "price"),
+        Index("ix_books_stars_price", "stars", "price"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # A termékoldal URL-je az állandó azonosító, erre történik az upsert.
+    url: Mapped[str] = mapped_column(String(500), unique=True)
+
+    title: Mapped[str] = mapped_column(String(500))
+    price: Mapped[float] = mapped_column(Float)
+    stock: Mapped[str] = mapped_column(String(100))
+    rating: Mapped[str] = mapped_column(String(10))
+    # A rating számként (1-5) a tartományszűréshez.
+    stars: Mapped[int] = mapped_column(Integer)
+
+    page_url: Mapped[str] = mapped_column(String(500))
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class ScrapedPage(Base):
+    __tablename__ = "scraped_pages"
+
+    url: Mapped[str] = mapped_column(String(500), primary_key=True)
+    # A letöltött HTML sha256 kivonata; változatlan oldalt nem dolgozunk fel újra.
+    content_hash: Mapped[str] = mapped_column(String(64))
+    etag: Mapped[Optional[str]] = mapped_column(String(200), nullable=True)
+    last_modified: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    book_count: Mapped[int] = mapped_column(Integer, default=0)
+    scraped_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    # uuid4 hex: több worker folyamat esetén is egyedi, és nem kitalálható.
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(20))
+    params: Mapped[str] = mapped_column(Text, default="{}")
+    # queued, running, succeeded, failed, cancelled
+    status: Mapped[str] = mapped_column(String(10), default="queued", index=True)
+
+    done: Mapped[int] = mapped_column(Integer, default=0)
+    total: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    result: Mapped[Optional[str]] = mapped_column(Text, nullable=True, deferred=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
@@ -0,0 +1,33 @@
+import numpy as np
+
+
+# Egy pont két egymást követő little-endian float64 érték: x, y.
+POINT_DTYPE = np.dtype("<f8")
+
+
+def points_to_array(points):
+    return np.fromiter(
+        ((p.x, p.y) for p in points),
+        dtype=(POINT_DTYPE, 2),
+        count=len(points)
+    ).reshape(-1, 2)
+
+
+def columns_to_array(x, y):
+    xy = np.empty((len(x), 2), dtype=POINT_DTYPE)
+    xy[:, 0] = x
+    xy[:, 1] = y
+    return xy
+
+
+def pack_points(xy):
+    return np.ascontiguousarray(xy, dtype=POINT_DTYPE).tobytes()
+
+
+def unpack_points(blob):
+    # Nulla másolás: a visszaadott tömb a blob puffere fölötti nézet.
+    return np.frombuffer(blob or b"", dtype=POINT_DTYPE).reshape(-1, 2)
+
+
+def points_to_dicts(xy):
+    return [{"x": x, "y": y} for x, y in xy.tolist()]
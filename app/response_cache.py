@@ -0,0 +1,131 @@
+import hashlib
+import os
+
+from cachetools import LRUCache
+
+
+# 0 esetén a gyorsítótár ki van kapcsolva.
+RESPONSE_CACHE_BYTES = int(os.getenv("RESPONSE_CACHE_BYTES", str(64 * 1024 * 1024)))
+# Az ennél nagyobb válaszok nem kerülnek be (egy óriási mérés ne ürítse ki a többit).
+RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", str(8 * 1024 * 1024)))
+
+# Becsült kulcs- és fejlécköltség bejegyzésenként.
+_ENTRY_OVERHEAD = 256
+
+
+class CachedResponse:
+    __slots__ = ("body", "media_type", "headers", "etag")
+
+    def __init__(self, body, media_type, headers, etag=None):
+        self.body = body
+        self.media_type = media_type
+        self.headers = headers
+        self.etag = etag or make_etag(body)
+
+
+def make_etag(body):
+    # Erős ETag: a törzs tartalmának kivonata.
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match, etag):
+    # If-None-Match-nél gyenge összehasonlítás jár (RFC 9110 13.1.2).
+    if not if_none_match:
+        return False
+    candidates = [_opaque_tag(tag.strip()) for tag in if_none_match.split(",")]
+    return "*" in candidates or _opaque_tag(etag) in candidates
+
+
+def _opaque_tag(tag):
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+class ResponseCache:
+    # Szerializált válaszok bájtméret szerint korlátos LRU-ja. A kulcs első
+    # eleme a mérés azonosítója, így egy mérés összes változata együtt törölhető.
+    # A generation minden érvénytelenítéskor nő: a hívó a kiolvasás előtt elkéri,
+    # és ha közben törlés történt, a (már elavult) válasz nem kerül be.
+    def __init__(self, max_bytes=RESPONSE_CACHE_BYTES, max_entry_bytes=RESPONSE_CACHE_MAX_ENTRY_BYTES):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self._entries = LRUCache(maxsize=max(max_bytes, 1), getsizeof=lambda entry: len(entry.body) + _ENTRY_OVERHEAD)
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0, "stores": 0, "invalidations": 0}
+        self.generation = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def get(self, key):
+        entry = self._entries.get(key) if self.enabled else None
+        self.stats["hits" if entry is not None else "misses"] += 1
+        return entry
+
+    def put(self, key, body, media_type, headers=None, generation=None):
+        entry = CachedResponse(body, media_type, headers or {})
+        if self._storable(body, generation):
+            self._entries[key] = entry
+            self.stats["stores"] += 1
+        return entry
+
+    def encoded(self, key, entry, encoding, encode):
+        # A tömörített változat külön bejegyzés, a kulcsa a mérés azonosítójával
+        # kezdődik, így a törlés azt is viszi. Az ETag-je az eredeti gyenge párja.
+        variant_key = (*key, "content-encoding", encoding)
+        variant = self._entries.get(variant_key) if self.enabled else None
+        if variant is None:
+            vary = ", ".join(filter(None, (entry.headers.get("Vary"), "Accept-Encoding")))
+            headers = {**entry.headers, "Vary": vary, "Content-Encoding": encoding}
+            variant = CachedResponse(encode(entry.body, encoding), entry.media_type, headers, etag="W/" + entry.etag)
+            # Csak a gyorsítótárban lévő (nem elavult) eredeti mellé kerül be.
+            if self._storable(variant.body) and self._entries.get(key) is entry:
+                self._entries[variant_key] = variant
+        return variant
+
+    async def tee(self, key, chunks, media_type, headers=None, generation=None):
+        # A folyam változatlanul megy tovább; ha végigfutott, nem túl nagy, és
+        # közben nem volt törlés, az összegyűjtött törzs bekerül a gyorsítótárba.
+        parts = []
+        size = 0
+        async for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            if parts is not None:
+                size += len(chunk)
+                if size <= self.max_entry_bytes:
+                    parts.append(chunk)
+                else:
+                    parts = None
+            yield chunk
+        if parts is not None and self.enabled:
+            self.put(key, b"".join(parts), media_type, headers, generation)
+
+    def _storable(self, body, generation=None):
+        if generation is not None and generation != self.generation:
+            return False
+        return self.enabled and len(body) <= self.max_entry_bytes
+
+    def invalidate(self, measurement_id):
+        self.generation += 1
+        for key in [key for key in self._entries if key[0] == measurement_id]:
+            self._entries.pop(key, None)
+            self.stats["invalidations"] += 1
+
+    def clear(self):
+        self.generation += 1
+        self._entries.clear()
+        for name in self.stats:
+            self.stats[name] = 0
+
+    def snapshot(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._entries.currsize if self.enabled else 0,
+            "max_bytes": self.max_bytes,
+        }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,64 @@
+import numpy as np
+
+
+# Mindkét eljárás a megtartott pontok indexeit adja vissza, eredeti sorrendben.
+
+def lttb(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: az első és utolsó pont mindig megmarad,
+    # a köztes vödrökből az a pont, amelyik az előzőleg kiválasztott ponttal és
+    # a következő vödör átlagával a legnagyobb háromszöget adja.
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    starts, ends = edges[:-1], edges[1:]
+
+    # A következő vödrök átlagai egyszerre, kumulált összegekből.
+    cx = np.concatenate(([0.0], np.cumsum(x, dtype=np.float64)))
+    cy = np.concatenate(([0.0], np.cumsum(y, dtype=np.float64)))
+    next_starts = np.append(ends[:-1], n - 1)
+    next_ends = np.append(ends[1:], n)
+    counts = next_ends - next_starts
+    avg_x = (cx[next_ends] - cx[next_starts]) / counts
+    avg_y = (cy[next_ends] - cy[next_starts]) / counts
+
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = starts[i], ends[i]
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - avg_x[i]) * (by - y[a]) - (x[a] - bx) * (avg_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax(x, y, n_out):
+    # Egyenlő hosszú indexvödrönként a legkisebb és a legnagyobb y-ú pont.
+    n = len(y)
+    n_buckets = n_out // 2
+    if n_out >= n or n_buckets < 1:
+        return np.arange(n)
+
+    size = -(-n // n_buckets)
+    padded = n_buckets * size
+    y_low = np.full(padded, np.inf)
+    y_high = np.full(padded, -np.inf)
+    y_low[:n] = y
+    y_high[:n] = y
+    offsets = np.arange(n_buckets) * size
+    lows = offsets + np.argmin(y_low.reshape(n_buckets, size), axis=1)
+    highs = offsets + np.argmax(y_high.reshape(n_buckets, size), axis=1)
+
+    # Az utolsó vödör rövidebb lehet, így a legutolsó vödrök üresek is lehetnek.
+    selected = np.unique(np.concatenate((lows, highs)))
+    return selected[selected < n]
+
+
+METHODS = {
+    "lttb": lttb,
+    "minmax": minmax,
+}
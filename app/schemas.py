@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from typing import List
 
 
@@ -11,6 +11,19 @@ class MeasurementCreateDTO(BaseModel):
     points: List[MeasurementPointDTO]
 
 
+class MeasurementColumnsDTO(BaseModel):
+    # Oszlopos bemenet: pontonkénti modellek helyett két float lista, amit a
+    # pydantic-core egy menetben ellenőriz.
+    x: List[float]
+    y: List[float]
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        if len(self.x) != len(self.y):
+            raise ValueError("Az x és y listák hossza eltér.")
+        return self
+
+
 class UserCreateDTO(BaseModel):
     name: str
 
@@ -18,3 +31,7 @@ class UserCreateDTO(BaseModel):
 class UserDTO(BaseModel):
     id: int
     name: str
+
+
+class MeasurementBatchGetDTO(BaseModel):
+    ids: List[int]
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import pathlib
+import time
+
+from cachetools import LRUCache
+
+
+SCRAPE_CACHE_TTL = float(os.getenv("SCRAPE_CACHE_TTL", "3600"))
+SCRAPE_CACHE_SIZE = int(os.getenv("SCRAPE_CACHE_SIZE", "256"))
+# Üresen hagyva nincs lemezes tár, csak a memóriabeli LRU.
+SCRAPE_CACHE_DIR = os.getenv("SCRAPE_CACHE_DIR", "")
+
+
+class ScrapeCache:
+    # Oldal URL szerint tárolja a feldolgozott könyveket és a validátorokat
+    # (ETag, Last-Modified). A TTL-en belüli bejegyzés hálózat nélkül szolgálható
+    # ki, a lejártat feltételes GET-tel kell újraellenőrizni.
+    def __init__(self, ttl=SCRAPE_CACHE_TTL, maxsize=SCRAPE_CACHE_SIZE, directory=SCRAPE_CACHE_DIR):
+        self.ttl = ttl
+        self._memory = LRUCache(maxsize=maxsize)
+        self.directory = pathlib.Path(directory) if directory else None
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self.stats = {"hits": 0, "misses": 0, "revalidations": 0, "refreshes": 0}
+
+    def _path(self, url):
+        return self.directory / (hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url):
+        entry = self._memory.get(url)
+        if entry is None and self.directory is not None:
+            try:
+                entry = json.loads(self._path(url).read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                return None
+            self._memory[url] = entry
+        return entry
+
+    def put(self, url, books, etag=None, last_modified=None):
+        entry = {
+            "url": url,
+            "books": books,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+        }
+        self._store(url, entry)
+        return entry
+
+    def touch(self, url, entry):
+        # 304 után a tartalom változatlan, csak a frissesség ideje indul újra.
+        entry = dict(entry, fetched_at=time.time())
+        self._store(url, entry)
+        return entry
+
+    def _store(self, url, entry):
+        self._memory[url] = entry
+        if self.directory is not None:
+            path = self._path(url)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(entry), encoding="utf-8")
+            os.replace(tmp_path, path)
+
+    def is_fresh(self, entry):
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    def validators(self, entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record(self, event):
+        self.stats[event] += 1
+
+    def snapshot(self):
+        return {**self.stats, "size": len(self._memory), "maxsize": self._memory.maxsize, "ttl": self.ttl}
+
+    def clear(self):
+        self._memory.clear()
+        if self.directory is not None:
+            for path in self.directory.glob("*.json"):
+                path.unlink(missing_ok=True)
+        for event in self.stats:
+            self.stats[event] = 0
+
+
+page_cache = ScrapeCache()
@@ -1,46 +1,345 @@
+import asyncio
+import multiprocessing
 import os
 import re
 import pathlib
-import requests
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+import httpx
 from dotenv import load_dotenv
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential
+
+from . import metrics
+from .scrape_cache import page_cache
+
+try:
+    import lxml.html
+except ImportError:  # opcionális gyorsítás
+    lxml = None
 
 env_path = pathlib.Path(__file__).parents[1] / ".env"
 load_dotenv(env_path)
 
 SCRAPER_BASE_URL = os.getenv("SCRAPER_BASE_URL", "http://books.toscrape.com")
+SCRAPER_CONCURRENCY = int(os.getenv("SCRAPER_CONCURRENCY", "5"))
+# Kérés/másodperc hosztonként; 0 esetén nincs korlát.
+SCRAPER_RATE_LIMIT = float(os.getenv("SCRAPER_RATE_LIMIT", "10"))
+SCRAPER_TIMEOUT = float(os.getenv("SCRAPER_TIMEOUT", "10"))
+SCRAPER_RETRIES = int(os.getenv("SCRAPER_RETRIES", "3"))
+SCRAPER_BACKOFF = float(os.getenv("SCRAPER_BACKOFF", "0.5"))
+# Csővezeték mód: a közös feldolgozó folyamatkészlet mérete és a letöltött,
+# még feldolgozatlan oldalak sorának hossza.
+SCRAPER_PARSE_WORKERS = int(os.getenv("SCRAPER_PARSE_WORKERS") or os.cpu_count() or 1)
+SCRAPER_QUEUE_SIZE = int(os.getenv("SCRAPER_QUEUE_SIZE", "8"))
+
+_parse_executor = None
+
+
+def parse_executor():
+    # Egyetlen, az első csővezetékes scrape-nél létrehozott folyamatkészlet, amelyen
+    # az összes kérés és feladat osztozik. "spawn": a szálakat futtató uvicorn
+    # munkásból forkolni nem biztonságos. Leálláskor a lifespan zárja le.
+    global _parse_executor
+    if _parse_executor is None:
+        _parse_executor = ProcessPoolExecutor(
+            max_workers=SCRAPER_PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _parse_executor
+
+
+def shutdown_parse_executor():
+    global _parse_executor
+    if _parse_executor is not None:
+        _parse_executor.shutdown(wait=True, cancel_futures=True)
+        _parse_executor = None
+
+
+def page_url(base_url, page):
+    return f"{base_url}/catalogue/page-{page}.html"
+
+
+PRICE_RE = re.compile(r"[\d\.,]+")
+
+
+def _price(raw_price):
+    price_match = PRICE_RE.search(raw_price)
+    return float(price_match.group(0) if price_match else "0.00")
+
+
+def _product_url(href, base_url):
+    # A termékoldal URL-je a könyv állandó azonosítója (a cím nem egyedi).
+    return urljoin(base_url, href) if base_url and href else href
 
-def scrape_books_toscrape(max_pages=2):
+
+def _parse_books_soup(html, base_url=None, parse_only=None):
+    books = []
+    soup = BeautifulSoup(html, "html.parser", parse_only=parse_only)
+
+    for book in soup.find_all("article", class_="product_pod"):
+        books.append({
+            "url": _product_url(book.h3.a.get("href"), base_url),
+            "title": book.h3.a["title"],
+            "price": _price(book.find("p", class_="price_color").text),
+            "stock": book.find("p", class_="instock availability").text.strip(),
+            "rating": book.find("p", class_="star-rating")["class"][1]
+        })
+
+    return books
+
+
+# Csak az article.product_pod részfák épülnek fel, a lap többi része kimarad.
+# A szűrő még a class felbontása előtt fut, ezért a teljes attribútumot bontjuk szét.
+_PRODUCT_POD = SoupStrainer("article", class_=lambda value: bool(value) and "product_pod" in value.split())
+
+
+def _parse_books_strainer(html, base_url=None):
+    return _parse_books_soup(html, base_url, parse_only=_PRODUCT_POD)
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _parse_books_lxml(html, base_url=None):
     books = []
+    doc = lxml.html.fromstring(html)
+
+    for book in doc.xpath(f"//article[{_has_class('product_pod')}]"):
+        href = book.xpath(".//h3//a/@href")
+        books.append({
+            "url": _product_url(href[0] if href else None, base_url),
+            "title": book.xpath(".//h3//a/@title")[0],
+            "price": _price(book.xpath(f".//p[{_has_class('price_color')}]")[0].text_content()),
+            "stock": book.xpath(".//p[@class='instock availability']")[0].text_content().strip(),
+            "rating": book.xpath(f".//p[{_has_class('star-rating')}]/@class")[0].split()[1]
+        })
+
+    return books
 
-    for page in range(1, max_pages + 1):
-        url = f"{SCRAPER_BASE_URL}/catalogue/page-{page}.html"
-        
+
+PARSERS = {"html.parser": _parse_books_soup, "strainer": _parse_books_strainer}
+if lxml is not None:
+    PARSERS["lxml"] = _parse_books_lxml
+
+# "auto": lxml, ha telepítve van, különben a SoupStrainer-rel szűkített html.parser.
+SCRAPER_PARSER = os.getenv("SCRAPER_PARSER", "auto")
+
+
+def get_parser(name=None):
+    name = name or SCRAPER_PARSER
+    if name == "auto":
+        name = "lxml" if "lxml" in PARSERS else "strainer"
+    if name not in PARSERS:
+        raise ValueError(f"Ismeretlen HTML feldolgozó: {name!r} (elérhető: {', '.join(PARSERS)})")
+    return PARSERS[name]
+
+
+def parse_books(html, parser=None, base_url=None):
+    return get_parser(parser)(html, base_url)
+
+
+class HostRateLimiter:
+    # Hosztonként legfeljebb `rate` kérés másodpercenként: minden hívó a
+    # következő szabad időrést foglalja le, majd kivárja azt.
+    def __init__(self, rate=SCRAPER_RATE_LIMIT):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = {}
+
+    async def wait(self, host):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def _is_retryable(exc):
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+class BookScraper:
+    def __init__(self, base_url=SCRAPER_BASE_URL, concurrency=SCRAPER_CONCURRENCY,
+                 rate_limit=SCRAPER_RATE_LIMIT, timeout=SCRAPER_TIMEOUT, retries=SCRAPER_RETRIES,
+                 backoff=SCRAPER_BACKOFF, client=None, cache=None, parser=None):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.parse = get_parser(parser)
+        self.cache = cache
+        self.retries = retries
+        self.backoff = backoff
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._rate_limiter = HostRateLimiter(rate_limit)
+        self._own_client = client is None
+        self._client = client or httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        if self._own_client:
+            await self._client.aclose()
+
+    async def fetch(self, url, headers=None):
+        host = urlsplit(url).netloc
+        async with self._semaphore:
+            async for attempt in AsyncRetrying(
+                retry=retry_if_exception(_is_retryable),
+                stop=stop_after_attempt(self.retries),
+                wait=wait_exponential(multiplier=self.backoff, max=8),
+                reraise=True,
+            ):
+                with attempt:
+                    await self._rate_limiter.wait(host)
+                    start = time.perf_counter()
+                    try:
+                        response = await self._client.get(url, headers=headers)
+                    except httpx.TransportError:
+                        metrics.SCRAPER_FETCH_SECONDS.observe(time.perf_counter() - start, "error")
+                        raise
+                    metrics.SCRAPER_FETCH_SECONDS.observe(time.perf_counter() - start, str(response.status_code))
+                    if response.status_code != 304:
+                        response.raise_for_status()
+                    return response
+
+    async def fetch_page(self, page):
+        # Gyorsítótárból kiszolgálható oldalnál a könyvek jönnek vissza,
+        # különben a letöltött válasz (a feldolgozás a hívóra marad).
+        url = page_url(self.base_url, page)
+        entry = self.cache.get(url) if self.cache is not None else None
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.record("hits")
+            return url, entry["books"], None
+
+        # A sikertelen oldalak kimaradnak, mint korábban; lejárt bejegyzés
+        # esetén inkább a régi tartalom megy vissza.
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            for book in soup.find_all("article", class_="product_pod"):
-                title = book.h3.a["title"]
-                
-                raw_price = book.find("p", class_="price_color").text
-                price_match = re.search(r'[\d\.,]+', raw_price)
-                price_value = price_match.group(0) if price_match else "0.00"
-                
-                stock = book.find("p", class_="instock availability").text.strip()
-                
-                rating_class = book.find("p", class_="star-rating")["class"]
-                rating = rating_class[1]
-
-                books.append({
-                    "title": title,
-                    "price": float(price_value),
-                    "stock": stock,
-                    "rating": rating
-                })
-
-        except requests.exceptions.RequestException:
-            continue
+            response = await self.fetch(url, self.cache.validators(entry) if entry else None)
+        except httpx.HTTPError:
+            return url, entry["books"] if entry else [], None
+
+        if response.status_code == 304 and entry is not None:
+            self.cache.touch(url, entry)
+            self.cache.record("revalidations")
+            return url, entry["books"], None
+        return url, None, response
+
+    def remember_page(self, url, response, books):
+        if self.cache is not None:
+            stale = self.cache.get(url) is not None
+            self.cache.put(url, books, response.headers.get("etag"), response.headers.get("last-modified"))
+            self.cache.record("refreshes" if stale else "misses")
+
+    async def scrape_page(self, page):
+        url, books, response = await self.fetch_page(page)
+        if response is not None:
+            start = time.perf_counter()
+            books = self.parse(response.text, url)
+            metrics.SCRAPER_PARSE_SECONDS.observe(time.perf_counter() - start, "inline")
+            self.remember_page(url, response, books)
+        return books
+
+    async def scrape(self, max_pages):
+        pages = await asyncio.gather(*(self.scrape_page(page) for page in range(1, max_pages + 1)))
+        return [book for books in pages for book in books]
+
 
+async def iter_scraped_pages(scraper, max_pages, parse_workers=SCRAPER_PARSE_WORKERS,
+                             queue_size=SCRAPER_QUEUE_SIZE, executor=None):
+    # Csővezeték: a letöltő korutinok (a scraper párhuzamossága szerint) korlátos
+    # sorba teszik a HTML-t, amit `parse_workers` korutin ad át a közös
+    # folyamatkészletnek (0: az eseményhurok dolgozza fel). Az oldalak
+    # sorrendben jönnek ki; egyszerre legfeljebb `window` oldal lehet úton, így a
+    # lassú fogyasztó a letöltést is visszafogja.
+    loop = asyncio.get_running_loop()
+    if executor is None and parse_workers > 0:
+        executor = parse_executor()
+    pages = iter(range(1, max_pages + 1))
+    window = asyncio.Semaphore(queue_size + scraper.concurrency + max(parse_workers, 1))
+    html_queue = asyncio.Queue(maxsize=queue_size)
+    results = asyncio.Queue()
+
+    async def fetch_worker():
+        while True:
+            await window.acquire()
+            page = next(pages, None)
+            if page is None:
+                window.release()
+                return
+            try:
+                url, books, response = await scraper.fetch_page(page)
+            except Exception as exc:
+                await results.put((page, exc))
+                continue
+            if response is None:
+                await results.put((page, books))
+            else:
+                await html_queue.put((page, url, response))
+
+    async def parse_worker():
+        while True:
+            page, url, response = await html_queue.get()
+            try:
+                start = time.perf_counter()
+                if executor is None:
+                    books = scraper.parse(response.text, url)
+                else:
+                    books = await loop.run_in_executor(executor, scraper.parse, response.text, url)
+                metrics.SCRAPER_PARSE_SECONDS.observe(time.perf_counter() - start, "inline" if executor is None else "process")
+                scraper.remember_page(url, response, books)
+            except Exception as exc:
+                books = exc
+            await results.put((page, books))
+
+    workers = [asyncio.create_task(fetch_worker()) for _ in range(scraper.concurrency)]
+    workers += [asyncio.create_task(parse_worker()) for _ in range(max(parse_workers, 1))]
+    try:
+        buffer = {}
+        for page in range(1, max_pages + 1):
+            while page not in buffer:
+                done_page, books = await results.get()
+                buffer[done_page] = books
+            books = buffer.pop(page)
+            if isinstance(books, Exception):
+                raise books
+            window.release()
+            yield page, books
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def iter_books_toscrape(max_pages=2, base_url=SCRAPER_BASE_URL, cache=page_cache,
+                              fetch_workers=None, parse_workers=None):
+    # Oldalsorrendben adja a (lapszám, könyvek) párokat, amint egy oldal elkészült.
+    # Munkásszám nélkül az eseményhurok dolgozza fel a lapokat, különben a
+    # folyamatkészletes csővezeték fut.
+    if fetch_workers is None and parse_workers is None:
+        parse_workers = 0
+    elif parse_workers is None:
+        parse_workers = SCRAPER_PARSE_WORKERS
+    concurrency = fetch_workers if fetch_workers is not None else SCRAPER_CONCURRENCY
+    async with BookScraper(base_url=base_url, concurrency=concurrency, cache=cache) as scraper:
+        async for page, books in iter_scraped_pages(scraper, max_pages, parse_workers):
+            yield page, books
+
+
+async def scrape_books_toscrape(max_pages=2, base_url=SCRAPER_BASE_URL, cache=page_cache,
+                                fetch_workers=None, parse_workers=None):
+    books = []
+    async for _, page_books in iter_books_toscrape(max_pages, base_url, cache, fetch_workers, parse_workers):
+        books.extend(page_books)
     return books
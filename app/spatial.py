@@ -0,0 +1,232 @@
+import heapq
+import os
+
+import numpy as np
+from cachetools import LRUCache
+
+
+# Ennél kevesebb pontú csomópont nem osztódik tovább; a levelek pontjait NumPy vizsgálja.
+SPATIAL_LEAF_SIZE = int(os.getenv("SPATIAL_LEAF_SIZE", "256"))
+# A gyorsítótárazott KD-fák együttes pontszáma (a fa pontonként kb. 24 bájt).
+SPATIAL_CACHE_POINTS = int(os.getenv("SPATIAL_CACHE_POINTS", "5000000"))
+# Sor-tárolásnál a mérés befoglaló téglalapja tengelyenként ennyi cellára oszlik.
+SPATIAL_GRID_SIZE = int(os.getenv("SPATIAL_GRID_SIZE", "64"))
+
+
+def extend_bounds(xy, bounds=None):
+    # (x_min, y_min, x_max, y_max) a korábbi téglalap és az új pontok együttesére.
+    if len(xy) == 0:
+        return bounds
+    lo, hi = xy.min(axis=0), xy.max(axis=0)
+    if bounds is not None:
+        lo, hi = np.minimum(lo, bounds[:2]), np.maximum(hi, bounds[2:])
+    return float(lo[0]), float(lo[1]), float(hi[0]), float(hi[1])
+
+
+class PointGrid:
+    # Mérésenkénti rács-index: a befoglaló téglalap size×size cellára oszlik, a
+    # sor-tárolású pontok a cellaszámukkal (sor * size + oszlop) együtt, a
+    # (measurement_id, cell) indexszel tárolódnak. Egy téglalap rácssoronként
+    # egy összefüggő cellatartományt fed le, így a keskeny (x- vagy y-irányú)
+    # lekérdezés sem olvassa végig a mérés összes sorát.
+    def __init__(self, x_min, y_min, x_max, y_max, size=SPATIAL_GRID_SIZE):
+        self.bounds = (float(x_min), float(y_min), float(x_max), float(y_max))
+        self.size = size
+
+    @classmethod
+    def for_points(cls, bounds, size=SPATIAL_GRID_SIZE):
+        return None if bounds is None else cls(*bounds, size=size)
+
+    @classmethod
+    def of(cls, measurement):
+        # Rács nélküli (régi vagy közvetlenül írt) mérésnél None.
+        if measurement.grid_size is None:
+            return None
+        return cls(measurement.grid_x_min, measurement.grid_y_min,
+                   measurement.grid_x_max, measurement.grid_y_max, measurement.grid_size)
+
+    def columns(self):
+        x_min, y_min, x_max, y_max = self.bounds
+        return {"grid_x_min": x_min, "grid_y_min": y_min, "grid_x_max": x_max,
+                "grid_y_max": y_max, "grid_size": self.size}
+
+    def cells(self, xy):
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        x_min, y_min, x_max, y_max = self.bounds
+        return self._axis(xy[:, 1], y_min, y_max) * self.size + self._axis(xy[:, 0], x_min, x_max)
+
+    def ranges(self, x_min, x_max, y_min, y_max):
+        # A téglalapot lefedő (első, utolsó) cellatartományok; a szomszédosak összevonva.
+        gx_min, gy_min, gx_max, gy_max = self.bounds
+        if x_min > gx_max or x_max < gx_min or y_min > gy_max or y_max < gy_min:
+            return []
+        i0, i1 = self._axis(np.array([x_min, x_max]), gx_min, gx_max).tolist()
+        j0, j1 = self._axis(np.array([y_min, y_max]), gy_min, gy_max).tolist()
+        ranges = []
+        for j in range(j0, j1 + 1):
+            lo, hi = j * self.size + i0, j * self.size + i1
+            if ranges and ranges[-1][1] + 1 == lo:
+                ranges[-1] = (ranges[-1][0], hi)
+            else:
+                ranges.append((lo, hi))
+        return ranges
+
+    def _axis(self, values, lo, hi):
+        # Monoton leképezés, így a téglalap széleinek cellái közrefogják a belső pontokét.
+        if hi <= lo:
+            return np.zeros(len(values), dtype=np.int64)
+        index = np.floor((values - lo) / (hi - lo) * self.size)
+        return np.clip(index, 0, self.size - 1).astype(np.int64)
+
+
+class KDTree:
+    # Statikus 2D KD-fa: a pontok úgy rendeződnek át, hogy minden csomópont egy
+    # összefüggő [start, end) szeletet fedjen, a csomópontok a befoglaló téglalapjukkal
+    # együtt tárolódnak. A lekérdezések (pontindexek, pontok) párt adnak, ahol a
+    # pontindex a pont helye a mérésben (a tárolási sorrendben).
+    def __init__(self, xy, leaf_size=SPATIAL_LEAF_SIZE):
+        points = np.array(xy, dtype=np.float64).reshape(-1, 2)
+        index = np.arange(len(points))
+        slices, bounds, children = [], [], []
+        stack = [(0, len(points), -1, 0)] if len(points) else []
+        while stack:
+            start, end, parent, side = stack.pop()
+            node = len(slices)
+            if parent >= 0:
+                children[parent][side] = node
+            part = points[start:end]
+            lo, hi = part.min(axis=0), part.max(axis=0)
+            slices.append((start, end))
+            bounds.append((lo[0], lo[1], hi[0], hi[1]))
+            children.append([-1, -1])
+            if end - start > leaf_size:
+                # A nagyobb kiterjedésű tengely mentén, a mediánnál vág.
+                dim = int(np.argmax(hi - lo))
+                mid = (start + end) // 2
+                order = np.argpartition(part[:, dim], mid - start)
+                points[start:end] = part[order]
+                index[start:end] = index[start:end][order]
+                stack.append((mid, end, node, 1))
+                stack.append((start, mid, node, 0))
+        self.points = points
+        self.index = index
+        # A bejárás Python ciklus, ezért a csomópontadatok listákban vannak.
+        self._slices = slices
+        self._bounds = [tuple(map(float, b)) for b in bounds]
+        self._children = children
+
+    def __len__(self):
+        return len(self.points)
+
+    def within_box(self, x_min, x_max, y_min, y_max):
+        found = []
+        stack = [0] if self._slices else []
+        while stack:
+            node = stack.pop()
+            x0, y0, x1, y1 = self._bounds[node]
+            if x0 > x_max or x1 < x_min or y0 > y_max or y1 < y_min:
+                continue
+            start, end = self._slices[node]
+            if x_min <= x0 and x1 <= x_max and y_min <= y0 and y1 <= y_max:
+                found.append(np.arange(start, end))
+            elif self._children[node][0] < 0:
+                part = self.points[start:end]
+                mask = (part[:, 0] >= x_min) & (part[:, 0] <= x_max) & (part[:, 1] >= y_min) & (part[:, 1] <= y_max)
+                found.append(start + np.flatnonzero(mask))
+            else:
+                stack.extend(self._children[node])
+        return self._take(found)
+
+    def within_radius(self, x, y, radius):
+        found = []
+        r2 = radius * radius
+        stack = [0] if self._slices else []
+        while stack:
+            node = stack.pop()
+            x0, y0, x1, y1 = self._bounds[node]
+            if _min_dist2(x0, y0, x1, y1, x, y) > r2:
+                continue
+            start, end = self._slices[node]
+            if max((x - x0) ** 2, (x1 - x) ** 2) + max((y - y0) ** 2, (y1 - y) ** 2) <= r2:
+                found.append(np.arange(start, end))
+            elif self._children[node][0] < 0:
+                part = self.points[start:end]
+                found.append(start + np.flatnonzero(_dist2(part, x, y) <= r2))
+            else:
+                stack.extend(self._children[node])
+        return self._take(found)
+
+    def nearest(self, x, y, k):
+        # (pontindexek, pontok, távolságok) távolság szerint növekvő sorrendben. Legjobb-először
+        # bejárás: a csomópont kimarad, ha a téglalapja messzebb van a k-adik találatnál.
+        k = min(k, len(self))
+        best_positions = np.empty(0, dtype=np.int64)
+        best_dist2 = np.empty(0)
+        bound = np.inf
+        heap = [(_min_dist2(*self._bounds[0], x, y), 0)] if k > 0 else []
+        while heap:
+            dist2, node = heapq.heappop(heap)
+            if dist2 > bound:
+                break
+            left, right = self._children[node]
+            if left >= 0:
+                for child in (left, right):
+                    child_dist2 = _min_dist2(*self._bounds[child], x, y)
+                    if child_dist2 <= bound:
+                        heapq.heappush(heap, (child_dist2, child))
+                continue
+            start, end = self._slices[node]
+            best_positions = np.concatenate([best_positions, np.arange(start, end)])
+            best_dist2 = np.concatenate([best_dist2, _dist2(self.points[start:end], x, y)])
+            if len(best_dist2) > k:
+                keep = np.argpartition(best_dist2, k - 1)[:k]
+                best_positions, best_dist2 = best_positions[keep], best_dist2[keep]
+            if len(best_dist2) == k:
+                bound = best_dist2.max()
+        index = self.index[best_positions]
+        order = np.lexsort((index, best_dist2))
+        positions = best_positions[order]
+        return index[order], self.points[positions], np.sqrt(best_dist2[order])
+
+    def _take(self, found):
+        positions = np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+        positions = positions[np.argsort(self.index[positions], kind="stable")]
+        return self.index[positions], self.points[positions]
+
+
+def _dist2(points, x, y):
+    dx, dy = points[:, 0] - x, points[:, 1] - y
+    return dx * dx + dy * dy
+
+
+def _min_dist2(x0, y0, x1, y1, x, y):
+    dx = max(x0 - x, 0.0, x - x1)
+    dy = max(y0 - y, 0.0, y - y1)
+    return dx * dx + dy * dy
+
+
+# Mérés-azonosító -> KD-fa; a méret a fák pontszámainak összege. A mérések írás
+# után nem változnak, törléskor az invalidate() üríti a fát.
+_trees = LRUCache(maxsize=SPATIAL_CACHE_POINTS, getsizeof=len)
+
+
+def cached_tree(measurement_id):
+    return _trees.get(measurement_id)
+
+
+def remember_tree(measurement_id, tree):
+    # A keretnél nagyobb fa nem kerül a gyorsítótárba, de a kérést kiszolgálja.
+    if 0 < len(tree) <= _trees.maxsize:
+        _trees[measurement_id] = tree
+    return tree
+
+
+def invalidate(measurement_id=None):
+    if measurement_id is None:
+        _trees.clear()
+    else:
+        _trees.pop(measurement_id, None)
+
+
+def snapshot():
+    return {"trees": len(_trees), "points": _trees.currsize, "max_points": _trees.maxsize}
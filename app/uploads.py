@@ -0,0 +1,190 @@
+import io
+import os
+import re
+import warnings
+
+import numpy as np
+
+from .points import POINT_DTYPE
+
+
+# A beérkező adat ennyi bájtonként kerül feldolgozásra (és beszúrásra).
+UPLOAD_BLOCK_BYTES = int(os.getenv("UPLOAD_BLOCK_BYTES", str(1024 * 1024)))
+
+CSV = "csv"
+NPY = "npy"
+BINARY = "binary"
+UPLOAD_FORMATS = (CSV, NPY, BINARY)
+
+_EXTENSIONS = {".npy": NPY, ".bin": BINARY}
+_MEDIA_TYPES = {"application/x-npy": NPY, "application/octet-stream": BINARY}
+
+_NPY_MAGIC = b"\x93NUMPY"
+_PARAM_RE = re.compile(r';\s*([\w-]+)="?([^";]*)"?')
+
+
+def detect_format(filename=None, content_type=None):
+    # Először a kiterjesztés, aztán a tartalomtípus; minden más szöveg (x,y soronként).
+    if filename:
+        ext = os.path.splitext(filename)[1].lower()
+        if ext in _EXTENSIONS:
+            return _EXTENSIONS[ext]
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return _MEDIA_TYPES.get(media_type, CSV)
+
+
+def header_params(value):
+    return {name.lower(): param for name, param in _PARAM_RE.findall(value or "")}
+
+
+async def open_multipart_file(chunks, boundary):
+    # Folyamatos multipart/form-data olvasás: az első fájl-rész fejlécéig
+    # olvas, és (fájlnév, tartalomtípus, a rész bájtjainak iterátora) hármast ad.
+    # A törzs soha nem kerül egészben memóriába.
+    chunks = chunks.__aiter__()
+    delimiter = b"--" + boundary.encode("latin-1")
+    buffer = b""
+
+    async def fill():
+        nonlocal buffer
+        try:
+            buffer += await chunks.__anext__()
+        except StopAsyncIteration:
+            raise ValueError("Hiányos multipart törzs.")
+
+    while True:
+        while delimiter not in buffer:
+            buffer = buffer[-len(delimiter):]
+            await fill()
+        buffer = buffer[buffer.index(delimiter) + len(delimiter):]
+        while len(buffer) < 2:
+            await fill()
+        if buffer.startswith(b"--"):
+            raise ValueError("A kérés nem tartalmaz fájlt.")
+        while b"\r\n\r\n" not in buffer:
+            await fill()
+        raw_headers, buffer = buffer.split(b"\r\n\r\n", 1)
+        headers = {}
+        for line in raw_headers.decode("latin-1").split("\r\n"):
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        filename = header_params(headers.get("content-disposition")).get("filename")
+        if filename is not None:
+            break
+
+    end = b"\r\n" + delimiter
+
+    async def data():
+        nonlocal buffer
+        while True:
+            position = buffer.find(end)
+            if position >= 0:
+                if position:
+                    yield buffer[:position]
+                return
+            # A végén egy részleges határoló lehet, azt visszatartjuk.
+            keep = len(end) - 1
+            if len(buffer) > keep:
+                yield buffer[:-keep]
+                buffer = buffer[-keep:]
+            await fill()
+
+    return filename, headers.get("content-type"), data()
+
+
+async def _blocks(chunks, block_bytes):
+    # A hálózati darabokat legalább `block_bytes` méretű blokkokká fűzi össze.
+    parts, size = [], 0
+    async for chunk in chunks:
+        parts.append(chunk)
+        size += len(chunk)
+        if size >= block_bytes:
+            yield b"".join(parts)
+            parts, size = [], 0
+    if parts:
+        yield b"".join(parts)
+
+
+def _parse_csv_block(block, first_line):
+    try:
+        # Csak üres vagy megjegyzés sorokból álló blokk nem hiba.
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            xy = np.loadtxt(io.BytesIO(block), delimiter=",", comments="#", dtype=POINT_DTYPE, ndmin=2)
+    except ValueError as e:
+        raise ValueError(f"Hibás sor a(z) {first_line}. sortól kezdődő blokkban: {e}")
+    if xy.size and xy.shape[1] != 2:
+        raise ValueError(f"Soronként pontosan két érték kell (x,y), a(z) {first_line}. sortól.")
+    return xy.reshape(-1, 2)
+
+
+async def parse_csv(chunks, block_bytes=UPLOAD_BLOCK_BYTES):
+    # Soronként "x,y"; a blokkokat az utolsó teljes sornál vágja, és egyben,
+    # NumPy-jal (C-ben) dolgozza fel.
+    rest = b""
+    line = 1
+    async for block in _blocks(chunks, block_bytes):
+        block = rest + block
+        cut = block.rfind(b"\n") + 1
+        block, rest = block[:cut], block[cut:]
+        if block:
+            yield _parse_csv_block(block, line)
+            line += block.count(b"\n")
+    if rest.strip():
+        yield _parse_csv_block(rest, line)
+
+
+async def parse_binary(chunks, block_bytes=UPLOAD_BLOCK_BYTES, dtype=POINT_DTYPE):
+    # Egymást követő (x, y) párok, a GET ...?format=binary kimenetével azonos alakban.
+    point_size = 2 * dtype.itemsize
+    rest = b""
+    async for block in _blocks(chunks, block_bytes):
+        block = rest + block
+        cut = len(block) - len(block) % point_size
+        block, rest = block[:cut], block[cut:]
+        if block:
+            yield np.frombuffer(block, dtype=dtype).astype(POINT_DTYPE, copy=False).reshape(-1, 2)
+    if rest:
+        raise ValueError("A bináris adat hossza nem egész számú pont.")
+
+
+async def parse_npy(chunks, block_bytes=UPLOAD_BLOCK_BYTES):
+    # .npy fájl: a fejléc után (n, 2) alakú, C sorrendű numerikus tömb.
+    chunks = chunks.__aiter__()
+    buffer = b""
+    header_size = None
+    while header_size is None or len(buffer) < header_size:
+        try:
+            buffer += await chunks.__anext__()
+        except StopAsyncIteration:
+            raise ValueError("Hiányos .npy fejléc.")
+        if header_size is None and len(buffer) >= 12:
+            if not buffer.startswith(_NPY_MAGIC):
+                raise ValueError("A fájl nem .npy formátumú.")
+            if buffer[6] == 1:
+                header_size = 10 + int.from_bytes(buffer[8:10], "little")
+            else:
+                header_size = 12 + int.from_bytes(buffer[8:12], "little")
+
+    fp = io.BytesIO(buffer[:header_size])
+    version = np.lib.format.read_magic(fp)
+    read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+    shape, fortran_order, dtype = read_header(fp)
+    if len(shape) != 2 or shape[1] != 2 or fortran_order or dtype.kind not in "fiu":
+        raise ValueError("A .npy tömbnek (n, 2) alakú, C sorrendű, numerikus tömbnek kell lennie.")
+
+    async def remaining():
+        yield buffer[header_size:]
+        async for chunk in chunks:
+            yield chunk
+
+    count = 0
+    async for xy in parse_binary(remaining(), block_bytes, dtype):
+        count += len(xy)
+        yield xy
+    if count != shape[0]:
+        raise ValueError(f"A .npy fejléc {shape[0]} pontot ír, de {count} érkezett.")
+
+
+PARSERS = {CSV: parse_csv, NPY: parse_npy, BINARY: parse_binary}
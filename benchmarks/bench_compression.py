@@ -0,0 +1,98 @@
+"""Tömörítési benchmark: válaszméret és késleltetés formátumonként és kódolásonként.
+
+Egy --points pontos mérést tölt be ideiglenes SQLite adatbázisba, uvicornt indít
+(válasz-gyorsítótár nélkül és vele), majd minden formátumot minden elérhető
+kódolással --repeat-szer lekér. A "wire" a hálózaton átmenő bájtszám; a
+becsült idő a helyi késleltetés plusz a wire átvitele --bandwidth Mbit/s-on.
+
+    python -m benchmarks.bench_compression --points 100000
+"""
+import argparse
+import asyncio
+import pathlib
+import statistics
+import tempfile
+import time
+
+import httpx
+import numpy as np
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import compression, crud
+from app.database import build_async_engine
+from app.models import User
+from benchmarks.bench_concurrency import start_server, wait_until_ready
+from benchmarks.dataset import create_schema, random_points
+
+FORMATS = ("json", "ndjson", "binary", "arrow")
+
+
+def signal_points(rng, points):
+    # Mintavételezett, zajos jel 3 tizedesre kerekítve: a mérőeszközök tipikus kimenete.
+    x = np.arange(points) * 0.001
+    y = np.round(np.sin(x * 7) * 100 + rng.normal(0, 1, points), 3)
+    return np.column_stack([x, y])
+
+
+async def build(db_path, xy):
+    create_schema(db_path)
+    engine = build_async_engine(f"sqlite:///{db_path}")
+    try:
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            user = User(name="bench-compression")
+            session.add(user)
+            await session.commit()
+            return (await crud.add_measurement_array(session, user.id, xy)).id
+    finally:
+        await engine.dispose()
+
+
+async def measure(client, url, encoding, repeat):
+    latencies = []
+    for _ in range(repeat + 1):
+        start = time.perf_counter()
+        response = await client.get(url, headers={"Accept-Encoding": encoding})
+        await response.aread()
+        latencies.append(time.perf_counter() - start)
+    # Az első kérés bemelegítés (és a gyorsítótárat is feltölti).
+    return statistics.median(latencies[1:]), response.num_bytes_downloaded, response.headers.get("content-encoding")
+
+
+async def run(args):
+    rng = np.random.default_rng(0)
+    xy = random_points(rng, args.points) if args.data == "uniform" else signal_points(rng, args.points)
+    encodings = ["identity", *compression.ENCODERS]
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = pathlib.Path(tmp) / "compression.db"
+        measurement_id = await build(db_path, xy)
+        for cache_bytes in ("0", str(256 * 1024 * 1024)):
+            server = start_server(db_path, args.port, {"RESPONSE_CACHE_BYTES": cache_bytes})
+            try:
+                async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=120) as client:
+                    await wait_until_ready(client)
+                    print(f"response cache {'off' if cache_bytes == '0' else 'on'}, {args.points} points ({args.data})")
+                    for fmt in FORMATS:
+                        url = f"/measurements/{measurement_id}?format={fmt}"
+                        for encoding in encodings:
+                            latency, wire, applied = await measure(client, url, encoding, args.repeat)
+                            estimate = latency + wire * 8 / (args.bandwidth * 1e6)
+                            print(f"  {fmt:<7} {encoding:<9} wire={wire / 1e6:7.3f}MB latency={latency * 1e3:7.1f}ms "
+                                  f"est@{args.bandwidth:g}Mbit={estimate * 1e3:7.1f}ms encoding={applied or '-'}")
+            finally:
+                server.terminate()
+                server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=100_000)
+    parser.add_argument("--data", choices=["uniform", "signal"], default="uniform")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--bandwidth", type=float, default=100.0, help="becsült sávszélesség Mbit/s-ban")
+    parser.add_argument("--port", type=int, default=8769)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
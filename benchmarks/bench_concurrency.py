@@ -0,0 +1,107 @@
+"""Párhuzamos kliens benchmark: p50/p99 késleltetés a futó backend ellen.
+
+Elindít egy uvicorn szervert ideiglenes SQLite adatbázissal, HTTP-n feltölti
+méréssel, majd --clients párhuzamos kliens kérdezi le a méréseket.
+
+    python -m benchmarks.bench_concurrency --clients 200
+"""
+import argparse
+import asyncio
+import os
+import pathlib
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+
+def start_server(db_path, port, extra_env=None):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", **(extra_env or {}))
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "run.backend:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_until_ready(client, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/openapi.json")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("A szerver nem indult el időben.")
+
+
+async def seed(client, measurements, points):
+    rnd = random.Random(0)
+    user_id = (await client.post("/users/", json={"name": "bench"})).json()["id"]
+    ids = []
+    for _ in range(measurements):
+        payload = {"points": [{"x": rnd.random(), "y": rnd.random()} for _ in range(points)]}
+        response = await client.post("/measurements/", params={"user_id": user_id, "bulk": "true"}, json=payload)
+        ids.append(response.json()["id"])
+    return ids
+
+
+async def run_clients(client, ids, clients, requests_per_client):
+    latencies = []
+    errors = 0
+
+    async def worker(seed_value):
+        nonlocal errors
+        rnd = random.Random(seed_value)
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            try:
+                response = await client.get(f"/measurements/{rnd.choice(ids)}")
+                ok = response.status_code == 200
+            except httpx.TransportError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(clients)))
+    return np.array(latencies), errors, time.perf_counter() - start
+
+
+async def main_async(args):
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=120) as client:
+        await wait_until_ready(client)
+        ids = await seed(client, args.measurements, args.points)
+        latencies, errors, elapsed = await run_clients(client, ids, args.clients, args.requests)
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"clients={args.clients} requests={len(latencies)} errors={errors} points/measurement={args.points}")
+    print(f"p50={p50:.1f}ms p99={p99:.1f}ms throughput={len(latencies) / elapsed:.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5, help="kérések száma kliensenként")
+    parser.add_argument("--measurements", type=int, default=20)
+    parser.add_argument("--points", type=int, default=1000)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = start_server(pathlib.Path(tmp) / "bench.db", args.port)
+        try:
+            asyncio.run(main_async(args))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Vegyes olvasás/írás terhelési teszt a "default" és a "tuned" adatbázis-profilra.
+
+Minden profil saját ideiglenes SQLite fájlt kap; --writers író és --readers
+olvasó folyamat (mint több uvicorn worker) dolgozik rajta párhuzamosan
+--duration másodpercig, mindegyik saját engine-nel.
+
+    python -m benchmarks.bench_db_profile --writers 4 --readers 16 --dir .
+"""
+import argparse
+import multiprocessing
+import pathlib
+import random
+import tempfile
+import time
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.database import Base, build_engine
+from app.models import Measurement, MeasurementPoint, User
+
+
+def seed(url, profile, points):
+    engine = build_engine(url, profile)
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        user = User(name="bench")
+        session.add(user)
+        session.commit()
+        user_id = user.id
+    engine.dispose()
+    for _ in range(10):
+        write_measurement(url, profile, user_id, points, random.Random(0))
+    return user_id
+
+
+def write_measurement(url, profile, user_id, points, rnd, engine=None):
+    own_engine = engine is None
+    engine = engine or build_engine(url, profile)
+    with sessionmaker(bind=engine)() as session:
+        m = Measurement(user_id=user_id, storage=crud.STORAGE_ROWS)
+        session.add(m)
+        session.flush()
+        session.execute(MeasurementPoint.__table__.insert(), [
+            {"measurement_id": m.id, "x": rnd.random(), "y": rnd.random()} for _ in range(points)
+        ])
+        session.commit()
+    if own_engine:
+        engine.dispose()
+
+
+def worker(role, url, profile, user_id, points, deadline, seed_value, results):
+    engine = build_engine(url, profile)
+    session_factory = sessionmaker(bind=engine)
+    rnd = random.Random(seed_value)
+    done = errors = 0
+    while time.time() < deadline:
+        try:
+            if role == "writer":
+                write_measurement(url, profile, user_id, points, rnd, engine)
+            else:
+                with session_factory() as session:
+                    max_id = session.execute(select(func.max(Measurement.id))).scalar()
+                    crud.read_point_rows(session, rnd.randint(1, max_id))
+            done += 1
+        except OperationalError:
+            errors += 1
+    engine.dispose()
+    results.put((role, done, errors))
+
+
+def run_profile(db_path, profile, args):
+    url = f"sqlite:///{db_path}"
+    user_id = seed(url, profile, args.points)
+    deadline = time.time() + args.duration
+    results = multiprocessing.Queue()
+    roles = ["writer"] * args.writers + ["reader"] * args.readers
+    processes = [
+        multiprocessing.Process(target=worker, args=(role, url, profile, user_id, args.points, deadline, i, results))
+        for i, role in enumerate(roles)
+    ]
+    for process in processes:
+        process.start()
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    for _ in processes:
+        role, done, errors = results.get()
+        counts["writes" if role == "writer" else "reads"] += done
+        counts["errors"] += errors
+    for process in processes:
+        process.join()
+    return {name: value / args.duration for name, value in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", default=["default", "tuned"], choices=["default", "tuned"])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--points", type=int, default=1000, help="pontok száma írásonként")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--dir", default=None, help="az ideiglenes adatbázisok könyvtára (valódi lemezen mérjünk)")
+    args = parser.parse_args()
+
+    print(f"{'profile':>8} {'reads/s':>10} {'writes/s':>10} {'errors/s':>10}")
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for profile in args.profiles:
+            rates = run_profile(pathlib.Path(tmp) / f"{profile}.db", profile, args)
+            print(f"{profile:>8} {rates['reads']:>10.1f} {rates['writes']:>10.1f} {rates['errors']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Mérés-betöltés benchmark: ORM-alapú vs. bulk (Core executemany) útvonal.
+
+Futtatás a projekt gyökeréből:
+
+    python -m benchmarks.bench_ingest --sizes 1000 100000 1000000
+"""
+import argparse
+import asyncio
+import pathlib
+import random
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import crud
+from app.database import Base
+from app.models import User
+from app.schemas import MeasurementCreateDTO
+
+
+def make_payload(n_points, seed=0):
+    rnd = random.Random(seed)
+    return MeasurementCreateDTO(points=[
+        {"x": rnd.uniform(-1e3, 1e3), "y": rnd.uniform(-1e3, 1e3)}
+        for _ in range(n_points)
+    ])
+
+
+async def run_once(db_path, mode, payload, chunk_size):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            user = User(name="bench")
+            session.add(user)
+            await session.commit()
+
+            start = time.perf_counter()
+            if mode == "orm":
+                m = await crud.add_measurement(session, user.id, payload)
+                n = len(m.points)
+            else:
+                await crud.add_measurement_bulk(session, user.id, payload, chunk_size=chunk_size)
+                n = len(payload.points)
+            elapsed = time.perf_counter() - start
+    finally:
+        await engine.dispose()
+    return elapsed, n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--modes", nargs="+", default=["orm", "bulk"], choices=["orm", "bulk"])
+    parser.add_argument("--chunk-size", type=int, default=crud.BULK_INSERT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    print(f"{'points':>10} {'mode':>6} {'seconds':>10} {'points/s':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            payload = make_payload(size)
+            for mode in args.modes:
+                db_path = pathlib.Path(tmp) / f"{mode}-{size}.db"
+                elapsed, n = asyncio.run(run_once(db_path, mode, payload, args.chunk_size))
+                print(f"{n:>10} {mode:>6} {elapsed:>10.3f} {n / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""HTML feldolgozás benchmark: a könyv-scraper feldolgozói a mentett fixture oldalakon.
+
+Csak a feldolgozás idejét méri (hálózat nélkül), oldalanként:
+
+    python -m benchmarks.bench_parse --repeat 20
+"""
+import argparse
+import pathlib
+import time
+
+from app.soup import PARSERS, parse_books
+
+FIXTURES_DIR = pathlib.Path(__file__).parents[1] / "run" / "test" / "fixtures"
+
+
+def load_pages():
+    return [path.read_text(encoding="utf-8") for path in sorted((FIXTURES_DIR / "catalogue").glob("page-*.html"))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parsers", nargs="+", default=list(PARSERS), choices=list(PARSERS))
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = load_pages()
+    reference = [parse_books(html, "html.parser") for html in pages]
+
+    print(f"{'parser':>12} {'ms/page':>10} {'pages/s':>10} {'speedup':>8}")
+    baseline = None
+    for name in args.parsers:
+        assert [parse_books(html, name) for html in pages] == reference, name
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for html in pages:
+                parse_books(html, name)
+        per_page = (time.perf_counter() - start) / (args.repeat * len(pages))
+        baseline = baseline or per_page
+        print(f"{name:>12} {per_page * 1000:>10.2f} {1 / per_page:>10.1f} {baseline / per_page:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Válasz-gyorsítótár benchmark: forró kulcsos olvasási terhelés gyorsítótárral és nélküle.
+
+Két uvicorn szervert indít egymás után (RESPONSE_CACHE_BYTES=0, illetve az
+alapértelmezett méret), mindkettőt ugyanúgy feltölti, majd a kérések
+--hot-share része a mérések --hot-fraction részére megy. A gyorsítótáras
+futás végén If-None-Match-es (304) újraérvényesítést is mér.
+
+    python -m benchmarks.bench_response_cache --clients 50 --points 10000
+"""
+import argparse
+import asyncio
+import pathlib
+import random
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+from benchmarks.bench_concurrency import seed, start_server, wait_until_ready
+
+
+def hot_key_ids(ids, count, hot_fraction, hot_share, seed_value):
+    rnd = random.Random(seed_value)
+    hot = ids[:max(1, int(len(ids) * hot_fraction))]
+    return [rnd.choice(hot) if rnd.random() < hot_share else rnd.choice(ids) for _ in range(count)]
+
+
+async def run_clients(client, ids, args, revalidate=False):
+    latencies = []
+    etags = {}
+
+    async def worker(seed_value):
+        for measurement_id in hot_key_ids(ids, args.requests, args.hot_fraction, args.hot_share, seed_value):
+            headers = {"If-None-Match": etags[measurement_id]} if revalidate and measurement_id in etags else {}
+            start = time.perf_counter()
+            response = await client.get(f"/measurements/{measurement_id}", headers=headers)
+            latencies.append(time.perf_counter() - start)
+            if "etag" in response.headers:
+                etags[measurement_id] = response.headers["etag"]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.clients)))
+    return np.array(latencies), time.perf_counter() - start
+
+
+def report(label, latencies, elapsed):
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"{label:<12} p50={p50:.1f}ms p99={p99:.1f}ms throughput={len(latencies) / elapsed:.1f} req/s")
+
+
+async def measure(args, port, cached):
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120) as client:
+        await wait_until_ready(client)
+        ids = await seed(client, args.measurements, args.points)
+        report("cache" if cached else "no-cache", *await run_clients(client, ids, args))
+        if cached:
+            report("revalidate", *await run_clients(client, ids, args, revalidate=True))
+            stats = (await client.get("/cache/responses")).json()
+            print(f"hit_rate={stats['hit_rate']:.2f} entries={stats['entries']} bytes={stats['bytes']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20, help="kérések száma kliensenként")
+    parser.add_argument("--measurements", type=int, default=50)
+    parser.add_argument("--points", type=int, default=10000)
+    parser.add_argument("--hot-fraction", type=float, default=0.1, help="a forró mérések aránya")
+    parser.add_argument("--hot-share", type=float, default=0.9, help="a forró mérésekre menő kérések aránya")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    for cached in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            extra_env = None if cached else {"RESPONSE_CACHE_BYTES": "0"}
+            server = start_server(pathlib.Path(tmp) / "bench.db", args.port, extra_env)
+            try:
+                asyncio.run(measure(args, args.port, cached))
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
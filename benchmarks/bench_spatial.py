@@ -0,0 +1,97 @@
+"""Térbeli lekérdezés benchmark: téglalap (SQL index vs. KD-fa) és kNN (KD-fa vs. teljes keresés).
+
+Egy N pontos mérés sor- és blob-tárolással ideiglenes SQLite adatbázisban; a
+téglalap a pontok kb. 0,25%-át fedi le.
+
+    python -m benchmarks.bench_spatial --points 1000000
+"""
+import argparse
+import asyncio
+import pathlib
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import crud, spatial
+from app.database import build_async_engine
+from app.models import User
+from benchmarks.dataset import create_schema, random_points
+
+
+async def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+async def run(db_path, n_points, repeat, k):
+    create_schema(db_path)
+    engine = build_async_engine(f"sqlite:///{db_path}")
+    rng = np.random.default_rng(0)
+    xy = random_points(rng, n_points)
+    box = (0.0, 100.0, 0.0, 100.0)
+    queries = rng.uniform(-1e3, 1e3, size=(100, 2))
+    try:
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            user = User(name="bench-spatial")
+            session.add(user)
+            await session.commit()
+            for storage in (crud.STORAGE_ROWS, crud.STORAGE_BLOB):
+                crud.POINT_STORAGE = storage
+                measurement = await crud.add_measurement_array(session, user.id, xy)
+
+                async def sql_box():
+                    await crud.get_points_in_box(session, measurement, *box)
+
+                async def load_and_mask():
+                    points = await crud.get_points(session, measurement)
+                    points[(points[:, 0] >= box[0]) & (points[:, 0] <= box[1])
+                           & (points[:, 1] >= box[2]) & (points[:, 1] <= box[3])]
+
+                print(f"{storage:<5} n={n_points} box_db={await best_of(sql_box, repeat) * 1e3:8.2f}ms "
+                      f"load+mask={await best_of(load_and_mask, repeat) * 1e3:8.2f}ms")
+
+        start = time.perf_counter()
+        tree = spatial.KDTree(xy)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            tree.within_box(*box)
+        tree_box = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for x, y in queries:
+            tree.nearest(x, y, k)
+        tree_knn = (time.perf_counter() - start) / len(queries)
+
+        start = time.perf_counter()
+        for x, y in queries[:10]:
+            distance = np.hypot(xy[:, 0] - x, xy[:, 1] - y)
+            np.argpartition(distance, k - 1)[:k]
+        brute_knn = (time.perf_counter() - start) / 10
+
+        print(f"tree  build={build:.2f}s box={tree_box * 1e3:.3f}ms knn(k={k})={tree_knn * 1e3:.3f}ms "
+              f"brute_knn={brute_knn * 1e3:.2f}ms")
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(pathlib.Path(tmp) / "spatial.db", args.points, args.repeat, args.k))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Hidegindítás benchmark: egy munkás importja, az alkalmazásgyár és a lifespan indulása.
+
+Minden mérés új Python folyamatban, új SQLite adatbázison fut. A --workers
+mellett a `python -m run.serve` indítót is méri: mennyi idő alatt jelzi
+mind az N munkás az "Application startup complete" sort, és mikor érkezik
+az első HTTP válasz.
+
+    python -m benchmarks.bench_startup --repeat 5 --workers 1 4
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+# A gyermekfolyamatban futó mérés: import, create_app(), lifespan indulás.
+WORKER_SCRIPT = """
+import asyncio, json, resource, sys, time
+start = time.perf_counter()
+from run.backend import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+
+async def startup():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+started = asyncio.run(startup())
+print(json.dumps({
+    "import_s": imported - start,
+    "create_app_s": created - imported,
+    "lifespan_s": started - created,
+    "rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "scraper_loaded": "bs4" in sys.modules,
+}))
+"""
+
+
+def measure_worker(db_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", DB_AUTO_MIGRATE="1")
+    output = subprocess.run([sys.executable, "-c", WORKER_SCRIPT], env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.splitlines()[-1])
+
+
+def measure_launcher(db_path, workers, port, timeout=60.0):
+    # (az összes munkás indulásáig, az első válaszig) eltelt idő másodpercben.
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "run.serve", "--workers", str(workers), "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    first_response = None
+    try:
+        ready = 0
+        while ready < workers:
+            line = server.stderr.readline()
+            if not line:
+                raise RuntimeError("A szerver leállt indulás közben.")
+            ready += "Application startup complete" in line
+        all_ready = time.perf_counter() - start
+        deadline = time.monotonic() + timeout
+        while first_response is None and time.monotonic() < deadline:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/cache/responses").status_code == 200:
+                    first_response = time.perf_counter() - start
+            except httpx.TransportError:
+                time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+    return all_ready, first_response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 4])
+    parser.add_argument("--port", type=int, default=8768)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = [measure_worker(f"{tmp}/worker-{i}.db") for i in range(args.repeat)]
+        for key in ("import_s", "create_app_s", "lifespan_s", "rss_mib"):
+            values = [run[key] for run in runs]
+            print(f"worker {key:<14} median={statistics.median(values):.3f} min={min(values):.3f}")
+        print(f"worker scraper_loaded={any(run['scraper_loaded'] for run in runs)}")
+
+        for workers in args.workers:
+            samples = [measure_launcher(f"{tmp}/serve-{workers}-{i}.db", workers, args.port) for i in range(args.repeat)]
+            all_ready = statistics.median(sample[0] for sample in samples)
+            first = statistics.median(sample[1] for sample in samples)
+            print(f"run.serve workers={workers:<3} all_ready={all_ready:.3f}s first_response={first:.3f}s "
+                  f"per_worker={all_ready / workers:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
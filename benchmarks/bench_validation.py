@@ -0,0 +1,64 @@
+"""Validálási benchmark: pontonkénti ({"points": [{"x", "y"}]}) vs. oszlopos ({"x", "y"}) séma.
+
+Egymillió pontra vetítve méri a JSON dekódolás + pydantic validálás (a
+FastAPI útvonala), a közvetlen model_validate_json és a NumPy tömbbé
+alakítás idejét.
+
+    python -m benchmarks.bench_validation --sizes 100000 1000000
+"""
+import argparse
+import json
+import random
+import time
+
+from app.points import columns_to_array, points_to_array
+from app.schemas import MeasurementColumnsDTO, MeasurementCreateDTO
+
+
+def make_bodies(n_points, seed=0):
+    rnd = random.Random(seed)
+    x = [rnd.uniform(-1e3, 1e3) for _ in range(n_points)]
+    y = [rnd.uniform(-1e3, 1e3) for _ in range(n_points)]
+    points = json.dumps({"points": [{"x": a, "y": b} for a, b in zip(x, y)]})
+    columns = json.dumps({"x": x, "y": y})
+    return points, columns
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def measure(name, model, body, to_array, n_points, repeat):
+    per_million = 1_000_000 / n_points
+    decode_validate = best_of(lambda: model.model_validate(json.loads(body)), repeat)
+    validate_json = best_of(lambda: model.model_validate_json(body), repeat)
+    dto = model.model_validate_json(body)
+    convert = best_of(lambda: to_array(dto), repeat)
+    print(
+        f"{name:<8} n={n_points:<8} body={len(body) / 1e6:6.1f}MB "
+        f"loads+validate={decode_validate * per_million:6.2f}s/M "
+        f"validate_json={validate_json * per_million:6.2f}s/M "
+        f"to_array={convert * per_million:6.2f}s/M"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for n_points in args.sizes:
+        points, columns = make_bodies(n_points)
+        measure("points", MeasurementCreateDTO, points, lambda dto: points_to_array(dto.points), n_points, args.repeat)
+        measure("columns", MeasurementColumnsDTO, columns, lambda dto: columns_to_array(dto.x, dto.y),
+                n_points, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark adathalmaz: felhasználók × mérések × pontok, több méretben.
+
+A pontok determinisztikusak (a seed-ből), így két futás ugyanazt az adatbázist
+építi fel. Önállóan is futtatható:
+
+    python -m benchmarks.dataset --scale medium --db bench.db
+"""
+import argparse
+import asyncio
+import pathlib
+import time
+
+import numpy as np
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import crud
+from app.database import Base, build_async_engine, build_engine
+from app.models import User
+
+# Méret: (felhasználók, mérés/felhasználó, pont/mérés).
+SCALES = {
+    "small": (2, 5, 1_000),
+    "medium": (5, 10, 10_000),
+    "large": (10, 20, 100_000),
+}
+
+
+def random_points(rng, points):
+    return rng.uniform(-1e3, 1e3, size=(points, 2))
+
+
+def create_schema(db_path):
+    engine = build_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+
+async def generate(session, users, measurements, points, seed=0):
+    # {felhasználó azonosító: [mérés azonosítók]}; a pontok a bulk útvonalon íródnak.
+    rng = np.random.default_rng(seed)
+    dataset = {}
+    for i in range(users):
+        user = User(name=f"bench-{i}")
+        session.add(user)
+        await session.commit()
+        dataset[user.id] = []
+        for _ in range(measurements):
+            measurement = await crud.add_measurement_array(session, user.id, random_points(rng, points))
+            dataset[user.id].append(measurement.id)
+    return dataset
+
+
+async def build(db_path, scale, seed=0):
+    create_schema(db_path)
+    engine = build_async_engine(f"sqlite:///{db_path}")
+    try:
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            return await generate(session, *SCALES[scale], seed=seed)
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--db", type=pathlib.Path, required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    dataset = asyncio.run(build(args.db, args.scale, args.seed))
+    users, measurements, points = SCALES[args.scale]
+    print(f"{args.db}: {len(dataset)} users x {measurements} measurements x {points} points "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
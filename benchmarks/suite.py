@@ -0,0 +1,290 @@
+"""Benchmark csomag: CRUD, scraper és végponttól végpontig mért API, JSON eredménnyel.
+
+Minden futás egy JSON fájlt ír (környezet, git commit, mérésenként medián és
+minimum), amely egy korábbi futással összevethető: a --baseline fájlhoz képest
+--threshold aránynál rosszabb mérés regressziónak számít (kilépési kód 1).
+
+    python -m benchmarks.suite --scale small
+    python -m benchmarks.suite --scale small --baseline benchmarks/results/small-....json --threshold 0.25
+    python -m benchmarks.suite --only crud.get_measurement scraper.fixtures
+"""
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import numpy as np
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import crud
+from app.database import build_async_engine
+from app.schemas import MeasurementCreateDTO
+from app.soup import PARSERS, parse_books, scrape_books_toscrape
+from benchmarks.bench_concurrency import run_clients, start_server, wait_until_ready
+from benchmarks.bench_parse import FIXTURES_DIR, load_pages
+from benchmarks.dataset import SCALES, build, random_points
+
+RESULTS_DIR = pathlib.Path(__file__).parent / "results"
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+class Context:
+    # A benchmarkok közös állapota: a felépített adatbázis és a beállítások.
+    def __init__(self, db_path, dataset, scale, repeat, args):
+        self.db_path = db_path
+        self.dataset = dataset
+        self.scale = scale
+        self.repeat = repeat
+        self.args = args
+        self.points = SCALES[scale][2]
+
+    @property
+    def measurement_ids(self):
+        return [m for ids in self.dataset.values() for m in ids]
+
+    def session_factory(self, engine):
+        return async_sessionmaker(engine, expire_on_commit=False)
+
+
+def seconds(samples):
+    return {"value": statistics.median(samples), "min": min(samples), "unit": "s", "better": "lower"}
+
+
+def rate(value, unit):
+    return {"value": value, "unit": unit, "better": "higher"}
+
+
+async def timed(func, repeat, batch=1, warmup=1):
+    # Mintánként `batch` hívás átlagideje; az első `warmup` minta eldobódik.
+    samples = []
+    for i in range(warmup + repeat):
+        start = time.perf_counter()
+        for _ in range(batch):
+            await func()
+        if i >= warmup:
+            samples.append((time.perf_counter() - start) / batch)
+    return samples
+
+
+@benchmark("crud.add_measurement")
+async def bench_add_measurement(ctx):
+    # Egy mérés beszúrása az ORM (add_measurement) és a bulk (add_measurement_bulk) útvonalon.
+    rng = np.random.default_rng(1)
+    payload = MeasurementCreateDTO(points=[{"x": x, "y": y} for x, y in random_points(rng, ctx.points).tolist()])
+    user_id = next(iter(ctx.dataset))
+    engine = build_async_engine(f"sqlite:///{ctx.db_path}")
+    try:
+        async with ctx.session_factory(engine)() as session:
+            orm = await timed(lambda: crud.add_measurement(session, user_id, payload), ctx.repeat, warmup=0)
+            bulk = await timed(lambda: crud.add_measurement_bulk(session, user_id, payload), ctx.repeat, warmup=0)
+    finally:
+        await engine.dispose()
+    return {"orm_s": seconds(orm), "bulk_s": seconds(bulk)}
+
+
+@benchmark("crud.get_measurement")
+async def bench_get_measurement(ctx):
+    # Véletlen mérés betöltése: a mérés sora, majd a pontjai NumPy tömbként.
+    rnd = random.Random(2)
+    ids = ctx.measurement_ids
+    engine = build_async_engine(f"sqlite:///{ctx.db_path}")
+    try:
+        async with ctx.session_factory(engine)() as session:
+            measurements = []
+
+            async def get_measurement():
+                session.expunge_all()
+                measurements.append(await crud.get_measurement(session, rnd.choice(ids)))
+
+            async def get_points():
+                await crud.get_points(session, rnd.choice(measurements))
+
+            get = await timed(get_measurement, ctx.repeat, batch=20)
+            points = await timed(get_points, ctx.repeat, batch=5)
+    finally:
+        await engine.dispose()
+    return {"get_measurement_s": seconds(get), "get_points_s": seconds(points)}
+
+
+def serve_fixtures():
+    class Handler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=str(FIXTURES_DIR), **kwargs)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@benchmark("scraper.fixtures")
+async def bench_scraper(ctx):
+    # A mentett oldalak feldolgozása feldolgozónként, és a teljes scrape egy helyi HTTP szerverről.
+    pages = load_pages()
+    results = {}
+    for name in PARSERS:
+        async def parse_all():
+            for html in pages:
+                parse_books(html, name)
+
+        samples = await timed(parse_all, ctx.repeat, batch=5)
+        results[f"parse_{name}_s"] = seconds([sample / len(pages) for sample in samples])
+
+    server = serve_fixtures()
+    try:
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        scrape = await timed(
+            lambda: scrape_books_toscrape(max_pages=len(pages), base_url=base_url, cache=None), ctx.repeat
+        )
+    finally:
+        server.shutdown()
+        server.server_close()
+    results["scrape_s"] = seconds(scrape)
+    return results
+
+
+@benchmark("api.e2e")
+async def bench_api(ctx):
+    # Uvicorn a felépített adatbázison (válasz-gyorsítótár nélkül, hogy a teljes
+    # útvonal mérődjön), párhuzamos kliensek véletlen GET /measurements/{id} kérésekkel.
+    port = ctx.args.port
+    server = start_server(ctx.db_path, port, {"RESPONSE_CACHE_BYTES": "0"})
+    limits = httpx.Limits(max_connections=ctx.args.clients, max_keepalive_connections=ctx.args.clients)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120) as client:
+            await wait_until_ready(client)
+            # Bemelegítés: kapcsolatok, import- és lekérdezés-gyorsítótárak.
+            await run_clients(client, ctx.measurement_ids, ctx.args.clients, 1)
+            latencies, errors, elapsed = await run_clients(
+                client, ctx.measurement_ids, ctx.args.clients, ctx.args.requests
+            )
+    finally:
+        server.terminate()
+        server.wait()
+    p50, p99 = np.percentile(latencies, [50, 99])
+    return {
+        "p50_s": {"value": float(p50), "unit": "s", "better": "lower"},
+        "p99_s": {"value": float(p99), "unit": "s", "better": "lower"},
+        "throughput": rate(len(latencies) / elapsed, "req/s"),
+        "errors": {"value": errors, "unit": "count", "better": "lower"},
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=pathlib.Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current, threshold):
+    # (név, mérőszám, régi, új, változás, regresszió-e) sorok a mindkét futásban
+    # meglévő mérésekre. Ismételt időméréseknél a minimum a kevésbé zajos.
+    rows = []
+    for name, metrics in current["results"].items():
+        for metric, result in metrics.items():
+            old = baseline["results"].get(name, {}).get(metric)
+            if old is None:
+                continue
+            key = "min" if "min" in result and "min" in old else "value"
+            before, after = old[key], result[key]
+            if before:
+                change = after / before - 1
+            else:
+                change = 0.0 if after == before else float("inf") * (1 if after > before else -1)
+            worse = change if result["better"] == "lower" else -change
+            rows.append((name, metric, before, after, change, worse > threshold))
+    return rows
+
+
+async def run(args, names):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = pathlib.Path(tmp) / "bench.db"
+        start = time.perf_counter()
+        dataset = await build(db_path, args.scale)
+        print(f"dataset {args.scale} {SCALES[args.scale]} built in {time.perf_counter() - start:.1f}s")
+        ctx = Context(db_path, dataset, args.scale, args.repeat, args)
+        results = {}
+        for name in names:
+            start = time.perf_counter()
+            results[name] = await BENCHMARKS[name](ctx)
+            print(f"{name} done in {time.perf_counter() - start:.1f}s")
+            for metric, result in results[name].items():
+                print(f"  {metric:<24} {result['value']:.6g} {result['unit']}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="csak ezek a benchmarkok")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=10, help="kérések száma kliensenként (api.e2e)")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--output", type=pathlib.Path, help="alapértelmezés: benchmarks/results/<scale>-<idő>.json")
+    parser.add_argument("--baseline", type=pathlib.Path, help="korábbi eredményfájl az összevetéshez")
+    parser.add_argument("--threshold", type=float, default=0.25, help="megengedett romlás aránya (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    names = args.only or list(BENCHMARKS)
+    current = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "scale": args.scale,
+            "dataset": dict(zip(("users", "measurements", "points"), SCALES[args.scale])),
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": asyncio.run(run(args, names)),
+    }
+
+    output = args.output or RESULTS_DIR / f"{args.scale}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(current, indent=2))
+    print(f"results written to {output}")
+
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline["meta"].get("scale") != args.scale:
+            print(f"warning: baseline scale {baseline['meta'].get('scale')} != {args.scale}")
+        regressions = 0
+        for name, metric, old, new, change, regressed in compare(baseline, current, args.threshold):
+            regressions += regressed
+            flag = "REGRESSION" if regressed else ""
+            print(f"{name:<22} {metric:<24} {old:>12.6g} -> {new:>12.6g} {change:>+8.1%} {flag}")
+        if regressions:
+            print(f"{regressions} regression(s) above {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,103 +1,624 @@
+import asyncio
+import json
 import logging
-from fastapi import FastAPI, HTTPException, Depends
-from sqlalchemy.orm import Session
+import os
+import sys
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, FastAPI, HTTPException, Depends, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.database import Base, engine, get_db
-from app.schemas import UserCreateDTO, MeasurementCreateDTO
-from app import crud
-from app.soup import scrape_books_toscrape
+from app.database import async_engine, engine, get_db
+from app.migrations import upgrade_schema
+from app.schemas import UserCreateDTO, MeasurementCreateDTO, MeasurementColumnsDTO, MeasurementBatchGetDTO
+from app import analytics, compression, crud, formats, metrics, sampling, spatial, uploads
+from app.points import columns_to_array, points_to_dicts
+from app.scrape_cache import page_cache
+from app.jobs import JobQueueFull, job_manager
+from app.response_cache import etag_matches, response_cache
+import app.invalidation  # noqa: F401 - a törlési hookok regisztrálása
+
+# A scraper (bs4, httpx, tenacity) csak az első scrape/sync kérésnél töltődik be,
+# így a munkások indulása és a tesztek importja nem fizeti meg az árát.
 
-logging.basicConfig(level=logging.INFO, 
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
-Base.metadata.create_all(engine)
+# Induláskor a munkás maga frissíti a sémát, és hibásnak jelöli az előző futásból
+# befejezetlenül maradt feladatokat. Több munkásnál ez versenyhelyzet (és egy később
+# induló munkás a többiek feladatait is lezárná), ezért ott egyszer, előre fut
+# (python -m run.serve, vagy python -m app.migrations schema és python -m app.jobs
+# recover), a munkások pedig DB_AUTO_MIGRATE=0 mellett indulnak.
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "1").lower() in ("1", "true", "yes", "on")
+
+router = APIRouter()
+metrics.REGISTRY.register_collector("multibead_response_cache", "Válasz-gyorsítótár statisztika.", response_cache.snapshot)
+metrics.REGISTRY.register_collector("multibead_scrape_cache", "Scrape gyorsítótár statisztika.", page_cache.snapshot)
+metrics.REGISTRY.register_collector("multibead_spatial_cache", "KD-fa gyorsítótár statisztika.", spatial.snapshot)
+
+
+def configure_logging():
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+
+@asynccontextmanager
+async def lifespan(app):
+    configure_logging()
+    if DB_AUTO_MIGRATE:
+        upgrade_schema(engine)
+        await job_manager.recover()
+    yield
+    await job_manager.shutdown()
+    # A scraper lustán töltődik be; ha be sem töltődött, folyamatkészlete sincs.
+    soup = sys.modules.get("app.soup")
+    if soup is not None:
+        await asyncio.to_thread(soup.shutdown_parse_executor)
+    await async_engine.dispose()
 
 
-@app.post("/users/")
-async def create_user(user: UserCreateDTO, db: Session = Depends(get_db)):
+def create_app():
+    # Alkalmazásgyár: uvicorn run.backend:create_app --factory, ill. gunicorn
+    # "run.backend:create_app()". Mellékhatás (séma, naplózás) csak a lifespanben van.
+    app = FastAPI(lifespan=lifespan)
+    # A tömörítés belül van, így a metrikák a kimenő (tömörített) méretet és időt mérik.
+    app.add_middleware(compression.CompressionMiddleware)
+    app.add_middleware(metrics.MetricsMiddleware)
+    app.include_router(router)
+    return app
 
-    logger.info(f"Kérés érkezett új felhasználó létrehozására: {user.name}")
+
+# A csővezetékes scrape lekérdezésben megadható munkásszámainak felső korlátja.
+MAX_SCRAPE_WORKERS = 32
+# A tárolt könyvek lekérdezésének legnagyobb oldalmérete.
+MAX_BOOKS_LIMIT = 1000
+# A 2D hisztogram tengelyenkénti legnagyobb osztályszáma.
+MAX_HISTOGRAM_BINS = 1000
+# Egy batch-get kérésben legfeljebb ennyi mérés kérhető.
+MAX_BATCH_IDS = 1000
+# A legközelebbi pontok lekérdezésében megadható k felső korlátja.
+MAX_NEAREST_K = 1000
+
+
+@router.post("/users/")
+async def create_user(user: UserCreateDTO, db: AsyncSession = Depends(get_db)):
+
+    logger.info("Kérés érkezett új felhasználó létrehozására: %s", user.name)
     try:
         new_user = await crud.create_user(db, user) 
-        logger.info(f"Sikeresen létrehozva a felhasználó, ID: {new_user.id}")
+        logger.info("Sikeresen létrehozva a felhasználó, ID: %s", new_user.id)
         return {"id": new_user.id}
     except SQLAlchemyError as e:
-        logger.error(f"Adatbázis hiba történt a felhasználó létrehozása közben: {e}")
+        logger.error("Adatbázis hiba történt a felhasználó létrehozása közben: %s", e)
         raise HTTPException(status_code=500, detail="Hiba történt az adatbázis művelet során.")
     except Exception as e:
-        logger.error(f"Váratlan hiba történt a felhasználó létrehozása közben: {e}")
+        logger.error("Váratlan hiba történt a felhasználó létrehozása közben: %s", e)
         raise HTTPException(status_code=500, detail="Belső szerverhiba.")
 
 
 
-@app.post("/measurements/")
+@router.post("/measurements/")
 async def add_measurement(
     user_id: int,
     measurement: MeasurementCreateDTO,
-    db: Session = Depends(get_db)
+    bulk: bool = False,
+    chunk_size: int = crud.BULK_INSERT_CHUNK_SIZE,
+    db: AsyncSession = Depends(get_db)
 ):
-    logger.info(f"Kérés érkezett mérés hozzáadására a(z) {user_id} felhasználóhoz.")
+    logger.info("Kérés érkezett mérés hozzáadására a(z) %s felhasználóhoz.", user_id)
+    if chunk_size < 1:
+        logger.warning("Érvénytelen csomagméret: 0 vagy negatív.")
+        raise HTTPException(status_code=400, detail="A csomagméret (chunk_size) legalább 1 kell, hogy legyen.")
+
     try:
-        new_measurement = await crud.add_measurement(db, user_id, measurement)
-        logger.info(f"Sikeresen hozzáadva a mérés, ID: {new_measurement.id}, felhasználó: {user_id}")
+        if bulk or crud.POINT_STORAGE == crud.STORAGE_BLOB:
+            new_measurement = await crud.add_measurement_bulk(db, user_id, measurement, chunk_size=chunk_size)
+            points = measurement.points
+        else:
+            new_measurement = await crud.add_measurement(db, user_id, measurement)
+            points = new_measurement.points
+        logger.info("Sikeresen hozzáadva a mérés, ID: %s, felhasználó: %s", new_measurement.id, user_id)
 
         return {
             "id": new_measurement.id,
             "user_id": new_measurement.user_id,
-            "points": [{"x": p.x, "y": p.y} for p in new_measurement.points]
+            "points": [{"x": p.x, "y": p.y} for p in points]
         }
     except SQLAlchemyError as e:
-        logger.error(f"Adatbázis hiba a mérés hozzáadása közben (User ID: {user_id}): {e}")
+        logger.error("Adatbázis hiba a mérés hozzáadása közben (User ID: %s): %s", user_id, e)
+        raise HTTPException(status_code=500, detail="Hiba történt az adatbázis művelet során.")
+    except Exception as e:
+        logger.error("Váratlan hiba a mérés hozzáadása közben (User ID: %s): %s", user_id, e)
+        raise HTTPException(status_code=500, detail="Belső szerverhiba.")
+
+
+
+@router.post("/measurements/columns")
+async def add_measurement_columns(
+    user_id: int,
+    measurement: MeasurementColumnsDTO,
+    chunk_size: int = crud.BULK_INSERT_CHUNK_SIZE,
+    db: AsyncSession = Depends(get_db)
+):
+    # Oszlopos bemenet és válasz ({"x": [...], "y": [...]}); a pontok NumPy
+    # tömbként, pontonkénti modellek nélkül kerülnek a bulk útvonalra.
+    logger.info("Kérés érkezett oszlopos mérés hozzáadására a(z) %s felhasználóhoz.", user_id)
+    if chunk_size < 1:
+        logger.warning("Érvénytelen csomagméret: 0 vagy negatív.")
+        raise HTTPException(status_code=400, detail="A csomagméret (chunk_size) legalább 1 kell, hogy legyen.")
+
+    try:
+        if await crud.get_user(db, user_id) is None:
+            logger.warning("A(z) %s felhasználó nem található.", user_id)
+            raise HTTPException(status_code=404, detail="User not found")
+        xy = columns_to_array(measurement.x, measurement.y)
+        new_measurement = await crud.add_measurement_array(db, user_id, xy, chunk_size=chunk_size)
+        logger.info("Sikeresen hozzáadva a mérés, ID: %s, felhasználó: %s", new_measurement.id, user_id)
+        return _measurement_columns(new_measurement, xy)
+    except SQLAlchemyError as e:
+        logger.error("Adatbázis hiba a mérés hozzáadása közben (User ID: %s): %s", user_id, e)
         raise HTTPException(status_code=500, detail="Hiba történt az adatbázis művelet során.")
     except Exception as e:
-        logger.error(f"Váratlan hiba a mérés hozzáadása közben (User ID: {user_id}): {e}")
+        if isinstance(e, HTTPException):
+            raise e
+        logger.error("Váratlan hiba a mérés hozzáadása közben (User ID: %s): %s", user_id, e)
+        raise HTTPException(status_code=500, detail="Belső szerverhiba.")
+
+
+@router.post("/measurements/upload")
+async def upload_measurement(
+    user_id: int,
+    request: Request,
+    format: Optional[str] = None,
+    chunk_size: int = crud.BULK_INSERT_CHUNK_SIZE,
+    db: AsyncSession = Depends(get_db)
+):
+    # A törzs (nyers CSV/TXT, .npy vagy bináris, illetve multipart/form-data fájl)
+    # folyamként érkezik: olvasás közben blokkonként feldolgozva, a végén beszúrva.
+    logger.info("Kérés érkezett mérésfájl feltöltésére a(z) %s felhasználóhoz.", user_id)
+    if chunk_size < 1:
+        logger.warning("Érvénytelen csomagméret: 0 vagy negatív.")
+        raise HTTPException(status_code=400, detail="A csomagméret (chunk_size) legalább 1 kell, hogy legyen.")
+    if format is not None and format not in uploads.UPLOAD_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Ismeretlen feltöltési formátum: {format}")
+
+    content_type = request.headers.get("content-type", "")
+    try:
+        if await crud.get_user(db, user_id) is None:
+            logger.warning("A(z) %s felhasználó nem található.", user_id)
+            raise HTTPException(status_code=404, detail="User not found")
+
+        chunks, filename = request.stream(), None
+        if content_type.lower().startswith("multipart/form-data"):
+            boundary = uploads.header_params(content_type).get("boundary")
+            if not boundary:
+                raise HTTPException(status_code=400, detail="Hiányzó multipart határoló (boundary).")
+            filename, content_type, chunks = await uploads.open_multipart_file(chunks, boundary)
+        parse = uploads.PARSERS[format or uploads.detect_format(filename, content_type)]
+
+        measurement, count = await crud.add_measurement_stream(db, user_id, parse(chunks), chunk_size)
+        logger.info("Sikeresen feltöltve a(z) %s mérés, %s pont, felhasználó: %s", measurement.id, count, user_id)
+        return {"id": measurement.id, "user_id": user_id, "count": count}
+    except ValueError as e:
+        await db.rollback()
+        logger.warning("Hibás feltöltött fájl (User ID: %s): %s", user_id, e)
+        raise HTTPException(status_code=400, detail=f"Hibás fájl: {e}")
+    except SQLAlchemyError as e:
+        logger.error("Adatbázis hiba a mérésfájl feltöltése közben (User ID: %s): %s", user_id, e)
+        raise HTTPException(status_code=500, detail="Hiba történt az adatbázis művelet során.")
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
+        logger.error("Váratlan hiba a mérésfájl feltöltése közben (User ID: %s): %s", user_id, e)
         raise HTTPException(status_code=500, detail="Belső szerverhiba.")
 
 
+@router.get("/measurements/{measurement_id}")
+async def get_measurement(
+    measurement_id: int,
+    request: Request,
+    format: Optional[str] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    cursor: Optional[int] = None,
+    x_min: Optional[float] = None,
+    x_max: Optional[float] = None,
+    max_points: Optional[int] = None,
+    downsample: str = "lttb",
+    db: AsyncSession = Depends(get_db)
+):
+    logger.info("Kérés érkezett a(z) %s mérés lekérdezésére.", measurement_id)
+    media_type = formats.negotiate(request.headers.get("accept"), format)
+    if media_type is None:
+        logger.warning("Nem támogatott válaszformátum a(z) %s méréshez.", measurement_id)
+        raise HTTPException(status_code=406, detail="Nem támogatott válaszformátum.")
+    _validate_point_window(offset, limit, cursor, x_min, x_max, max_points, downsample)
+    window = {"x_min": x_min, "x_max": x_max, "cursor": cursor, "offset": offset, "limit": limit}
+
+    # Read-through gyorsítótár: találatnál nincs adatbázis-lekérdezés.
+    cache_key = (measurement_id, media_type, *window.values(), max_points, downsample)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return _cached_response(request, cache_key, cached)
+    generation = response_cache.generation
 
-@app.get("/measurements/{measurement_id}")
-async def get_measurement(measurement_id: int, db: Session = Depends(get_db)):
-    logger.info(f"Kérés érkezett a(z) {measurement_id} mérés lekérdezésére.")
     try:
         measurement = await crud.get_measurement(db, measurement_id)
 
         if not measurement:
-            logger.warning(f"A(z) {measurement_id} mérés nem található.")
+            logger.warning("A(z) %s mérés nem található.", measurement_id)
             raise HTTPException(status_code=404, detail="Measurement not found")
 
-        logger.info(f"Sikeresen lekérdezve a(z) {measurement_id} mérés.")
-        return {
+        if media_type != formats.JSON:
+            logger.info("A(z) %s mérés folyamként küldve (%s).", measurement_id, media_type)
+            if max_points is None:
+                chunks = crud.iter_point_chunks(db, measurement, **window)
+            else:
+                xy = await crud.get_points(db, measurement, **window)
+                chunks = _single_chunk(_downsample(xy, max_points, downsample))
+            encode = formats.ENCODERS[media_type]
+            headers = {
+                "X-Measurement-Id": str(measurement.id),
+                "X-User-Id": str(measurement.user_id),
+                "Vary": "Accept",
+            }
+            # A folyam menet közben a gyorsítótárba is íródik; ETag csak a következő kéréstől van.
+            return StreamingResponse(
+                response_cache.tee(cache_key, encode(chunks), media_type, headers, generation),
+                media_type=media_type,
+                headers=headers
+            )
+
+        next_cursor = None
+        if limit is None:
+            xy = await crud.get_points(db, measurement, **window)
+        else:
+            keys, xy = await crud.get_points(db, measurement, **window, with_keys=True)
+            if len(keys) == limit:
+                next_cursor = int(keys[-1])
+        xy = _downsample(xy, max_points, downsample)
+
+        logger.info("Sikeresen lekérdezve a(z) %s mérés.", measurement_id)
+        body = {
             "id": measurement.id,
             "user_id": measurement.user_id,
-            "points": [{"x": p.x, "y": p.y} for p in measurement.points]
+            "points": points_to_dicts(xy)
         }
+        if limit is not None:
+            body["next_cursor"] = next_cursor
+        entry = response_cache.put(cache_key, JSONResponse(body).body, formats.JSON, {"Vary": "Accept"}, generation)
+        return _cached_response(request, cache_key, entry)
     except SQLAlchemyError as e:
-        logger.error(f"Adatbázis hiba a(z) {measurement_id} mérés lekérdezése közben: {e}")
+        logger.error("Adatbázis hiba a(z) %s mérés lekérdezése közben: %s", measurement_id, e)
         raise HTTPException(status_code=500, detail="Hiba történt az adatbázis művelet során.")
     except Exception as e:
         if isinstance(e, HTTPException):
             raise e
-        logger.error(f"Váratlan hiba a mérés lekérdezése közben (ID: {measurement_id}): {e}")
+        logger.error("Váratlan hiba a mérés lekérdezése közben (ID: %s): %s", measurement_id, e)
         raise HTTPException(status_code=500, detail="Belső szerverhiba.")
 
-@app.get("/scrape_books/")
-def get_scraped_books(pages: int = 1):
-    logger.info(f"Kérés érkezett könyvek lekaparására {pages} oldalról.")
-    if pages < 1:
-        logger.warning("Érvénytelen lapok száma: 0 vagy negatív.")
-        raise HTTPException(status_code=400, detail="A lapok száma (pages) legalább 1 kell, hogy legyen.")
-        
+@router.delete("/measurements/{measurement_id}")
+async def delete_measurement(measurement_id: int, db: AsyncSession = Depends(get_db)):
+    logger.info("Kérés érkezett a(z) %s mérés törlésére.", measurement_id)
+    try:
+        deleted = await crud.delete_measurement(db, measurement_id)
+    except SQLAlchemyError as e:
+        logger.error("Adatbázis hiba a(z) %s mérés törlése közben: %s", measurement_id, e)
+        raise HTTPException(status_code=500, detail="Hiba történt az adatbázis művelet során.")
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Measurement not found")
+    logger.info("A(z) %s mérés törölve.", measurement_id)
+    return {"id": measurement_id, "deleted": True}
+
+
+@router.delete("/users/{user_id}")
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
+    logger.info("Kérés érkezett a(z) %s felhasználó törlésére.", user_id)
+    try:
+        deleted = await crud.delete_user(db, user_id)
+    except SQLAlchemyError as e:
+        logger.error("Adatbázis hiba a(z) %s felhasználó törlése közben: %s", user_id, e)
+        raise HTTPException(status_code=500, detail="Hiba történt az adatbázis művelet során.")
+    if not deleted:
+        raise HTTPException(status_code=404, detail="User not found")
+    logger.info("A(z) %s felhasználó és a mérései törölve.", user_id)
+    return {"id": user_id, "deleted": True}
+
+
+@router.get("/metrics")
+async def get_metrics():
+    # Prometheus szöveges formátum (text exposition 0.0.4).
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/cache/responses")
+async def get_response_cache_stats():
+    return response_cache.snapshot()
+
+
+def _cached_response(request, cache_key, entry):
+    # A tömörített változat is gyorsítótárba kerül, így találatkor nem kell újra tömöríteni.
+    encoding = compression.negotiate(request.headers.get("accept-encoding"))
+    if encoding is not None and len(entry.body) >= compression.COMPRESSION_MIN_BYTES:
+        entry = response_cache.encoded(cache_key, entry, encoding, compression.compress)
+    headers = {**entry.headers, "ETag": entry.etag}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        response_cache.stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type=entry.media_type, headers=headers)
+
+
+@router.get("/users/{user_id}/measurements")
+async def get_user_measurements(
+    user_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    logger.info("Kérés érkezett a(z) %s felhasználó méréseinek lekérdezésére.", user_id)
+    _validate_time_window(since, until)
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Az offset nem lehet negatív.")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="A limit legalább 1 kell, hogy legyen.")
+
     try:
-        book_list = scrape_books_toscrape(max_pages=pages)
+        if await crud.get_user(db, user_id) is None:
+            logger.warning("A(z) %s felhasználó nem található.", user_id)
+            raise HTTPException(status_code=404, detail="User not found")
+        measurements = await crud.get_measurements(db, user_id=user_id, since=since, until=until,
+                                                   offset=offset, limit=limit)
+        points = await crud.get_points_many(db, measurements)
+    except SQLAlchemyError as e:
+        logger.error("Adatbázis hiba a(z) %s felhasználó méréseinek lekérdezése közben: %s", user_id, e)
+        raise HTTPException(status_code=500, detail="Hiba történt az adatbázis művelet során.")
+
+    logger.info("Sikeresen lekérdezve %s mérés a(z) %s felhasználótól.", len(measurements), user_id)
+    return {
+        "user_id": user_id,
+        "count": len(measurements),
+        "measurements": [_measurement_columns(m, points[m.id]) for m in measurements]
+    }
+
+
+@router.post("/measurements/batch-get")
+async def batch_get_measurements(
+    request: MeasurementBatchGetDTO,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    ids = list(dict.fromkeys(request.ids))
+    logger.info("Kérés érkezett %s mérés együttes lekérdezésére.", len(ids))
+    _validate_time_window(since, until)
+    if len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"Egyszerre legfeljebb {MAX_BATCH_IDS} mérés kérhető le.")
+
+    try:
+        found = []
+        for start in range(0, len(ids), crud.MULTI_GET_BATCH_SIZE):
+            found += await crud.get_measurements(db, ids=ids[start:start + crud.MULTI_GET_BATCH_SIZE],
+                                                 since=since, until=until)
+        points = await crud.get_points_many(db, found)
+    except SQLAlchemyError as e:
+        logger.error("Adatbázis hiba a mérések együttes lekérdezése közben: %s", e)
+        raise HTTPException(status_code=500, detail="Hiba történt az adatbázis művelet során.")
+
+    # A válasz a kérés sorrendjét követi; a nem található (vagy időablakon kívüli) azonosítók külön listában.
+    by_id = {m.id: m for m in found}
+    return {
+        "count": len(by_id),
+        "measurements": [_measurement_columns(by_id[i], points[i]) for i in ids if i in by_id],
+        "missing": [i for i in ids if i not in by_id]
+    }
+
+
+def _validate_time_window(since, until):
+    if since is not None and until is not None and since > until:
+        raise HTTPException(status_code=400, detail="A since nem lehet későbbi, mint az until.")
+
+
+def _measurement_columns(measurement, xy):
+    # Oszlopos alak: pontonkénti {"x", "y"} objektumok helyett két tömb.
+    return {
+        "id": measurement.id,
+        "user_id": measurement.user_id,
+        "timestamp": measurement.timestamp.isoformat(),
+        "count": len(xy),
+        "x": xy[:, 0].tolist(),
+        "y": xy[:, 1].tolist()
+    }
+
+
+@router.get("/measurements/{measurement_id}/stats")
+async def get_measurement_stats(measurement_id: int, db: AsyncSession = Depends(get_db)):
+    logger.info("Kérés érkezett a(z) %s mérés statisztikáira.", measurement_id)
+    stats = analytics.cached(measurement_id, "stats")
+    if stats is None:
+        measurement, xy = await _load_points(db, measurement_id)
+        stats = analytics.remember(measurement_id, "stats", value={
+            "id": measurement.id,
+            "user_id": measurement.user_id,
+            **analytics.point_stats(xy)
+        })
+    return stats
+
+
+@router.get("/measurements/{measurement_id}/histogram2d")
+async def get_measurement_histogram2d(
+    measurement_id: int,
+    bins_x: int = 50,
+    bins_y: int = 50,
+    x_min: Optional[float] = None,
+    x_max: Optional[float] = None,
+    y_min: Optional[float] = None,
+    y_max: Optional[float] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    logger.info("Kérés érkezett a(z) %s mérés 2D hisztogramjára.", measurement_id)
+    if not (1 <= bins_x <= MAX_HISTOGRAM_BINS and 1 <= bins_y <= MAX_HISTOGRAM_BINS):
+        raise HTTPException(status_code=400, detail=f"A bins_x és bins_y értéke 1 és {MAX_HISTOGRAM_BINS} között lehet.")
+
+    params = (bins_x, bins_y, x_min, x_max, y_min, y_max)
+    histogram = analytics.cached(measurement_id, "histogram2d", *params)
+    if histogram is None:
+        measurement, xy = await _load_points(db, measurement_id)
+        try:
+            result = analytics.histogram2d(xy, bins_x, bins_y, (x_min, x_max), (y_min, y_max))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Érvénytelen hisztogram tartomány: a minimum nagyobb a maximumnál.")
+        histogram = analytics.remember(measurement_id, "histogram2d", *params, value={
+            "id": measurement.id,
+            "user_id": measurement.user_id,
+            **result
+        })
+    return histogram
+
+
+@router.get("/measurements/{measurement_id}/points/within")
+async def get_points_within(
+    measurement_id: int,
+    x_min: Optional[float] = None,
+    x_max: Optional[float] = None,
+    y_min: Optional[float] = None,
+    y_max: Optional[float] = None,
+    x: Optional[float] = None,
+    y: Optional[float] = None,
+    radius: Optional[float] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    # Téglalap (x_min, x_max, y_min, y_max) vagy kör (x, y, radius) a pontok tárolási sorrendjében.
+    logger.info("Kérés érkezett a(z) %s mérés pontjaira egy tartományon belül.", measurement_id)
+    box = (x_min, x_max, y_min, y_max)
+    circle = (x, y, radius)
+    if all(v is not None for v in box) and all(v is None for v in circle):
+        if x_min > x_max or y_min > y_max:
+            raise HTTPException(status_code=400, detail="A minimum nem lehet nagyobb a maximumnál.")
+    elif all(v is not None for v in circle) and all(v is None for v in box):
+        if radius < 0:
+            raise HTTPException(status_code=400, detail="A radius nem lehet negatív.")
+        box = (x - radius, x + radius, y - radius, y + radius)
+    else:
+        raise HTTPException(status_code=400, detail="Vagy x_min, x_max, y_min, y_max, vagy x, y, radius adható meg.")
+
+    measurement = await _get_measurement_or_404(db, measurement_id)
+    tree = spatial.cached_tree(measurement_id)
+    if tree is not None:
+        _, xy = tree.within_box(*box) if radius is None else tree.within_radius(x, y, radius)
+        return _measurement_columns(measurement, xy)
+
+    # Fa nélkül a téglalapot az adatbázis (sor-tárolásnál a (measurement_id, cell)
+    # index) szűri; a fát csak a kNN építi fel, a drága építés itt nem éri meg.
+    try:
+        xy = await crud.get_points_in_box(db, measurement, *box)
+    except SQLAlchemyError as e:
+        logger.error("Adatbázis hiba a(z) %s mérés pontjainak szűrése közben: %s", measurement_id, e)
+        raise HTTPException(status_code=500, detail="Hiba történt az adatbázis művelet során.")
+    if radius is not None:
+        dx, dy = xy[:, 0] - x, xy[:, 1] - y
+        xy = xy[dx * dx + dy * dy <= radius * radius]
+    return _measurement_columns(measurement, xy)
+
+
+@router.get("/measurements/{measurement_id}/points/nearest")
+async def get_nearest_points(measurement_id: int, x: float, y: float, k: int = 1, db: AsyncSession = Depends(get_db)):
+    logger.info("Kérés érkezett a(z) %s mérés (%s, %s) ponthoz legközelebbi %s pontjára.", measurement_id, x, y, k)
+    if not 1 <= k <= MAX_NEAREST_K:
+        raise HTTPException(status_code=400, detail=f"A k értéke 1 és {MAX_NEAREST_K} között lehet.")
+
+    measurement = await _get_measurement_or_404(db, measurement_id)
+    tree = spatial.cached_tree(measurement_id)
+    if tree is None:
+        tree = await _build_tree(db, measurement)
+    index, xy, distance = tree.nearest(x, y, k)
+    return {
+        **_measurement_columns(measurement, xy),
+        "index": index.tolist(),
+        "distance": distance.tolist()
+    }
+
+
+async def _build_tree(db, measurement):
+    # A fa építése CPU-igényes, ezért külön szálon fut, hogy az eseményhurok ne álljon.
+    try:
+        xy = await crud.get_points(db, measurement)
+    except SQLAlchemyError as e:
+        logger.error("Adatbázis hiba a(z) %s mérés pontjainak betöltése közben: %s", measurement.id, e)
+        raise HTTPException(status_code=500, detail="Hiba történt az adatbázis művelet során.")
+    return spatial.remember_tree(measurement.id, await asyncio.to_thread(spatial.KDTree, xy))
+
+
+async def _get_measurement_or_404(db, measurement_id):
+    try:
+        measurement = await crud.get_measurement(db, measurement_id)
+    except SQLAlchemyError as e:
+        logger.error("Adatbázis hiba a(z) %s mérés lekérdezése közben: %s", measurement_id, e)
+        raise HTTPException(status_code=500, detail="Hiba történt az adatbázis művelet során.")
+    if not measurement:
+        logger.warning("A(z) %s mérés nem található.", measurement_id)
+        raise HTTPException(status_code=404, detail="Measurement not found")
+    return measurement
+
+
+async def _load_points(db, measurement_id):
+    try:
+        measurement = await crud.get_measurement(db, measurement_id)
+        if not measurement:
+            logger.warning("A(z) %s mérés nem található.", measurement_id)
+            raise HTTPException(status_code=404, detail="Measurement not found")
+        return measurement, await crud.get_points(db, measurement)
+    except SQLAlchemyError as e:
+        logger.error("Adatbázis hiba a(z) %s mérés pontjainak betöltése közben: %s", measurement_id, e)
+        raise HTTPException(status_code=500, detail="Hiba történt az adatbázis művelet során.")
+
+
+def _validate_point_window(offset, limit, cursor, x_min, x_max, max_points, downsample):
+    if offset < 0 or (cursor is not None and cursor < 0):
+        raise HTTPException(status_code=400, detail="Az offset és a cursor nem lehet negatív.")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="A limit legalább 1 kell, hogy legyen.")
+    if x_min is not None and x_max is not None and x_min > x_max:
+        raise HTTPException(status_code=400, detail="Az x_min nem lehet nagyobb, mint az x_max.")
+    if max_points is not None and max_points < 3:
+        raise HTTPException(status_code=400, detail="A max_points legalább 3 kell, hogy legyen.")
+    if downsample not in sampling.METHODS:
+        raise HTTPException(status_code=400, detail=f"Ismeretlen ritkítási eljárás: {downsample}.")
+
+
+def _downsample(xy, max_points, method):
+    if max_points is None or len(xy) <= max_points:
+        return xy
+    return xy[sampling.METHODS[method](xy[:, 0], xy[:, 1], max_points)]
+
+
+async def _single_chunk(xy):
+    yield xy
+
+
+@router.get("/scrape_books/")
+async def get_scraped_books(pages: int = 1, fetch_workers: Optional[int] = None,
+                            parse_workers: Optional[int] = None):
+    logger.info("Kérés érkezett könyvek lekaparására %s oldalról.", pages)
+    _validate_scrape_params(pages, fetch_workers, parse_workers)
+    from app.soup import scrape_books_toscrape
+
+    try:
+        if fetch_workers is None and parse_workers is None:
+            book_list = await scrape_books_toscrape(max_pages=pages)
+        else:
+            book_list = await scrape_books_toscrape(
+                max_pages=pages, fetch_workers=fetch_workers, parse_workers=parse_workers
+            )
         
         if not book_list:
-            logger.error(f"Nem sikerült adatokat kinyerni {pages} oldalról.")
+            logger.error("Nem sikerült adatokat kinyerni %s oldalról.", pages)
             raise HTTPException(status_code=503, detail="Nem sikerült adatokat kinyerni a forrásoldalról.")
             
-        logger.info(f"Sikeresen lekaparva {len(book_list)} könyv {pages} oldalról.")
+        logger.info("Sikeresen lekaparva %s könyv %s oldalról.", len(book_list), pages)
         return {
             "count": len(book_list),
             "books": book_list
@@ -105,5 +626,164 @@ def get_scraped_books(pages: int = 1):
     except HTTPException as e:
         raise e
     except Exception as e:
-        logger.error(f"Kivétel a webkaparás során {pages} oldalon: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Hiba történt a webkaparás végrehajtása közben.")
\ No newline at end of file
+        logger.error("Kivétel a webkaparás során %s oldalon: %s", pages, e, exc_info=True)
+        raise HTTPException(status_code=500, detail="Hiba történt a webkaparás végrehajtása közben.")
+
+
+@router.get("/scrape_books/stream")
+async def stream_scraped_books(pages: int = 1, fetch_workers: Optional[int] = None,
+                               parse_workers: Optional[int] = None):
+    logger.info("Kérés érkezett könyvek folyamatos lekaparására %s oldalról.", pages)
+    _validate_scrape_params(pages, fetch_workers, parse_workers)
+    from app.soup import iter_books_toscrape
+    return StreamingResponse(
+        _encode_books(iter_books_toscrape(max_pages=pages, fetch_workers=fetch_workers, parse_workers=parse_workers)),
+        media_type=formats.NDJSON,
+    )
+
+
+def _validate_scrape_params(pages, fetch_workers, parse_workers):
+    if pages < 1:
+        logger.warning("Érvénytelen lapok száma: 0 vagy negatív.")
+        raise HTTPException(status_code=400, detail="A lapok száma (pages) legalább 1 kell, hogy legyen.")
+    if fetch_workers is not None and not 1 <= fetch_workers <= MAX_SCRAPE_WORKERS:
+        raise HTTPException(status_code=400, detail=f"A fetch_workers értéke 1 és {MAX_SCRAPE_WORKERS} között lehet.")
+    if parse_workers is not None and not 0 <= parse_workers <= MAX_SCRAPE_WORKERS:
+        raise HTTPException(status_code=400, detail=f"A parse_workers értéke 0 és {MAX_SCRAPE_WORKERS} között lehet.")
+
+
+async def _encode_books(pages):
+    # Soronként egy könyv a lapszámmal; a fejlécek már elmentek, ezért a hiba
+    # egy utolsó {"error": ...} sorként jelenik meg.
+    try:
+        async for page, books in pages:
+            if books:
+                yield "".join(json.dumps({"page": page, **book}) + "\n" for book in books)
+    except Exception as e:
+        logger.error("Kivétel a folyamatos webkaparás során: %s", e, exc_info=True)
+        yield json.dumps({"error": "Hiba történt a webkaparás végrehajtása közben."}) + "\n"
+
+
+@router.get("/scrape_books/cache")
+async def get_scrape_cache_stats():
+    return page_cache.snapshot()
+
+
+@router.post("/books/sync")
+async def sync_scraped_books(pages: int = 1, db: AsyncSession = Depends(get_db)):
+    logger.info("Kérés érkezett a tárolt könyvek frissítésére %s oldalról.", pages)
+    _validate_scrape_params(pages, None, None)
+    from app.book_sync import sync_books
+    try:
+        stats = await sync_books(db, max_pages=pages)
+    except SQLAlchemyError as e:
+        logger.error("Adatbázis hiba a könyvek mentése közben: %s", e)
+        raise HTTPException(status_code=500, detail="Hiba történt az adatbázis művelet során.")
+    logger.info("Könyvek frissítve: %s", stats)
+    return stats
+
+
+@router.get("/books/")
+async def get_books(
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_rating: Optional[int] = None,
+    max_rating: Optional[int] = None,
+    offset: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db)
+):
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Az offset nem lehet negatív.")
+    if not 1 <= limit <= MAX_BOOKS_LIMIT:
+        raise HTTPException(status_code=400, detail=f"A limit értéke 1 és {MAX_BOOKS_LIMIT} között lehet.")
+    for rating in (min_rating, max_rating):
+        if rating is not None and not 1 <= rating <= 5:
+            raise HTTPException(status_code=400, detail="Az értékelés (min_rating, max_rating) 1 és 5 között lehet.")
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(status_code=400, detail="A min_price nem lehet nagyobb a max_price értékénél.")
+
+    books = await crud.query_books(db, min_price, max_price, min_rating, max_rating, offset, limit)
+    return {
+        "count": len(books),
+        "books": [
+            {"url": b.url, "title": b.title, "price": b.price, "stock": b.stock, "rating": b.rating}
+            for b in books
+        ]
+    }
+
+
+@router.post("/jobs/scrape", status_code=202)
+async def submit_scrape_job(pages: int = 1, fetch_workers: Optional[int] = None,
+                            parse_workers: Optional[int] = None):
+    _validate_scrape_params(pages, fetch_workers, parse_workers)
+    return await _submit_job("scrape", {"pages": pages, "fetch_workers": fetch_workers, "parse_workers": parse_workers})
+
+
+@router.post("/jobs/sync", status_code=202)
+async def submit_sync_job(pages: int = 1):
+    _validate_scrape_params(pages, None, None)
+    return await _submit_job("sync", {"pages": pages})
+
+
+@router.post("/jobs/measurements", status_code=202)
+async def submit_ingest_job(user_id: int, measurement: MeasurementCreateDTO,
+                            chunk_size: int = crud.BULK_INSERT_CHUNK_SIZE,
+                            db: AsyncSession = Depends(get_db)):
+    if chunk_size < 1:
+        raise HTTPException(status_code=400, detail="A csomagméret (chunk_size) legalább 1 kell, hogy legyen.")
+    # A nem létező felhasználó azonnal 404, nem csak a háttérben elbukó feladat.
+    try:
+        user = await crud.get_user(db, user_id)
+    except SQLAlchemyError as e:
+        logger.error("Adatbázis hiba a(z) %s felhasználó ellenőrzése közben: %s", user_id, e)
+        raise HTTPException(status_code=500, detail="Hiba történt az adatbázis művelet során.")
+    if user is None:
+        logger.warning("A(z) %s felhasználó nem található.", user_id)
+        raise HTTPException(status_code=404, detail="User not found")
+    params = {"user_id": user_id, "points": len(measurement.points), "chunk_size": chunk_size}
+    return await _submit_job("ingest", params, payload=measurement, dedupe=False)
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="A feladat nem található.")
+    return job
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    # NDJSON: soronként egy állapot-pillanatkép (eredmény nélkül), a befejezésig.
+    if await job_manager.get(job_id, with_result=False) is None:
+        raise HTTPException(status_code=404, detail="A feladat nem található.")
+
+    async def events():
+        async for job in job_manager.watch(job_id):
+            yield json.dumps(job) + "\n"
+
+    return StreamingResponse(events(), media_type=formats.NDJSON)
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = await job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="A feladat nem található.")
+    logger.info("Feladat megszakítva: %s (%s)", job_id, job['status'])
+    return job
+
+
+async def _submit_job(kind, params, payload=None, dedupe=True):
+    try:
+        job = await job_manager.submit(kind, params, payload=payload, dedupe=dedupe)
+    except JobQueueFull:
+        logger.warning("A feladatsor megtelt, a(z) %s feladat visszautasítva.", kind)
+        raise HTTPException(status_code=503, detail="A feladatsor megtelt, próbálja újra később.")
+    logger.info("Feladat beküldve: %s (%s)", job['id'], kind)
+    return job
+
+
+# A "run.backend:app" célpont (uvicorn --reload, tesztek) továbbra is működik.
+app = create_app()
@@ -1,20 +1,80 @@
 import streamlit as st
 import requests
+from urllib3.util import make_headers
 import plotly.express as px
 import pandas as pd
 from dotenv import load_dotenv
 import os
 import pathlib
+import json
 
 
 env_path = pathlib.Path(__file__).parents[1] / ".env"
 load_dotenv(env_path)
 
 API_URL = os.getenv("API_URL")
+# A backend-válaszok gyorsítótárának élettartama (másodperc).
+FRONTEND_CACHE_TTL = int(os.getenv("FRONTEND_CACHE_TTL", "300"))
+# Ennél több pont felett WebGL (scattergl) rajzol SVG helyett.
+PLOT_WEBGL_THRESHOLD = int(os.getenv("PLOT_WEBGL_THRESHOLD", "5000"))
+# Ennél több pontot a backend ritkít (LTTB), mielőtt a böngészőbe kerülne.
+PLOT_MAX_POINTS = int(os.getenv("PLOT_MAX_POINTS", "50000"))
 
 
 st.set_page_config(page_title="Measurements & Scraper App", layout="centered")
 
+
+@st.cache_resource
+def get_session():
+    # Egyetlen, újrafuttatások között megosztott keep-alive kapcsolatkészlet.
+    # Az Accept-Encoding azokat a kódolásokat kéri, amelyeket az urllib3 ki tud
+    # csomagolni (gzip, deflate, és ha telepítve van, br és zstd).
+    session = requests.Session()
+    session.headers["Accept-Encoding"] = make_headers(accept_encoding=True)["accept-encoding"]
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_data(ttl=FRONTEND_CACHE_TTL, show_spinner=False)
+def fetch_measurement(measurement_id, max_points=None):
+    # A hibák nem kerülnek a gyorsítótárba (kivétel), a nem létező mérés igen (None).
+    params = {"max_points": max_points} if max_points else None
+    response = get_session().get(f"{API_URL}/measurements/{measurement_id}", params=params, timeout=30)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+
+@st.cache_data(ttl=FRONTEND_CACHE_TTL, show_spinner=False)
+def measurement_figure(measurement_id):
+    meas = fetch_measurement(measurement_id, PLOT_MAX_POINTS)
+    points = meas["points"]
+    fig = px.scatter(
+        x=[p["x"] for p in points],
+        y=[p["y"] for p in points],
+        title=f"Measurement {measurement_id} - Points",
+        labels={"x": "X Coordinate", "y": "Y Coordinate"},
+        render_mode="webgl" if len(points) > PLOT_WEBGL_THRESHOLD else "svg",
+    )
+    fig.update_traces(marker=dict(size=10 if len(points) <= PLOT_WEBGL_THRESHOLD else 3, color="red"))
+    fig.update_layout(height=500)
+    return fig
+
+
+@st.cache_data(ttl=FRONTEND_CACHE_TTL, show_spinner=False)
+def fetch_stored_books(min_price, max_price, min_rating):
+    response = get_session().get(
+        f"{API_URL}/books/",
+        params={"min_price": min_price, "max_price": max_price, "min_rating": min_rating, "limit": 1000},
+        timeout=30,
+    )
+    response.raise_for_status()
+    return response.json()["books"]
+
+
 st.title("📚 FastAPI + Streamlit App")
 
 
@@ -25,7 +85,7 @@ if st.button("Create User"):
     if username.strip() == "":
         st.error("Username cannot be empty.")
     else:
-        response = requests.post(f"{API_URL}/users/", json={"name": username})
+        response = get_session().post(f"{API_URL}/users/", json={"name": username})
         if response.status_code == 200:
             st.success(f"User created! ID: {response.json()['id']}")
         else:
@@ -43,18 +103,27 @@ points_raw = st.text_area(
     height=120
 )
 
-uploaded_file = st.file_uploader("Or upload a .txt file", type=["txt"])
+uploaded_file = st.file_uploader("Or upload a .txt/.csv or .npy file", type=["txt", "csv", "npy"])
 
 if st.button("Submit Measurement"):
     try:
         points = []
 
         if uploaded_file is not None:
-            content = uploaded_file.read().decode("utf-8")
-            lines = content.splitlines()
-        else:
-            lines = points_raw.splitlines()
+            # A fájlt a backend folyamként, blokkonként dolgozza fel és írja be.
+            response = get_session().post(
+                f"{API_URL}/measurements/upload",
+                params={"user_id": user_id},
+                files={"file": (uploaded_file.name, uploaded_file, uploaded_file.type)}
+            )
+            if response.status_code == 200:
+                body = response.json()
+                st.success(f"Measurement added! ID: {body['id']} ({body['count']} points)")
+            else:
+                st.error(f"Error: {response.text}")
+            st.stop()
 
+        lines = points_raw.splitlines()
         for line in lines:
             if "," not in line:
                 continue
@@ -65,7 +134,7 @@ if st.button("Submit Measurement"):
             st.error("No valid points found. Make sure the format is 'x,y'.")
             st.stop()
 
-        response = requests.post(
+        response = get_session().post(
             f"{API_URL}/measurements/",
             params={"user_id": user_id},
             json={"points": points}
@@ -85,30 +154,22 @@ st.header("🔍 Get Measurement by ID")
 measurement_id = st.number_input("Measurement ID", min_value=1, step=1, key="get_meas")
 
 if st.button("Get Measurement"):
-    response = requests.get(f"{API_URL}/measurements/{measurement_id}")
+    try:
+        meas = fetch_measurement(measurement_id, PLOT_MAX_POINTS)
+    except requests.exceptions.RequestException as e:
+        st.error(f"Error: {str(e)}")
+        st.stop()
 
-    if response.status_code == 200:
-        meas = response.json()
+    if meas is not None:
         st.success("Measurement found!")
-        st.json(meas)
-
         points = meas["points"]
+        if len(points) <= PLOT_WEBGL_THRESHOLD:
+            st.json(meas)
+        else:
+            st.caption(f"Showing {len(points)} points (larger measurements are downsampled to {PLOT_MAX_POINTS}).")
 
         if len(points) > 0:
-            x_vals = [p["x"] for p in points]
-            y_vals = [p["y"] for p in points]
-
-            fig = px.scatter(
-                x=x_vals,
-                y=y_vals,
-                title=f"Measurement {measurement_id} - Points",
-                labels={"x": "X Coordinate", "y": "Y Coordinate"},
-            )
-
-            fig.update_traces(marker=dict(size=10, color="red"))
-            fig.update_layout(height=500)
-
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(measurement_figure(measurement_id), use_container_width=True)
         else:
             st.info("No points to plot.")
     else:
@@ -127,42 +188,108 @@ pages_to_scrape = st.number_input(
     key="pages_scrape"
 )
 
+def render_books(books, table_slot, chart_slot):
+    df = pd.DataFrame(books)
+    df['price_numeric'] = df['price']
+
+    table_slot.dataframe(df.style.highlight_max(axis=0, subset=['price_numeric']), use_container_width=True)
+
+    fig = px.histogram(
+        df, 
+        x="price_numeric", 
+        color="rating", 
+        title="Price Distribution by Rating",
+        labels={"price_numeric": "Price (£)", "rating": "Rating"}
+    )
+    chart_slot.plotly_chart(fig, use_container_width=True)
+
+
 if st.button("Scrape Books"):
-    with st.spinner(f"Scraping {pages_to_scrape} pages..."):
-        try:
-            response = requests.get(f"{API_URL}/scrape_books/", params={"pages": pages_to_scrape}, timeout=30)
-            
+    status_slot = st.empty()
+    table_slot = st.empty()
+    chart_slot = st.empty()
+    try:
+        # Soronként érkeznek a könyvek; oldalanként frissül a táblázat és a hisztogram.
+        # A timeout (kapcsolódás, két sor közti várakozás), nem a teljes lekaparásé.
+        with get_session().get(
+            f"{API_URL}/scrape_books/stream",
+            params={"pages": pages_to_scrape},
+            stream=True,
+            timeout=(5, 30),
+        ) as response:
             if response.status_code == 200:
-                data = response.json()
-                books = data["books"]
-                count = data["count"]
-                
-                st.success(f"Successfully scraped {count} books from {pages_to_scrape} pages!")
-                
-                df = pd.DataFrame(books)
-                
-                df['price_numeric'] = df['price']
-                
-                st.dataframe(df.style.highlight_max(axis=0, subset=['price_numeric']), use_container_width=True)
-                
-                if count > 0:
-                    fig = px.histogram(
-                        df, 
-                        x="price_numeric", 
-                        color="rating", 
-                        title="Price Distribution by Rating",
-                        labels={"price_numeric": "Price (£)", "rating": "Rating"}
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
+                books = []
+                page_books = []
+                current_page = None
+                error = None
+                status_slot.info(f"Scraping {pages_to_scrape} pages...")
+
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    row = json.loads(line)
+                    if "error" in row:
+                        error = row["error"]
+                        break
+                    page = row.pop("page")
+                    if current_page is not None and page != current_page:
+                        books.extend(page_books)
+                        page_books = []
+                        render_books(books, table_slot, chart_slot)
+                        status_slot.info(f"Scraped {len(books)} books ({current_page}/{pages_to_scrape} pages)...")
+                    current_page = page
+                    page_books.append(row)
+
+                books.extend(page_books)
+                if books:
+                    render_books(books, table_slot, chart_slot)
+
+                if error:
+                    status_slot.error(f"Error: {error}")
+                elif books:
+                    status_slot.success(f"Successfully scraped {len(books)} books from {pages_to_scrape} pages!")
+                else:
+                    status_slot.error("Could not extract any books from the source site.")
 
             elif response.status_code == 400:
                    st.error(f"Error: {response.json().get('detail', 'Bad Request')}")
             else:
                 st.error(f"API Error ({response.status_code}): {response.text}")
 
-        except requests.exceptions.ConnectionError:
-            st.error(f"Connection Error: Could not connect to FastAPI at {API_URL}. Is the server running?")
-        except Exception as e:
-            st.error(f"An unexpected error occurred: {str(e)}")
+    except requests.exceptions.ConnectionError:
+        st.error(f"Connection Error: Could not connect to FastAPI at {API_URL}. Is the server running?")
+    except Exception as e:
+        st.error(f"An unexpected error occurred: {str(e)}")
+
+st.header("🗄️ Stored Books")
+
+if st.button("Sync Stored Books"):
+    try:
+        response = get_session().post(f"{API_URL}/books/sync", params={"pages": pages_to_scrape}, timeout=60)
+        if response.status_code == 200:
+            # A tárolt könyvek megváltozhattak.
+            fetch_stored_books.clear()
+            stats = response.json()
+            st.success(
+                f"Updated {stats['updated']} pages ({stats['books']} books), "
+                f"{stats['unchanged']} unchanged, {stats['failed']} failed."
+            )
+        else:
+            st.error(f"API Error ({response.status_code}): {response.text}")
+    except requests.exceptions.ConnectionError:
+        st.error(f"Connection Error: Could not connect to FastAPI at {API_URL}. Is the server running?")
+
+price_range = st.slider("Price range (£)", 0.0, 100.0, (0.0, 100.0), key="stored_price")
+min_rating = st.slider("Minimum rating", 1, 5, 1, key="stored_rating")
+
+if st.button("Show Stored Books"):
+    try:
+        books = fetch_stored_books(price_range[0], price_range[1], min_rating)
+        if books:
+            render_books(books, st.empty(), st.empty())
+        else:
+            st.info("No stored books match the filters.")
+    except requests.exceptions.RequestException as e:
+        st.error(f"API Error: {str(e)}")
 
 st.markdown("---")
\ No newline at end of file
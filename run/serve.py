@@ -0,0 +1,44 @@
+import argparse
+import asyncio
+import os
+
+import uvicorn
+
+from app.database import engine
+from app.jobs import recover_jobs
+from app.migrations import upgrade_schema
+
+# Többmunkás indítás: a séma egyszer, a szülőfolyamatban frissül, és itt záródnak
+# le az előző futásból befejezetlenül maradt feladatok is; a munkások az
+# alkalmazásgyárból indulnak, és ezeket már nem végzik el (DB_AUTO_MIGRATE=0).
+#
+#     python -m run.serve --workers 4 --port 8000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m run.serve")
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--skip-migrate", action="store_true", help="a séma frissítése kimarad")
+    args = parser.parse_args(argv)
+
+    if not args.skip_migrate:
+        upgrade_schema(engine)
+        engine.dispose()
+    asyncio.run(recover_jobs())
+    os.environ["DB_AUTO_MIGRATE"] = "0"
+
+    uvicorn.run(
+        "run.backend:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import pathlib
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app import analytics, crud, spatial
+from run.backend import app, get_db
+from app.database import Base, build_async_engine, build_engine
+from app.response_cache import response_cache
+
+
+# Valódi (ideiglenes) SQLite adatbázis a mockolt Session helyett. Az API
+# aszinkron sessiont kap, a migrációs tesztek szinkront ugyanarra a fájlra.
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "test.db"
+
+
+@pytest.fixture
+def db_engine(db_path):
+    engine = build_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_session(db_engine):
+    session = sessionmaker(bind=db_engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # Minden teszt új adatbázist kap, ahol az azonosítók újra 1-től indulnak, ezért
+    # a mérés-azonosító szerinti gyorsítótárak (válasz, statisztika, KD-fa) ürülnek.
+    response_cache.clear()
+    analytics.invalidate()
+    spatial.invalidate()
+    yield
+    response_cache.clear()
+    analytics.invalidate()
+    spatial.invalidate()
+
+
+@pytest.fixture
+def api(db_engine, db_path):
+    # A TestClient kérésenként új eseményhurkot indít, ezért kapcsolatkészlet nélkül.
+    async_engine = build_async_engine(f"sqlite:///{db_path}", poolclass=NullPool)
+    session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_get_db():
+        async with session_factory() as db:
+            yield db
+
+    previous = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides[get_db] = previous
+
+
+@pytest.fixture
+def create_measurement(api, monkeypatch):
+    # Mérés az oszlopos végponton át. Az xy N×2 tömb vagy {"x", "y"} pontlista,
+    # hiányában n_points véletlen pont; a storage a tárolási módot állítja be.
+    def create(xy=None, storage=None, n_points=2000, user_id=None):
+        if storage is not None:
+            monkeypatch.setattr(crud, "POINT_STORAGE", storage)
+        if user_id is None:
+            user_id = api.post("/users/", json={"name": "Teszt Elek"}).json()["id"]
+        if xy is None:
+            xy = np.random.default_rng(0).uniform(-1e3, 1e3, size=(n_points, 2))
+        elif len(xy) and isinstance(xy[0], dict):
+            xy = [(p["x"], p["y"]) for p in xy]
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        body = {"x": xy[:, 0].tolist(), "y": xy[:, 1].tolist()}
+        response = api.post(f"/measurements/columns?user_id={user_id}", json=body)
+        assert response.status_code == 200
+        return response.json()["id"]
+
+    return create
+
+
+FIXTURES_DIR = pathlib.Path(__file__).parent / "fixtures"
+
+
+@pytest.fixture
+def books_server():
+    # Helyi HTTP szerver a mentett books.toscrape.com oldalakkal. Útvonalanként
+    # késleltetés és 503-as hibák állíthatók, és méri a párhuzamos kéréseket.
+    state = SimpleNamespace(delays={}, failures={}, requests=[], active=0, max_active=0)
+    lock = threading.Lock()
+
+    class Handler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=str(FIXTURES_DIR), **kwargs)
+
+        def do_GET(self):
+            with lock:
+                state.requests.append(self.path)
+                state.active += 1
+                state.max_active = max(state.max_active, state.active)
+            try:
+                time.sleep(state.delays.get(self.path, 0))
+                with lock:
+                    fail = state.failures.get(self.path, 0) > 0
+                    if fail:
+                        state.failures[self.path] -= 1
+                if fail:
+                    self.send_error(503)
+                else:
+                    super().do_GET()
+            finally:
+                with lock:
+                    state.active -= 1
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state.url = f"http://127.0.0.1:{server.server_port}"
+    yield state
+    server.shutdown()
+    server.server_close()
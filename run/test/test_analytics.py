@@ -0,0 +1,78 @@
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app import analytics, crud
+
+# A mérés-statisztikák és a 2D hisztogram tesztjei valódi (ideiglenes) adatbázison.
+
+
+def test_stats_match_numpy_reference(api, create_measurement):
+    """A statisztikák megegyeznek a NumPy referencia-számításokkal."""
+    rng = np.random.default_rng(0)
+    x = rng.uniform(1e6, 1e6 + 100, 500)
+    xy = np.column_stack([x, 3.0 * x - 2.0 + rng.normal(0, 5, 500)])
+    measurement_id = create_measurement(xy)
+
+    stats = api.get(f"/measurements/{measurement_id}/stats").json()
+
+    slope, intercept = np.polyfit(xy[:, 0], xy[:, 1], 1)
+    assert stats["count"] == 500
+    assert stats["bbox"] == {"x_min": xy[:, 0].min(), "x_max": xy[:, 0].max(),
+                             "y_min": xy[:, 1].min(), "y_max": xy[:, 1].max()}
+    assert stats["centroid"] == pytest.approx({"x": xy[:, 0].mean(), "y": xy[:, 1].mean()})
+    assert stats["std"] == pytest.approx({"x": xy[:, 0].std(), "y": xy[:, 1].std()})
+    assert stats["regression"]["slope"] == pytest.approx(slope)
+    assert stats["regression"]["intercept"] == pytest.approx(intercept)
+    assert stats["regression"]["r"] == pytest.approx(np.corrcoef(xy[:, 0], xy[:, 1])[0, 1])
+
+
+def test_degenerate_measurements_have_null_fit():
+    """Üres vagy függőleges ponthalmaznál a nem értelmezhető értékek None-ok."""
+    assert analytics.point_stats(np.empty((0, 2)))["count"] == 0
+    stats = analytics.point_stats(np.array([[1.0, 2.0], [1.0, 5.0]]))
+    assert stats["regression"] == {"slope": None, "intercept": None, "r": None}
+    assert stats["centroid"] == {"x": 1.0, "y": 3.5}
+
+
+def test_histogram2d_matches_numpy(api, create_measurement):
+    """A 2D hisztogram a numpy.histogram2d eredménye, megadott és adatból vett tartománnyal."""
+    rng = np.random.default_rng(1)
+    xy = rng.normal(0, 1, (1000, 2))
+    measurement_id = create_measurement(xy)
+
+    body = api.get(f"/measurements/{measurement_id}/histogram2d?bins_x=8&bins_y=4&x_min=-1&x_max=1").json()
+
+    counts, x_edges, y_edges = np.histogram2d(
+        xy[:, 0], xy[:, 1], bins=(8, 4), range=((-1, 1), (xy[:, 1].min(), xy[:, 1].max()))
+    )
+    assert body["counts"] == counts.astype(int).tolist()
+    assert body["x_edges"] == pytest.approx(x_edges.tolist())
+    assert body["y_edges"] == pytest.approx(y_edges.tolist())
+    assert sum(map(sum, api.get(f"/measurements/{measurement_id}/histogram2d").json()["counts"])) == 1000
+
+
+def test_results_are_memoized_per_measurement(api, create_measurement):
+    """A második lekérdezés már nem tölti be a pontokat; más paraméter új számítás."""
+    measurement_id = create_measurement(np.arange(20.0).reshape(-1, 2))
+
+    with patch("run.backend.crud.get_points", wraps=crud.get_points) as get_points:
+        first = api.get(f"/measurements/{measurement_id}/stats").json()
+        second = api.get(f"/measurements/{measurement_id}/stats").json()
+        api.get(f"/measurements/{measurement_id}/histogram2d?bins_x=4")
+        api.get(f"/measurements/{measurement_id}/histogram2d?bins_x=4")
+        api.get(f"/measurements/{measurement_id}/histogram2d?bins_x=5")
+
+    assert first == second
+    assert get_points.await_count == 3
+
+
+def test_analytics_errors(api, create_measurement):
+    """Nem létező mérésre 404, hibás paraméterekre 400."""
+    measurement_id = create_measurement(np.arange(20.0).reshape(-1, 2))
+
+    assert api.get("/measurements/999/stats").status_code == 404
+    assert api.get("/measurements/999/histogram2d").status_code == 404
+    assert api.get(f"/measurements/{measurement_id}/histogram2d?bins_x=0").status_code == 400
+    assert api.get(f"/measurements/{measurement_id}/histogram2d?x_min=100").status_code == 400
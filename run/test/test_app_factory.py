@@ -0,0 +1,67 @@
+import os
+import pathlib
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app import soup
+from app.database import build_async_engine, build_engine
+from app.jobs import job_manager
+from run import backend
+
+# Az alkalmazásgyár tesztjei: a séma a lifespanben (vagy előre, egyszer)
+# frissül, az import mellékhatás- és scrapermentes.
+
+
+def test_lifespan_upgrades_schema_only_when_enabled(tmp_path, monkeypatch):
+    """A lifespan DB_AUTO_MIGRATE mellett létrehozza a táblákat, nélküle nem nyúl az adatbázishoz."""
+    for enabled in (False, True):
+        engine = build_engine(f"sqlite:///{tmp_path / f'{enabled}.db'}")
+        monkeypatch.setattr(backend, "engine", engine)
+        monkeypatch.setattr(backend, "DB_AUTO_MIGRATE", enabled)
+        # Induláskor a befejezetlen feladatok lezárása is ezt az adatbázist érinti.
+        async_engine = build_async_engine(f"sqlite:///{tmp_path / f'{enabled}.db'}", poolclass=NullPool)
+        monkeypatch.setattr(job_manager, "session_factory", async_sessionmaker(async_engine))
+
+        with TestClient(backend.create_app()):
+            tables = inspect(engine).get_table_names()
+        engine.dispose()
+
+        assert ("measurements" in tables) is enabled
+
+
+def test_lifespan_shuts_down_parse_executor(monkeypatch):
+    """Leálláskor a scraper közös folyamatkészlete is leáll."""
+    monkeypatch.setattr(backend, "DB_AUTO_MIGRATE", False)
+    with TestClient(backend.create_app()):
+        executor = soup.parse_executor()
+
+    assert executor._shutdown_thread
+    assert soup._parse_executor is None
+
+
+def test_factory_builds_independent_apps():
+    """Minden create_app() hívás saját alkalmazást ad ugyanazokkal az útvonalakkal."""
+    first, second = backend.create_app(), backend.create_app()
+
+    assert first is not second
+    assert {route.path for route in first.routes} == {route.path for route in second.routes}
+    assert "/measurements/{measurement_id}" in {route.path for route in first.routes}
+
+
+def test_import_does_not_load_scraper_or_touch_database(tmp_path):
+    """A backend importja nem hoz létre adatbázist és nem tölti be a scraper függőségeit."""
+    db_path = tmp_path / "untouched.db"
+    script = "import sys, run.backend; print(any(m in sys.modules for m in ('bs4', 'httpx', 'app.soup')))"
+
+    output = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True,
+        cwd=pathlib.Path(backend.__file__).parents[1], env=dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}"),
+    )
+
+    assert output.stdout.strip() == "False"
+    assert not db_path.exists()
@@ -0,0 +1,101 @@
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event, inspect, update
+from sqlalchemy.engine import Engine
+
+from app import crud
+from app.models import Measurement
+
+# A több mérést egyszerre olvasó végpontok tesztjei: oszlopos válasz, időablak,
+# és a lekérdezések száma, ami nem nő a mérések számával.
+
+POINTS = [
+    [{"x": 1.0, "y": 2.0}, {"x": 3.0, "y": 4.0}],
+    [{"x": -1.5, "y": 0.25}],
+    [],
+    [{"x": 10.0, "y": 20.0}, {"x": 30.0, "y": 40.0}, {"x": 50.0, "y": 60.0}],
+]
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+
+def seed(api, db_session, create_measurement):
+    # Vegyes tárolás: a páratlan indexű mérések blobként kerülnek be.
+    user_id = api.post("/users/", json={"name": "History"}).json()["id"]
+    ids = []
+    for i, points in enumerate(POINTS):
+        storage = crud.STORAGE_BLOB if i % 2 else crud.STORAGE_ROWS
+        ids.append(create_measurement(points, storage, user_id=user_id))
+        db_session.execute(
+            update(Measurement).where(Measurement.id == ids[-1]).values(timestamp=datetime(2024, 1, i + 1))
+        )
+        db_session.commit()
+    return user_id, ids
+
+
+def columns(points):
+    return {"count": len(points), "x": [p["x"] for p in points], "y": [p["y"] for p in points]}
+
+
+def test_user_measurements_are_columnar_and_time_filtered(api, db_session, create_measurement):
+    """A felhasználó összes mérése oszlopos alakban jön, időablakkal szűrhetően."""
+    user_id, ids = seed(api, db_session, create_measurement)
+
+    body = api.get(f"/users/{user_id}/measurements").json()
+
+    assert body["count"] == 4
+    for measurement, measurement_id, points in zip(body["measurements"], ids, POINTS):
+        assert measurement["id"] == measurement_id
+        assert {k: measurement[k] for k in ("count", "x", "y")} == columns(points)
+    window = api.get(f"/users/{user_id}/measurements?since=2024-01-02T00:00:00&until=2024-01-04T00:00:00").json()
+    assert [m["id"] for m in window["measurements"]] == ids[1:3]
+    assert [m["id"] for m in api.get(f"/users/{user_id}/measurements?offset=1&limit=2").json()["measurements"]] == ids[1:3]
+
+
+def test_batch_get_keeps_request_order_and_reports_missing(api, db_session, create_measurement):
+    """A batch-get a kért sorrendben adja a méréseket, a hiányzókat külön listázza."""
+    _, ids = seed(api, db_session, create_measurement)
+
+    body = api.post("/measurements/batch-get", json={"ids": [ids[3], 999, ids[0], ids[3]]}).json()
+
+    assert [m["id"] for m in body["measurements"]] == [ids[3], ids[0]]
+    assert body["missing"] == [999]
+    assert {k: body["measurements"][0][k] for k in ("count", "x", "y")} == columns(POINTS[3])
+    windowed = api.post("/measurements/batch-get?until=2024-01-02T00:00:00", json={"ids": ids}).json()
+    assert [m["id"] for m in windowed["measurements"]] == ids[:1]
+
+
+def test_query_count_does_not_grow_with_measurements(api, db_session, create_measurement):
+    """A mérések számától függetlenül állandó számú lekérdezés fut (nincs N+1)."""
+    user_id, ids = seed(api, db_session, create_measurement)
+    with count_queries() as few:
+        api.post("/measurements/batch-get", json={"ids": ids[:2]})
+
+    for _ in range(5):
+        seed(api, db_session, create_measurement)
+    with count_queries() as many:
+        api.post("/measurements/batch-get", json={"ids": list(range(1, 25))})
+
+    assert len(many) == len(few)
+
+
+def test_batch_read_validation(api, db_engine):
+    """Ismeretlen felhasználóra 404, fordított időablakra és túl sok azonosítóra 400; az index létezik."""
+    assert api.get("/users/999/measurements").status_code == 404
+    assert api.get("/users/1/measurements?since=2024-02-01T00:00:00&until=2024-01-01T00:00:00").status_code == 400
+    assert api.post("/measurements/batch-get", json={"ids": list(range(1001))}).status_code == 400
+    indexes = {index["name"]: index["column_names"] for index in inspect(db_engine).get_indexes("measurements")}
+    assert indexes["ix_measurements_user_id_timestamp"] == ["user_id", "timestamp"]
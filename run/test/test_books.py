@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app import crud
+from app.book_sync import sync_books
+from app.database import build_async_engine
+from app.models import Book, ScrapedPage
+from app.soup import BookScraper
+from run.test.test_soup import fixture_books
+
+# A tárolt könyvek tesztjei: upsert, kivonat alapú kihagyás és a /books/ szűrői.
+
+
+def run_sync(db_path, base_url, max_pages):
+    async def run():
+        engine = build_async_engine(f"sqlite:///{db_path}", poolclass=NullPool)
+        try:
+            async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+                async with BookScraper(base_url=base_url, rate_limit=0) as scraper:
+                    return await sync_books(session, max_pages, base_url, scraper)
+        finally:
+            await engine.dispose()
+    return asyncio.run(run())
+
+
+def test_sync_stores_books_and_skips_unchanged_pages(db_engine, db_session, db_path, books_server):
+    """Az első futás minden könyvet eltárol, a második 304 miatt semmit sem dolgoz fel újra."""
+    first = run_sync(db_path, books_server.url, 4)
+    second = run_sync(db_path, books_server.url, 3)
+
+    assert first == {"pages": 4, "updated": 3, "unchanged": 0, "failed": 1, "books": 60}
+    assert second == {"pages": 3, "updated": 0, "unchanged": 3, "failed": 0, "books": 0}
+    stored = db_session.execute(select(Book.url, Book.title, Book.price, Book.stock, Book.rating)).all()
+    assert sorted(map(tuple, stored)) == sorted(
+        tuple(book.values()) for book in fixture_books(1, 2, 3, base_url=books_server.url)
+    )
+
+
+def test_sync_compares_content_hash_without_validators(db_engine, db_session, db_path, books_server):
+    """Validátorok nélkül a változatlan HTML kivonata alapján marad ki az oldal."""
+    run_sync(db_path, books_server.url, 2)
+    db_session.execute(update(ScrapedPage).values(etag=None, last_modified=None))
+    db_session.commit()
+
+    assert run_sync(db_path, books_server.url, 2)["unchanged"] == 2
+
+
+@pytest.mark.parametrize("native", [True, False])
+def test_changed_page_upserts_existing_books(db_engine, db_session, db_path, books_server, monkeypatch, native):
+    """Megváltozott oldalnál a meglévő könyvsorok frissülnek, nem duplikálódnak, natív upsert nélkül is."""
+    if not native:
+        monkeypatch.setattr(crud, "UPSERT_DIALECTS", ())
+    run_sync(db_path, books_server.url, 1)
+    db_session.execute(update(Book).values(price=0.0))
+    db_session.execute(update(ScrapedPage).values(content_hash="régi", etag=None, last_modified=None))
+    db_session.commit()
+
+    assert run_sync(db_path, books_server.url, 1)["updated"] == 1
+    db_session.expire_all()
+    assert db_session.query(Book).count() == 20
+    assert db_session.query(Book).filter(Book.price == 0.0).count() == 0
+
+
+def test_books_endpoint_filters(api, db_path, books_server):
+    """A /books/ ár és értékelés szerint szűr, ár szerint rendezve."""
+    run_sync(db_path, books_server.url, 3)
+    stars = {"One": 1, "Two": 2, "Three": 3, "Four": 4, "Five": 5}
+    expected = sorted(
+        (book for book in fixture_books(1, 2, 3, base_url=books_server.url)
+         if 20 <= book["price"] <= 40 and stars[book["rating"]] >= 4),
+        key=lambda book: book["price"],
+    )
+
+    response = api.get("/books/", params={"min_price": 20, "max_price": 40, "min_rating": 4})
+
+    assert response.status_code == 200
+    assert response.json() == {"count": len(expected), "books": expected}
+    assert api.get("/books/", params={"limit": 5, "offset": 2}).json()["count"] == 5
+
+
+def test_books_endpoint_validation(api):
+    """Hibás szűrőkre 400 jön."""
+    for params in ({"min_rating": 0}, {"max_rating": 6}, {"limit": 0}, {"offset": -1},
+                   {"min_price": 10, "max_price": 5}):
+        assert api.get("/books/", params=params).status_code == 400
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from sqlalchemy import text
+
+from app import crud
+from app.schemas import MeasurementColumnsDTO, MeasurementCreateDTO
+
+# Az oszlopos ({"x": [...], "y": [...]}) mérésfeltöltés tesztjei.
+
+COLUMNS = {"x": [1.0, 3, -0.5], "y": [2.0, 4.5, 1e300]}
+
+
+@pytest.mark.parametrize("storage", [crud.STORAGE_ROWS, crud.STORAGE_BLOB])
+def test_columns_roundtrip(api, monkeypatch, storage):
+    """Az oszlopos bemenet oszlopos választ ad, és ugyanazokat a pontokat tárolja, mint a pontonkénti."""
+    monkeypatch.setattr(crud, "POINT_STORAGE", storage)
+    user_id = api.post("/users/", json={"name": "Columns"}).json()["id"]
+
+    body = api.post(f"/measurements/columns?user_id={user_id}", json=COLUMNS).json()
+
+    assert body["user_id"] == user_id
+    assert body["count"] == 3
+    assert body["x"] == [1.0, 3.0, -0.5] and body["y"] == COLUMNS["y"]
+    points = api.get(f"/measurements/{body['id']}").json()["points"]
+    assert points == [{"x": x, "y": y} for x, y in zip(body["x"], body["y"])]
+
+
+def test_columns_validation(api):
+    """Eltérő hosszú vagy nem numerikus oszlopokra 422; a séma ugyanazt a tömböt adja, mint a pontonkénti."""
+    user_id = api.post("/users/", json={"name": "Columns"}).json()["id"]
+
+    assert api.post(f"/measurements/columns?user_id={user_id}", json={"x": [1.0], "y": []}).status_code == 422
+    assert api.post(f"/measurements/columns?user_id={user_id}", json={"x": ["a"], "y": [1.0]}).status_code == 422
+    assert api.post(f"/measurements/columns?user_id={user_id}&chunk_size=0", json=COLUMNS).status_code == 400
+
+    columns = MeasurementColumnsDTO(**COLUMNS)
+    points = MeasurementCreateDTO(points=[{"x": x, "y": y} for x, y in zip(COLUMNS["x"], COLUMNS["y"])])
+    assert np.array_equal(
+        np.column_stack([columns.x, columns.y]),
+        np.array([[p.x, p.y] for p in points.points])
+    )
+
+
+def test_columns_unknown_user(api, db_session):
+    """Nem létező felhasználóra 404, és nem jön létre mérés."""
+    response = api.post("/measurements/columns?user_id=999", json=COLUMNS)
+
+    assert response.status_code == 404
+    assert db_session.execute(text("SELECT COUNT(*) FROM measurements")).scalar() == 0
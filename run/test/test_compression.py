@@ -0,0 +1,122 @@
+import asyncio
+import zlib
+
+import pytest
+
+from app import compression, crud
+from app.response_cache import response_cache
+
+# A válasz-tömörítés tesztjei: kódolás-egyeztetés, méretküszöb, ETag/304 és
+# folyamként küldött válaszok darabonkénti tömörítése.
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate", "gzip"),
+    ("br;q=1.0, gzip;q=0.5", "gzip"),
+    ("*", "gzip"),
+    ("gzip;q=0, *;q=0.3", None),
+    ("identity", None),
+    ("", None),
+])
+def test_negotiate_respects_quality_values(header, expected):
+    """Csak az elérhető, nem nulla q-értékű kódolás választható; a * a többire vonatkozik."""
+    assert compression.negotiate(header, ["gzip"]) == expected
+
+
+def test_large_json_is_compressed_and_revalidates(api, create_measurement):
+    """A nagy JSON válasz gzip-pel megy, a hossza a tömörített hossz, a gyenge ETag-re 304 jön."""
+    measurement_id = create_measurement(storage=crud.STORAGE_BLOB)
+    url = f"/measurements/{measurement_id}"
+    plain = api.get(url, headers={"Accept-Encoding": "identity"})
+
+    with api.stream("GET", url, headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+
+    assert "content-encoding" not in plain.headers
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) == len(raw) < len(plain.content) / 2
+    assert "Accept-Encoding" in response.headers["vary"] and "Accept" in response.headers["vary"]
+    assert zlib.decompress(raw, 31) == plain.content
+    assert response.headers["etag"] == "W/" + plain.headers["etag"]
+
+    revalidated = api.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "binary"])
+def test_streamed_formats_are_compressed(api, create_measurement, monkeypatch, fmt):
+    """A folyamként küldött formátumok is tömörítve mennek, a kicsomagolt törzs változatlan."""
+    monkeypatch.setattr(crud, "STREAM_CHUNK_SIZE", 500)
+    measurement_id = create_measurement(storage=crud.STORAGE_BLOB)
+    url = f"/measurements/{measurement_id}?format={fmt}"
+    # Az első kérés még nem gyorsítótár-találat, így valóban folyamként megy.
+    with api.stream("GET", url, headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+    plain = api.get(url, headers={"Accept-Encoding": "identity"}).content
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert zlib.decompress(raw, 31) == plain
+
+
+def run_asgi(app, path, accept_encoding="gzip"):
+    # A küldött ASGI üzenetek, ahogy a szerver kapná őket (a TestClient összevonja a darabokat).
+    messages = []
+    scope = {"type": "http", "method": "GET", "path": path, "headers": [(b"accept-encoding", accept_encoding.encode())]}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return messages
+
+
+def test_small_responses_are_left_alone_and_streams_are_not_buffered():
+    """A küszöb alatti egydarabos válasz tömörítetlen; a folyam (kicsi is) darabonként azonnal kicsomagolható."""
+    async def stream(scope, receive, send):
+        size = int(scope["path"].rsplit("/", 1)[1])
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        for i in range(3):
+            await send({"type": "http.response.body", "body": str(i).encode() * size, "more_body": i < 2})
+
+    async def single(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": b"0" * 10})
+
+    app = compression.CompressionMiddleware(stream, minimum_size=100)
+
+    small = run_asgi(compression.CompressionMiddleware(single, minimum_size=100), "/")
+    assert b"content-encoding" not in dict(small[0]["headers"])
+    assert small[1]["body"] == b"0" * 10
+
+    for size in (10, 1000):
+        messages = run_asgi(app, f"/stream/{size}")
+        assert dict(messages[0]["headers"])[b"content-encoding"] == b"gzip"
+        assert len(messages) == 4
+        # Z_SYNC_FLUSH: az első darab a folyam többi része nélkül is visszafejthető.
+        decoder = zlib.decompressobj(31)
+        assert decoder.decompress(messages[1]["body"]) == b"0" * size
+        assert decoder.decompress(messages[2]["body"] + messages[3]["body"]) == b"1" * size + b"2" * size
+        assert decoder.eof
+
+    assert b"content-encoding" not in dict(run_asgi(app, "/stream/1000", "identity")[0]["headers"])
+
+
+def test_cached_responses_keep_their_compressed_variant(api, create_measurement, monkeypatch):
+    """Gyorsítótár-találatnál a tömörített változat is a gyorsítótárból jön; törléskor az is kiürül."""
+    measurement_id = create_measurement(storage=crud.STORAGE_BLOB)
+    calls = []
+    original = compression.compress
+    monkeypatch.setattr(compression, "compress", lambda body, encoding: calls.append(encoding) or original(body, encoding))
+
+    for _ in range(3):
+        response = api.get(f"/measurements/{measurement_id}", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept, Accept-Encoding"
+
+    assert calls == ["gzip"]
+    api.delete(f"/measurements/{measurement_id}")
+    assert response_cache.snapshot()["entries"] == 0
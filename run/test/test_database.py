@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import text
+
+from app import database
+from app.database import async_url, build_engine, engine_options, sync_url
+
+# Az adatbázis-profil (SQLite pragmák, kapcsolatkészlet) tesztjei.
+
+
+@pytest.mark.parametrize("url, expected_async, expected_sync", [
+    ("sqlite:///data.db", "sqlite+aiosqlite:///data.db", "sqlite:///data.db"),
+    ("sqlite+aiosqlite:///data.db", "sqlite+aiosqlite:///data.db", "sqlite:///data.db"),
+    ("postgresql://u@db/app", "postgresql+asyncpg://u@db/app", "postgresql://u@db/app"),
+    ("postgresql+asyncpg://u@db/app", "postgresql+asyncpg://u@db/app", "postgresql://u@db/app"),
+])
+def test_driver_urls(url, expected_async, expected_sync):
+    """A DATABASE_URL szinkron és aszinkron driverre alakítása."""
+    assert async_url(url).render_as_string() == expected_async
+    assert sync_url(url).render_as_string() == expected_sync
+
+
+@pytest.mark.parametrize("profile, journal_mode, synchronous", [
+    ("tuned", "wal", 1),
+    ("default", "delete", 2),
+])
+def test_sqlite_pragmas(tmp_path, profile, journal_mode, synchronous):
+    """A tuned profil minden kapcsolaton beállítja a pragmákat, a default nem."""
+    engine = build_engine(f"sqlite:///{tmp_path / 'profile.db'}", profile)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == journal_mode
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == synchronous
+        if profile == "tuned":
+            assert conn.execute(text("PRAGMA mmap_size")).scalar() == database.SQLITE_PRAGMAS["mmap_size"]
+            assert conn.execute(text("PRAGMA cache_size")).scalar() == database.SQLITE_PRAGMAS["cache_size"]
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == database.SQLITE_PRAGMAS["busy_timeout"]
+    engine.dispose()
+
+
+def test_pool_options_by_backend(monkeypatch):
+    """Szerveres adatbázisnál pre-ping és recycle is jár, memóriabeli SQLite-nál semmi."""
+    monkeypatch.setitem(database.POOL_OPTIONS, "pool_size", 20)
+
+    server = engine_options("postgresql+asyncpg://u@db/app", "tuned")
+    sqlite_file = engine_options("sqlite:///data.db", "tuned")
+
+    assert server["pool_size"] == 20 and server["pool_pre_ping"] is True and "pool_recycle" in server
+    assert sqlite_file["pool_size"] == 20 and "pool_pre_ping" not in sqlite_file
+    assert engine_options("sqlite://", "tuned") == {}
+    assert engine_options("postgresql://u@db/app", "default") == {}
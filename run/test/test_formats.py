@@ -0,0 +1,53 @@
+import json
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from app import crud, formats
+from run.test.test_storage import TEST_POINTS
+
+# A GET /measurements/{id} tartalom-egyeztetésének tesztjei.
+
+
+@pytest.mark.parametrize("accept, format, expected", [
+    (None, None, formats.JSON),
+    ("*/*", None, formats.JSON),
+    ("application/octet-stream", None, formats.BINARY),
+    ("application/json;q=0.5, application/vnd.apache.arrow.stream", None, formats.ARROW),
+    ("application/ndjson", None, formats.NDJSON),
+    ("text/html", None, None),
+    ("application/json", "binary", formats.BINARY),
+    (None, "xml", None),
+])
+def test_negotiate(accept, format, expected):
+    """Az Accept fejléc és a format paraméter kiértékelése."""
+    assert formats.negotiate(accept, format) == expected
+
+
+@pytest.mark.parametrize("storage", [crud.STORAGE_ROWS, crud.STORAGE_BLOB])
+def test_streaming_formats_match_json(api, create_measurement, monkeypatch, storage):
+    """A bináris, Arrow és NDJSON válaszok ugyanazokat a pontokat adják, több csomagban is."""
+    measurement_id = create_measurement(TEST_POINTS, storage)
+    monkeypatch.setattr(crud, "STREAM_CHUNK_SIZE", 2)
+    expected = np.array([[p["x"], p["y"]] for p in TEST_POINTS])
+
+    response = api.get(f"/measurements/{measurement_id}", headers={"Accept": formats.BINARY})
+    assert response.headers["content-type"] == formats.BINARY
+    assert response.headers["x-measurement-id"] == str(measurement_id)
+    np.testing.assert_array_equal(np.frombuffer(response.content, dtype="<f8").reshape(-1, 2), expected)
+
+    response = api.get(f"/measurements/{measurement_id}?format=arrow")
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column_names == ["x", "y"]
+    np.testing.assert_array_equal(np.column_stack([table["x"], table["y"]]), expected)
+
+    response = api.get(f"/measurements/{measurement_id}", headers={"Accept": formats.NDJSON})
+    assert [json.loads(line) for line in response.text.splitlines()] == TEST_POINTS
+
+
+def test_unsupported_format(api):
+    """Nem támogatott formátum kérése (406)."""
+    response = api.get("/measurements/1", headers={"Accept": "text/html"})
+
+    assert response.status_code == 406
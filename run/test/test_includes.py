@@ -1,4 +1,6 @@
+import json
 import pytest
+import numpy as np
 from unittest.mock import MagicMock, patch
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
@@ -99,10 +101,36 @@ def test_add_measurement_success(mock_add_measurement):
     assert response.json()["id"] == 101
     mock_add_measurement.assert_awaited_once()
 
+@patch('run.backend.crud.add_measurement_bulk')
+def test_add_measurement_bulk_success(mock_add_measurement_bulk):
+    """Tömeges (bulk) mérés hozzáadás tesztelése: a válasz a bemeneti pontokból épül (200)."""
+    user_id = 1
+    mock_add_measurement_bulk.return_value = MockMeasurement(id=102, user_id=user_id, points_data=[])
+
+    response = client.post(
+        f"/measurements/?user_id={user_id}&bulk=true&chunk_size=1",
+        json=TEST_MEASUREMENT_CREATE
+    )
+
+    assert response.status_code == 200
+    assert response.json()["id"] == 102
+    assert response.json()["points"] == TEST_MEASUREMENT_CREATE["points"]
+    mock_add_measurement_bulk.assert_awaited_once()
+    assert mock_add_measurement_bulk.await_args.kwargs["chunk_size"] == 1
+
+@patch('run.backend.crud.add_measurement_bulk')
+def test_add_measurement_bulk_invalid_chunk_size(mock_add_measurement_bulk):
+    """Érvénytelen csomagméret (400) tesztelése."""
+    response = client.post("/measurements/?user_id=1&bulk=true&chunk_size=0", json=TEST_MEASUREMENT_CREATE)
+
+    assert response.status_code == 400
+    mock_add_measurement_bulk.assert_not_called()
+
 ## 🔍 Mérés Lekérdezése Végpont Tesztek
 
+@patch('run.backend.crud.get_points')
 @patch('run.backend.crud.get_measurement')
-def test_get_measurement_success(mock_get_measurement):
+def test_get_measurement_success(mock_get_measurement, mock_get_points):
     """Sikeres mérés lekérdezés tesztelése (200)."""
     measurement_id = 101
     # Mockoljuk a sikeres DB visszatérést
@@ -112,12 +140,15 @@ def test_get_measurement_success(mock_get_measurement):
         points_data=TEST_MEASUREMENT_CREATE["points"]
     )
     mock_get_measurement.return_value = mock_measurement
+    mock_get_points.return_value = np.array([[p["x"], p["y"]] for p in TEST_MEASUREMENT_CREATE["points"]])
     
     response = client.get(f"/measurements/{measurement_id}")
     
     assert response.status_code == 200
     assert response.json()["id"] == measurement_id
+    assert response.json()["points"] == TEST_MEASUREMENT_CREATE["points"]
     mock_get_measurement.assert_awaited_once()
+    mock_get_points.assert_awaited_once()
 
 @patch('run.backend.crud.get_measurement')
 def test_get_measurement_not_found(mock_get_measurement):
@@ -134,7 +165,7 @@ def test_get_measurement_not_found(mock_get_measurement):
 ## 🕷️ Webkaparás Végpont Tesztek
 
 # Feltételezve, hogy a scrape_books_toscrape a backend.py-ban van importálva
-@patch('run.backend.scrape_books_toscrape') 
+@patch('app.soup.scrape_books_toscrape') 
 def test_scrape_books_success(mock_scrape_books):
     """Sikeres webkaparás tesztelése (200)."""
     mock_books = [{"title": "Book 1", "price": 10.0}, {"title": "Book 2", "price": 20.0}]
@@ -146,7 +177,39 @@ def test_scrape_books_success(mock_scrape_books):
     assert response.json()["count"] == 2
     mock_scrape_books.assert_called_once_with(max_pages=1)
 
-@patch('run.backend.scrape_books_toscrape')
+@patch('app.soup.scrape_books_toscrape')
+def test_scrape_books_pipeline_workers(mock_scrape_books):
+    """A munkásszámok a csővezetékes scrape-nek adódnak át, a hibás értékek 400-at adnak."""
+    mock_scrape_books.return_value = [{"title": "Book 1", "price": 10.0}]
+
+    response = client.get("/scrape_books/?pages=3&fetch_workers=4&parse_workers=2")
+
+    assert response.status_code == 200
+    mock_scrape_books.assert_called_once_with(max_pages=3, fetch_workers=4, parse_workers=2)
+    assert client.get("/scrape_books/?pages=1&fetch_workers=0").status_code == 400
+    assert client.get("/scrape_books/?pages=1&parse_workers=-1").status_code == 400
+
+@patch('app.soup.iter_books_toscrape')
+def test_scrape_books_stream(mock_iter_books):
+    """A folyamatos végpont oldalanként NDJSON sorokat ad, a hiba utolsó sorként jön."""
+    async def pages(**kwargs):
+        yield 1, [{"title": "Book 1", "price": 10.0}]
+        yield 2, []
+        yield 3, [{"title": "Book 3", "price": 30.0}]
+        raise RuntimeError("Mock Web Scraping Error")
+    mock_iter_books.side_effect = pages
+
+    response = client.get("/scrape_books/stream?pages=4")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[:2] == [{"page": 1, "title": "Book 1", "price": 10.0}, {"page": 3, "title": "Book 3", "price": 30.0}]
+    assert "error" in lines[2]
+    mock_iter_books.assert_called_once_with(max_pages=4, fetch_workers=None, parse_workers=None)
+    assert client.get("/scrape_books/stream?pages=0").status_code == 400
+
+@patch('app.soup.scrape_books_toscrape')
 def test_scrape_books_invalid_pages(mock_scrape_books):
     """Érvénytelen (negatív) lapok száma (400) tesztelése."""
     response = client.get("/scrape_books/?pages=0")
@@ -155,7 +218,7 @@ def test_scrape_books_invalid_pages(mock_scrape_books):
     assert "A lapok száma (pages) legalább 1 kell, hogy legyen." in response.json().get("detail")
     mock_scrape_books.assert_not_called()
 
-@patch('run.backend.scrape_books_toscrape')
+@patch('app.soup.scrape_books_toscrape')
 def test_scrape_books_general_exception(mock_scrape_books):
     """Általános hiba tesztelése webkaparás közben (500)."""
     mock_scrape_books.side_effect = Exception("Mock Web Scraping Error")
@@ -164,4 +227,18 @@ def test_scrape_books_general_exception(mock_scrape_books):
     
     assert response.status_code == 500
     assert "Hiba történt a webkaparás végrehajtása közben." in response.json().get("detail")
-    mock_scrape_books.assert_called_once()
\ No newline at end of file
+    mock_scrape_books.assert_called_once()
+
+
+@patch('app.book_sync.sync_books')
+def test_books_sync(mock_sync_books):
+    """A /books/sync a frissítés statisztikáját adja vissza, hibás lapszámra 400."""
+    mock_sync_books.return_value = {"pages": 2, "updated": 1, "unchanged": 1, "failed": 0, "books": 20}
+
+    response = client.post("/books/sync?pages=2")
+
+    assert response.status_code == 200
+    assert response.json()["updated"] == 1
+    mock_sync_books.assert_awaited_once()
+    assert mock_sync_books.call_args.kwargs == {"max_pages": 2}
+    assert client.post("/books/sync?pages=0").status_code == 400
@@ -0,0 +1,225 @@
+import asyncio
+import contextvars
+import functools
+import json
+import time
+import zlib
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app import soup
+from app.database import build_async_engine
+from app.jobs import INTERRUPTED_ERROR, JOB_HANDLERS, JobManager, job_manager
+from app.models import Job
+from app.soup import iter_books_toscrape
+from run import backend
+from run.test.test_soup import fixture_books
+
+# A háttérfeladatok tesztjei: a TestClient kontextuskezelőként egyetlen
+# eseményhurkot tart életben, így a munkások a kérések között is futnak.
+
+
+@pytest.fixture
+def job_sessions(db_engine, db_path, monkeypatch):
+    # A lifespan (sémafrissítés, befejezetlen feladatok lezárása) is az ideiglenes
+    # adatbázist használja, nem a munkakönyvtár data.db-jét.
+    monkeypatch.setattr(backend, "engine", db_engine)
+    engine = build_async_engine(f"sqlite:///{db_path}", poolclass=NullPool)
+    monkeypatch.setattr(job_manager, "session_factory", async_sessionmaker(engine, expire_on_commit=False))
+
+
+@pytest.fixture
+def jobs_client(api, job_sessions, books_server, monkeypatch):
+    monkeypatch.setattr(soup, "iter_books_toscrape",
+                        functools.partial(iter_books_toscrape, base_url=books_server.url, cache=None))
+    with api as client:
+        yield client
+        client.portal.call(job_manager.shutdown)
+
+
+def wait_for_status(client, job_id, statuses, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"A feladat nem ért el {statuses} állapotot: {job}")
+
+
+def test_scrape_job_runs_and_streams_progress(jobs_client, books_server):
+    """A scrape feladat háttérben fut, az események végén az eredmény lekérhető."""
+    response = jobs_client.post("/jobs/scrape?pages=3")
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+
+    events = [json.loads(line) for line in jobs_client.get(f"/jobs/{job_id}/events").text.splitlines()]
+    job = jobs_client.get(f"/jobs/{job_id}").json()
+
+    assert events[-1]["status"] == "succeeded"
+    assert "result" not in events[-1]
+    assert [e["done"] for e in events] == sorted(e["done"] for e in events)
+    assert job["progress"] == 1.0
+    assert job["result"] == {"count": 60, "books": fixture_books(1, 2, 3, base_url=books_server.url)}
+
+
+def test_compressed_events_arrive_before_the_job_finishes(jobs_client, books_server):
+    """Gzip-pel tömörített eseményfolyamnál is az első esemény még a feladat vége előtt megérkezik."""
+    books_server.delays["/catalogue/page-1.html"] = 1
+    job_id = jobs_client.post("/jobs/scrape?pages=1").json()["id"]
+    # Közvetlen ASGI hívás: a TestClient a teljes válaszra várna.
+    scope = {
+        "type": "http", "asgi": {"spec_version": "2.4"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": f"/jobs/{job_id}/events", "raw_path": b"", "root_path": "",
+        "query_string": b"", "headers": [(b"accept-encoding", b"gzip")], "server": ("testserver", 80),
+    }
+    decoder = zlib.decompressobj(31)
+    received = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            received.append(dict(message["headers"])[b"content-encoding"])
+        elif message.get("body") and len(received) == 1:
+            job = await job_manager.get(job_id, with_result=False)
+            received.extend([json.loads(decoder.decompress(message["body"]).splitlines()[0]), job["status"]])
+
+    jobs_client.portal.call(jobs_client.app, scope, receive, send)
+
+    assert received[0] == b"gzip"
+    assert received[1]["status"] in {"queued", "running"}
+    assert received[2] not in {"succeeded", "failed", "cancelled"}
+    assert wait_for_status(jobs_client, job_id, {"succeeded"})
+
+
+def test_identical_inflight_scrapes_are_deduplicated(jobs_client, books_server):
+    """Az azonos paraméterű, még futó scrape ugyanazt a feladatot kapja vissza."""
+    books_server.delays["/catalogue/page-1.html"] = 0.5
+
+    first = jobs_client.post("/jobs/scrape?pages=1").json()
+    second = jobs_client.post("/jobs/scrape?pages=1").json()
+    other = jobs_client.post("/jobs/scrape?pages=2").json()
+
+    assert first["id"] == second["id"] != other["id"]
+    wait_for_status(jobs_client, first["id"], {"succeeded"})
+    assert jobs_client.post("/jobs/scrape?pages=1").json()["id"] != first["id"]
+
+
+def test_running_job_can_be_cancelled(jobs_client, books_server):
+    """A futó feladat DELETE-re megszakad."""
+    books_server.delays["/catalogue/page-1.html"] = 3
+    job_id = jobs_client.post("/jobs/scrape?pages=1").json()["id"]
+    wait_for_status(jobs_client, job_id, {"running"})
+
+    start = time.monotonic()
+    job = jobs_client.delete(f"/jobs/{job_id}").json()
+
+    assert job["status"] == "cancelled"
+    assert time.monotonic() - start < 1
+
+
+def test_queue_is_bounded_and_queued_jobs_can_be_cancelled(jobs_client, books_server, monkeypatch):
+    """Egy munkás mellett a második feladat vár, a harmadik 503-at kap; a várakozó törölhető."""
+    jobs_client.portal.call(job_manager.shutdown)
+    monkeypatch.setattr(job_manager, "workers", 1)
+    monkeypatch.setattr(job_manager, "queue_size", 1)
+    books_server.delays["/catalogue/page-1.html"] = 0.5
+
+    running = jobs_client.post("/jobs/scrape?pages=1").json()
+    wait_for_status(jobs_client, running["id"], {"running"})
+    queued = jobs_client.post("/jobs/scrape?pages=2").json()
+
+    assert jobs_client.post("/jobs/scrape?pages=3").status_code == 503
+    assert jobs_client.delete(f"/jobs/{queued['id']}").json()["status"] == "cancelled"
+    assert wait_for_status(jobs_client, running["id"], {"succeeded"})["result"]["count"] == 20
+    assert jobs_client.get(f"/jobs/{queued['id']}").json()["status"] == "cancelled"
+
+
+def test_shutdown_cancels_running_and_queued_jobs(jobs_client, books_server, monkeypatch):
+    """Leállításkor a futó és a még várakozó feladat is "cancelled" lesz, nem marad "queued"."""
+    jobs_client.portal.call(job_manager.shutdown)
+    monkeypatch.setattr(job_manager, "workers", 1)
+    books_server.delays["/catalogue/page-1.html"] = 3
+
+    running = jobs_client.post("/jobs/scrape?pages=1").json()
+    wait_for_status(jobs_client, running["id"], {"running"})
+    queued = jobs_client.post("/jobs/scrape?pages=2").json()
+    jobs_client.portal.call(job_manager.shutdown)
+
+    for job_id in (running["id"], queued["id"]):
+        job = jobs_client.get(f"/jobs/{job_id}").json()
+        assert job["status"] == "cancelled" and job["finished_at"] is not None
+
+
+def test_unfinished_jobs_from_previous_run_fail_at_startup(api, job_sessions, db_session):
+    """Induláskor az előző futásból "queued"/"running" állapotban maradt feladat hibás lesz, a kész nem változik."""
+    for job_id, status in (("a" * 32, "queued"), ("b" * 32, "running"), ("c" * 32, "succeeded")):
+        db_session.add(Job(id=job_id, kind="scrape", params='{"pages": 1}', status=status))
+    db_session.commit()
+
+    with api as client:
+        try:
+            events = [json.loads(line) for line in client.get(f"/jobs/{'a' * 32}/events").text.splitlines()]
+            jobs = {job_id: client.get(f"/jobs/{job_id}").json() for job_id in ("a" * 32, "b" * 32, "c" * 32)}
+        finally:
+            client.portal.call(job_manager.shutdown)
+
+    assert [e["status"] for e in events] == ["failed"]
+    assert jobs["a" * 32]["status"] == jobs["b" * 32]["status"] == "failed"
+    assert jobs["b" * 32]["error"] == INTERRUPTED_ERROR
+    assert jobs["c" * 32]["status"] == "succeeded" and jobs["c" * 32]["error"] is None
+
+
+def test_ingest_job_stores_measurement(jobs_client):
+    """A nagy mérés háttérfeladatként kerül be, az eredmény a mérés azonosítója."""
+    user_id = jobs_client.post("/users/", json={"name": "Job"}).json()["id"]
+    points = [{"x": float(i), "y": float(i * i)} for i in range(1000)]
+
+    job_id = jobs_client.post(f"/jobs/measurements?user_id={user_id}&chunk_size=300", json={"points": points}).json()["id"]
+    job = wait_for_status(jobs_client, job_id, {"succeeded", "failed"})
+
+    assert job["params"] == {"user_id": user_id, "points": 1000, "chunk_size": 300}
+    assert job["status"] == "succeeded"
+    assert jobs_client.get(f"/measurements/{job['result']['id']}").json()["points"] == points
+
+
+def test_ingest_job_for_unknown_user_is_404(jobs_client, db_session):
+    """Nem létező felhasználóra a beküldés 404, és nem kerül feladat a sorba."""
+    response = jobs_client.post("/jobs/measurements?user_id=999", json={"points": [{"x": 0.0, "y": 0.0}]})
+
+    assert response.status_code == 404
+    assert db_session.query(Job).count() == 0
+
+
+def test_job_workers_do_not_inherit_submitter_context(job_sessions, monkeypatch):
+    """A munkások az első beküldő kontextusváltozóit (pl. kérésstatisztika) nem látják."""
+    request_var = contextvars.ContextVar("request_var", default=None)
+    seen = []
+
+    async def probe(context):
+        seen.append(request_var.get())
+
+    monkeypatch.setitem(JOB_HANDLERS, "probe", probe)
+
+    async def run():
+        manager = JobManager(session_factory=job_manager.session_factory, workers=1)
+        request_var.set("kérés")
+        job = await manager.submit("probe", {})
+        async for state in manager.watch(job["id"]):
+            pass
+        await manager.shutdown()
+        return state
+
+    assert asyncio.run(run())["status"] == "succeeded"
+    assert seen == [None]
+
+
+def test_unknown_job_is_404(jobs_client):
+    """Nem létező feladatra 404 jön."""
+    assert jobs_client.get("/jobs/nincs").status_code == 404
+    assert jobs_client.get("/jobs/nincs/events").status_code == 404
+    assert jobs_client.delete("/jobs/nincs").status_code == 404
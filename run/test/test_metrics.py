@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app import metrics
+from app.soup import scrape_books_toscrape
+
+# A metrikák tesztjei: Prometheus kimenet, kérésenkénti lekérdezésszám és
+# N+1 jelzés, scraper időzítések és a lassú kérések profilozója.
+
+
+def instrumented_app(**options):
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware, **options)
+    return app
+
+
+def test_histogram_renders_cumulative_buckets():
+    """A hisztogram vödrei kumulatívak, a +Inf vödör a darabszám."""
+    histogram = metrics.Histogram("demo_seconds", "Demó.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, "/x")
+
+    assert histogram.render()[2:] == [
+        'demo_seconds_bucket{route="/x",le="0.1"} 1',
+        'demo_seconds_bucket{route="/x",le="1.0"} 3',
+        'demo_seconds_bucket{route="/x",le="+Inf"} 4',
+        'demo_seconds_sum{route="/x"} 6.05',
+        'demo_seconds_count{route="/x"} 4',
+    ]
+
+
+def test_metrics_endpoint_reports_routes_and_queries(api):
+    """A /metrics útvonalsablononként mutatja a késleltetést, a lekérdezésszámot és a gyorsítótárakat."""
+    before = metrics.REQUEST_QUERIES.count("/users/{user_id}/measurements")
+    user_id = api.post("/users/", json={"name": "Metrics"}).json()["id"]
+    api.get(f"/users/{user_id}/measurements")
+
+    response = api.get("/metrics")
+
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert metrics.REQUEST_QUERIES.count("/users/{user_id}/measurements") == before + 1
+    assert 'multibead_http_request_duration_seconds_count{method="POST",route="/users/",status="200"}' in response.text
+    assert "multibead_db_queries_total" in response.text
+    assert "multibead_response_cache_hit_rate" in response.text
+
+
+def test_repeated_selects_are_flagged_as_n_plus_one(db_engine, caplog):
+    """Egy kérésen belül sokszor ismételt azonos SELECT N+1 gyanúként jelenik meg."""
+    app = instrumented_app(n_plus_one_threshold=5)
+
+    @app.get("/items/{count}")
+    def items(count: int):
+        with db_engine.connect() as conn:
+            for i in range(count):
+                conn.execute(text("SELECT :i"), {"i": i})
+        return {}
+
+    client = TestClient(app)
+    before = metrics.N_PLUS_ONE.value("/items/{count}")
+    with caplog.at_level(logging.WARNING, logger="app.metrics"):
+        client.get("/items/3")
+        client.get("/items/8")
+
+    assert metrics.N_PLUS_ONE.value("/items/{count}") == before + 1
+    assert "N+1" in caplog.text
+
+
+def test_scraper_fetch_and_parse_are_timed(books_server):
+    """A scraper letöltési és feldolgozási ideje a hisztogramokba kerül."""
+    fetches = metrics.SCRAPER_FETCH_SECONDS.count("200")
+    parses = metrics.SCRAPER_PARSE_SECONDS.count("inline")
+
+    asyncio.run(scrape_books_toscrape(max_pages=2, base_url=books_server.url, cache=None))
+
+    assert metrics.SCRAPER_FETCH_SECONDS.count("200") == fetches + 2
+    assert metrics.SCRAPER_PARSE_SECONDS.count("inline") == parses + 2
+
+
+def test_slow_requests_dump_collapsed_stacks(tmp_path):
+    """A küszöbnél lassabb kérés veremmintái összevont formátumban fájlba kerülnek, a gyorsaké nem."""
+    profiler = metrics.SlowRequestProfiler(threshold_ms=50, interval_ms=1, directory=str(tmp_path))
+    app = instrumented_app(profiler=profiler)
+
+    def burn_cpu(seconds):
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            pass
+
+    @app.get("/work/{ms}")
+    async def work(ms: int):
+        burn_cpu(ms / 1000)
+        return {}
+
+    client = TestClient(app)
+    client.get("/work/1")
+    client.get("/work/150")
+
+    dumps = list(tmp_path.glob("*.folded"))
+    assert len(dumps) == 1
+    assert "_GET_work_ms_" in dumps[0].name
+    stack, count = dumps[0].read_text().splitlines()[0].rsplit(" ", 1)
+    assert "burn_cpu" in stack and int(count) > 0
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from app import crud, sampling
+
+# Lapozás, x-tartomány szűrés és szerveroldali ritkítás a GET /measurements/{id} végponton.
+
+WINDOW_POINTS = [{"x": float(i % 10), "y": float(i)} for i in range(25)]
+
+
+@pytest.mark.parametrize("storage", [crud.STORAGE_ROWS, crud.STORAGE_BLOB])
+def test_cursor_pagination_walks_all_points(api, create_measurement, storage):
+    """A kurzoros lapozás sorrendben, átfedés nélkül adja vissza az összes pontot."""
+    measurement_id = create_measurement(WINDOW_POINTS, storage)
+
+    collected, cursor = [], None
+    while True:
+        params = {"limit": 10} if cursor is None else {"limit": 10, "cursor": cursor}
+        body = api.get(f"/measurements/{measurement_id}", params=params).json()
+        collected += body["points"]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert collected == WINDOW_POINTS
+
+
+@pytest.mark.parametrize("storage", [crud.STORAGE_ROWS, crud.STORAGE_BLOB])
+def test_x_range_and_offset(api, create_measurement, storage):
+    """Az x-tartomány szűrés és az offset/limit mindkét tárolási módban azonos."""
+    measurement_id = create_measurement(WINDOW_POINTS, storage)
+
+    body = api.get(
+        f"/measurements/{measurement_id}",
+        params={"x_min": 2, "x_max": 3, "offset": 1, "limit": 3}
+    ).json()
+
+    expected = [p for p in WINDOW_POINTS if 2 <= p["x"] <= 3][1:4]
+    assert body["points"] == expected
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_max_points_downsamples(api, create_measurement, method):
+    """A max_points paraméter legfeljebb ennyi pontra ritkít, a bináris formátumban is."""
+    measurement_id = create_measurement(WINDOW_POINTS, crud.STORAGE_ROWS)
+
+    body = api.get(f"/measurements/{measurement_id}", params={"max_points": 6, "downsample": method}).json()
+    assert 3 <= len(body["points"]) <= 6
+    assert all(p in WINDOW_POINTS for p in body["points"])
+
+    response = api.get(f"/measurements/{measurement_id}", params={"max_points": 6, "downsample": method, "format": "binary"})
+    assert np.frombuffer(response.content, dtype="<f8").reshape(-1, 2).tolist() == [[p["x"], p["y"]] for p in body["points"]]
+
+
+@pytest.mark.parametrize("params", [
+    {"offset": -1}, {"limit": 0}, {"cursor": -1}, {"x_min": 5, "x_max": 1},
+    {"max_points": 2}, {"downsample": "random"},
+])
+def test_invalid_window(api, params):
+    """Érvénytelen lapozási és ritkítási paraméterek (400)."""
+    assert api.get("/measurements/1", params=params).status_code == 400
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    """Az LTTB megtartja az első, az utolsó és a kiugró pontokat."""
+    x = np.arange(100, dtype=float)
+    y = np.zeros(100)
+    y[40], y[70] = 50.0, -50.0
+
+    selected = sampling.lttb(x, y, 10)
+
+    assert len(selected) == 10
+    assert selected[0] == 0 and selected[-1] == 99
+    assert {40, 70} <= set(selected.tolist())
+    assert np.all(np.diff(selected) > 0)
+
+
+def test_minmax_keeps_bucket_extremes():
+    """A min/max ritkítás vödrönként megtartja a szélsőértékeket."""
+    y = np.array([3.0, 1.0, 2.0, 9.0, 4.0, 5.0, 0.0, 8.0, 7.0, 6.0, 2.0])
+
+    selected = sampling.minmax(np.arange(len(y), dtype=float), y, 4)
+
+    assert {1, 3, 6, 7} <= set(selected.tolist())
+    assert len(selected) <= 4
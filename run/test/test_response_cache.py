@@ -0,0 +1,122 @@
+import asyncio
+from unittest.mock import patch
+
+from sqlalchemy import text
+
+from app import analytics, crud
+from app.response_cache import ResponseCache, etag_matches, response_cache
+
+# A GET /measurements/{id} read-through gyorsítótárának tesztjei: ETag/304,
+# bájtméret szerinti kiszorítás és törléskori érvénytelenítés.
+
+POINTS = [{"x": 1.0, "y": 2.0}, {"x": 3.0, "y": 4.0}]
+
+
+def test_second_read_is_served_from_cache(api, create_measurement):
+    """A második azonos kérés nem fut adatbázisra, és ugyanazt a törzset és ETag-et adja."""
+    measurement_id = create_measurement(POINTS)
+
+    with patch("run.backend.crud.get_measurement", wraps=crud.get_measurement) as get_measurement:
+        first = api.get(f"/measurements/{measurement_id}")
+        second = api.get(f"/measurements/{measurement_id}")
+        api.get(f"/measurements/{measurement_id}?limit=1")
+
+    assert first.json() == second.json() == {"id": measurement_id, "user_id": 1, "points": POINTS}
+    assert first.headers["etag"] == second.headers["etag"]
+    assert get_measurement.await_count == 2
+    assert response_cache.snapshot()["hits"] == 1
+
+
+def test_if_none_match_returns_304(api, create_measurement):
+    """Egyező If-None-Match-re 304 és üres törzs, eltérőre a teljes válasz."""
+    measurement_id = create_measurement(POINTS)
+    etag = api.get(f"/measurements/{measurement_id}").headers["etag"]
+
+    not_modified = api.get(f"/measurements/{measurement_id}", headers={"If-None-Match": f'W/{etag}, "x"'})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+    assert api.get(f"/measurements/{measurement_id}", headers={"If-None-Match": '"x"'}).status_code == 200
+    assert etag_matches("*", etag)
+    assert response_cache.snapshot()["not_modified"] == 1
+
+
+def test_streamed_response_is_cached_after_completion(api, create_measurement):
+    """A folyamként küldött NDJSON a végigfutás után bekerül, a második kérés már ETag-gel jön."""
+    measurement_id = create_measurement(POINTS)
+
+    first = api.get(f"/measurements/{measurement_id}?format=ndjson")
+    second = api.get(f"/measurements/{measurement_id}?format=ndjson")
+
+    assert "etag" not in first.headers
+    assert first.content == second.content
+    assert second.headers["content-type"].startswith("application/x-ndjson")
+    assert second.headers["x-measurement-id"] == str(measurement_id)
+    assert api.get(f"/measurements/{measurement_id}?format=ndjson",
+                   headers={"If-None-Match": second.headers["etag"]}).status_code == 304
+
+
+def test_eviction_is_bounded_by_bytes():
+    """A bejegyzések összmérete nem lépi túl a korlátot; a túl nagy válasz be sem kerül."""
+    cache = ResponseCache(max_bytes=3000, max_entry_bytes=1000)
+    for key in range(5):
+        cache.put((key,), b"x" * 900, "application/json")
+    cache.put((99,), b"x" * 1001, "application/json")
+
+    assert cache.snapshot()["bytes"] <= 3000
+    assert cache.get((0,)) is None
+    assert cache.get((4,)) is not None
+    assert cache.get((99,)) is None
+    assert ResponseCache(max_bytes=0).put((1,), b"{}", "application/json").etag
+
+
+def test_delete_invalidates_cached_responses(api, create_measurement):
+    """A mérés és a felhasználó (kaszkádos) törlése a gyorsítótárból is törli a válaszokat."""
+    user_id = api.post("/users/", json={"name": "Cache"}).json()["id"]
+    first, second, other = create_measurement(POINTS, user_id=user_id), create_measurement(POINTS, user_id=user_id), create_measurement(POINTS)
+    for measurement_id in (first, second, other):
+        api.get(f"/measurements/{measurement_id}")
+    api.get(f"/measurements/{first}/stats")
+
+    assert api.delete(f"/measurements/{first}").json() == {"id": first, "deleted": True}
+    assert api.get(f"/measurements/{first}").status_code == 404
+    assert analytics.cached(first, "stats") is None
+    assert api.delete(f"/measurements/{first}").status_code == 404
+
+    assert api.delete(f"/users/{user_id}").status_code == 200
+    assert api.get(f"/measurements/{second}").status_code == 404
+    assert api.get(f"/measurements/{other}").status_code == 200
+    assert api.delete(f"/users/{user_id}").status_code == 404
+    assert response_cache.snapshot()["invalidations"] == 2
+
+
+def test_ids_of_deleted_measurements_are_not_reused(api, create_measurement, db_session):
+    """Más folyamatban (itt SQL-lel) törölt mérés azonosítóját az új mérés nem kapja meg, így a régi válaszát sem."""
+    old = create_measurement(POINTS)
+    api.get(f"/measurements/{old}")
+    db_session.execute(text("DELETE FROM measurements WHERE id = :id"), {"id": old})
+    db_session.commit()
+
+    new = create_measurement([[5.0, 6.0]])
+
+    assert new != old
+    assert api.get(f"/measurements/{new}").json()["points"] == [{"x": 5.0, "y": 6.0}]
+
+
+def test_stream_is_not_stored_after_concurrent_invalidation():
+    """Ha a folyam közben a mérés törlődött, a végigfutott (elavult) törzs nem kerül be."""
+    cache = ResponseCache()
+
+    async def chunks():
+        yield b"1"
+        cache.invalidate(1)
+        yield b"2"
+
+    async def consume(key):
+        return b"".join([chunk async for chunk in cache.tee(key, chunks(), "text/plain", generation=cache.generation)])
+
+    assert asyncio.run(consume((1, "text/plain"))) == b"12"
+    assert cache.get((1, "text/plain")) is None
+    entry = cache.put((1, "application/json"), b"{}", "application/json", generation=cache.generation - 1)
+    assert cache.encoded((1, "application/json"), entry, "gzip", lambda body, encoding: body) is not None
+    assert cache.snapshot()["entries"] == 0
@@ -0,0 +1,103 @@
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.scrape_cache import ScrapeCache
+from app.soup import BookScraper, page_url
+from run.backend import app
+from run.test.conftest import FIXTURES_DIR
+from run.test.test_soup import fixture_books
+
+# A scrape gyorsítótár tesztjei: TTL, feltételes újraellenőrzés, LRU és lemezes tár.
+
+
+def scrape(base_url, max_pages, cache, **kwargs):
+    async def run():
+        async with BookScraper(base_url=base_url, rate_limit=0, backoff=0, cache=cache, **kwargs) as scraper:
+            return await scraper.scrape(max_pages)
+    return asyncio.run(run())
+
+
+def test_fresh_entries_are_served_without_requests(books_server):
+    """A TTL-en belül a második futás nem fordul a forráshoz."""
+    cache = ScrapeCache(ttl=60, maxsize=10)
+
+    first = scrape(books_server.url, 3, cache)
+    requests_after_first = len(books_server.requests)
+    second = scrape(books_server.url, 3, cache)
+
+    assert first == second == fixture_books(1, 2, 3, base_url=books_server.url)
+    assert len(books_server.requests) == requests_after_first == 3
+    assert cache.stats == {"hits": 3, "misses": 3, "revalidations": 0, "refreshes": 0}
+
+
+def test_stale_entries_are_revalidated_with_last_modified(books_server):
+    """Lejárt bejegyzésnél If-Modified-Since megy ki, a 304 a tárolt könyveket adja."""
+    cache = ScrapeCache(ttl=0, maxsize=10)
+
+    scrape(books_server.url, 2, cache)
+    books = scrape(books_server.url, 2, cache)
+
+    assert books == fixture_books(1, 2, base_url=books_server.url)
+    assert len(books_server.requests) == 4
+    assert cache.stats["revalidations"] == 2
+    assert cache.stats["misses"] == 2
+
+
+def test_etag_is_sent_and_changed_pages_are_refreshed():
+    """Az ETag If-None-Match fejlécként megy vissza; új ETag esetén frissül a bejegyzés."""
+    html = (FIXTURES_DIR / "catalogue" / "page-1.html").read_text(encoding="utf-8")
+    versions = iter(['"v1"', '"v1"', '"v2"'])
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("if-none-match"))
+        etag = next(versions)
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, headers={"ETag": etag}, text=html)
+
+    cache = ScrapeCache(ttl=0, maxsize=10)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            for _ in range(3):
+                await BookScraper(base_url="http://books.test", rate_limit=0, client=client, cache=cache).scrape(1)
+
+    asyncio.run(run())
+
+    assert seen == [None, '"v1"', '"v1"']
+    assert cache.get(page_url("http://books.test", 1))["etag"] == '"v2"'
+    assert cache.stats == {"hits": 0, "misses": 1, "revalidations": 1, "refreshes": 1}
+
+
+def test_stale_entry_is_used_when_source_fails(books_server):
+    """Ha a forrás nem elérhető, a lejárt bejegyzés kerül vissza üres lista helyett."""
+    cache = ScrapeCache(ttl=0, maxsize=10)
+    scrape(books_server.url, 1, cache)
+    books_server.failures["/catalogue/page-1.html"] = 5
+
+    assert scrape(books_server.url, 1, cache, retries=2) == fixture_books(1, base_url=books_server.url)
+
+
+def test_memory_is_bounded_and_disk_store_survives(books_server, tmp_path):
+    """Az LRU legfeljebb maxsize oldalt tart; a lemezes tár új példányból is olvasható."""
+    cache = ScrapeCache(ttl=60, maxsize=2, directory=tmp_path)
+    scrape(books_server.url, 3, cache)
+
+    assert cache.snapshot()["size"] == 2
+    assert len(list(tmp_path.glob("*.json"))) == 3
+
+    restarted = ScrapeCache(ttl=60, maxsize=2, directory=tmp_path)
+    assert scrape(books_server.url, 3, restarted) == fixture_books(1, 2, 3, base_url=books_server.url)
+    assert len(books_server.requests) == 3
+    assert restarted.stats["hits"] == 3
+
+
+def test_cache_stats_endpoint():
+    """A /scrape_books/cache végpont a számlálókat és a méretet adja vissza."""
+    response = TestClient(app).get("/scrape_books/cache")
+
+    assert response.status_code == 200
+    assert {"hits", "misses", "revalidations", "refreshes", "size", "maxsize", "ttl"} <= response.json().keys()
@@ -0,0 +1,192 @@
+import asyncio
+import time
+
+import pytest
+
+from app import soup
+from app.soup import PARSERS, BookScraper, HostRateLimiter, get_parser, iter_books_toscrape, iter_scraped_pages, page_url, parse_books
+from run.test.conftest import FIXTURES_DIR
+
+# Az aszinkron könyv-scraper tesztjei a helyi fixture szerver ellen.
+
+
+def fixture_books(*pages, base_url=None):
+    # base_url esetén a termék URL-ek úgy oldódnak fel, mintha onnan töltöttük volna le.
+    return [
+        book
+        for page in pages
+        for book in parse_books(
+            (FIXTURES_DIR / "catalogue" / f"page-{page}.html").read_text(encoding="utf-8"),
+            base_url=page_url(base_url, page) if base_url else None,
+        )
+    ]
+
+
+def scrape(base_url, max_pages, **kwargs):
+    async def run():
+        async with BookScraper(base_url=base_url, rate_limit=0, backoff=0, **kwargs) as scraper:
+            return await scraper.scrape(max_pages)
+    return asyncio.run(run())
+
+
+def test_parse_books_fixture():
+    """A mentett oldal 20 könyvet ad a várt mezőkkel."""
+    books = fixture_books(1)
+
+    assert len(books) == 20
+    assert books[0] == {
+        "url": "a-light-in-the-attic_1000/index.html",
+        "title": "A Light in the Attic", "price": 51.77, "stock": "In stock", "rating": "Three",
+    }
+    assert fixture_books(1, base_url="http://books.test")[0]["url"] == \
+        "http://books.test/catalogue/a-light-in-the-attic_1000/index.html"
+
+
+EDGE_CASE_HTML = """
+<html><body><ol>
+<li><article class="product_pod extra">
+  <h3><a href="x.html" title="Fish &amp; Chips: A &quot;Guide&quot;">Fish &amp; Chips...</a></h3>
+  <div class="product_price">
+    <p class="price_color">N/A</p>
+    <p class="instock availability">
+      <i class="icon-ok"></i>
+      In stock (3 available)
+    </p>
+  </div>
+  <p class="star-rating One"></p>
+</article></li>
+<li><article class="product_pod">
+  <p class="star-rating Five"></p>
+  <h3><a title="Árvíztűrő tükörfúrógép">Árvíztűrő...</a></h3>
+  <p class="price_color">£1234.5</p>
+  <p class="instock availability">Out of stock</p>
+</article></li>
+</ol></body></html>
+"""
+
+
+@pytest.mark.parametrize("parser", [name for name in PARSERS if name != "html.parser"])
+def test_parsers_match_html_parser(parser):
+    """Minden feldolgozó mezőről mezőre ugyanazt adja, mint az eredeti html.parser."""
+    pages = [(FIXTURES_DIR / "catalogue" / f"page-{page}.html").read_text(encoding="utf-8") for page in (1, 2, 3)]
+
+    for html in pages + [EDGE_CASE_HTML]:
+        assert parse_books(html, parser) == parse_books(html, "html.parser")
+
+
+def test_unknown_parser_is_rejected():
+    """Ismeretlen feldolgozó nevére ValueError jön."""
+    with pytest.raises(ValueError):
+        get_parser("html5lib")
+
+
+def test_pages_come_back_in_order(books_server):
+    """A lassabb első oldal ellenére az eredmény oldalsorrendben érkezik."""
+    books_server.delays["/catalogue/page-1.html"] = 0.3
+
+    assert scrape(books_server.url, 3, concurrency=3) == fixture_books(1, 2, 3, base_url=books_server.url)
+    assert books_server.max_active > 1
+
+
+def test_missing_pages_are_skipped_without_retry(books_server):
+    """A nem létező oldalak kimaradnak, a 404-et nem próbálja újra."""
+    assert scrape(books_server.url, 5) == fixture_books(1, 2, 3, base_url=books_server.url)
+    assert books_server.requests.count("/catalogue/page-4.html") == 1
+
+
+def test_server_errors_are_retried(books_server):
+    """Az 503-as választ újrapróbálja, amíg a kísérletek száma engedi."""
+    books_server.failures["/catalogue/page-2.html"] = 2
+
+    assert scrape(books_server.url, 2, retries=3) == fixture_books(1, 2, base_url=books_server.url)
+    assert books_server.requests.count("/catalogue/page-2.html") == 3
+
+
+def test_concurrency_is_bounded(books_server):
+    """Egyszerre legfeljebb `concurrency` kérés fut."""
+    for page in range(1, 4):
+        books_server.delays[f"/catalogue/page-{page}.html"] = 0.1
+
+    scrape(books_server.url, 3, concurrency=2)
+
+    assert books_server.max_active <= 2
+
+
+def test_host_rate_limiter_spaces_requests():
+    """Hosztonként a megadott ütemre ritkítja a kéréseket, más hosztot nem fog vissza."""
+    limiter = HostRateLimiter(rate=20)
+
+    async def run():
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.wait("a") for _ in range(5)))
+        spaced = time.monotonic() - start
+        start = time.monotonic()
+        await limiter.wait("b")
+        return spaced, time.monotonic() - start
+
+    spaced, other_host = asyncio.run(run())
+    assert spaced >= 0.19
+    assert other_host < 0.05
+
+
+def scrape_pipeline(base_url, max_pages, parse_workers, **kwargs):
+    async def run():
+        async with BookScraper(base_url=base_url, rate_limit=0, backoff=0, **kwargs) as scraper:
+            return [page async for page in iter_scraped_pages(scraper, max_pages, parse_workers, queue_size=2)]
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("parse_workers", [0, 2])
+def test_pipeline_yields_pages_in_order(books_server, parse_workers):
+    """A csővezeték (folyamatkészlettel is) oldalsorrendben adja az oldalakat."""
+    books_server.delays["/catalogue/page-1.html"] = 0.3
+
+    pages = scrape_pipeline(books_server.url, 4, parse_workers, concurrency=3)
+
+    assert [page for page, _ in pages] == [1, 2, 3, 4]
+    assert [book for _, books in pages for book in books] == fixture_books(1, 2, 3, base_url=books_server.url)
+
+
+def test_pipelines_share_one_spawned_process_pool(books_server):
+    """Az egymás utáni csővezetékek ugyanazt a spawn-nal indított folyamatkészletet használják."""
+    scrape_pipeline(books_server.url, 1, 2)
+    executor = soup.parse_executor()
+    scrape_pipeline(books_server.url, 1, 2)
+
+    assert soup.parse_executor() is executor
+    assert executor._mp_context.get_start_method() == "spawn"
+    soup.shutdown_parse_executor()
+    assert soup.parse_executor() is not executor
+    soup.shutdown_parse_executor()
+
+
+def test_pipeline_window_applies_backpressure(books_server):
+    """Lassú fogyasztó mellett a letöltés legfeljebb az ablaknyi oldallal jár előrébb."""
+    async def run():
+        async with BookScraper(base_url=books_server.url, rate_limit=0, concurrency=1) as scraper:
+            pages = iter_scraped_pages(scraper, 40, parse_workers=0, queue_size=1)
+            await pages.__anext__()
+            await asyncio.sleep(0.3)
+            fetched = len(books_server.requests)
+            await pages.aclose()
+            return fetched
+
+    # ablak = queue_size + concurrency + max(parse_workers, 1) = 3
+    assert asyncio.run(run()) <= 4
+
+
+
+def test_iter_books_yields_each_page_as_it_completes(books_server):
+    """Az első oldal már megjön, mielőtt a lassú második elkészülne."""
+    books_server.delays["/catalogue/page-2.html"] = 0.5
+
+    async def run():
+        arrivals = []
+        start = time.monotonic()
+        async for page, books in iter_books_toscrape(max_pages=2, base_url=books_server.url, cache=None):
+            arrivals.append((page, len(books), time.monotonic() - start))
+        return arrivals
+
+    (first, first_count, first_at), (second, second_count, second_at) = asyncio.run(run())
+    assert (first, first_count, second, second_count) == (1, 20, 2, 20)
+    assert first_at < 0.4 < second_at
@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+from sqlalchemy import text, update
+
+from app import crud, spatial
+from app.models import Measurement
+
+# A térbeli lekérdezések tesztjei: a KD-fa és a rács-index a nyers (brute force)
+# kereséssel összevetve, és a /points/within, /points/nearest végpontok mindkét tárolási módban.
+
+
+def test_kdtree_matches_brute_force():
+    """A téglalap-, kör- és kNN-lekérdezés ugyanazt adja, mint a teljes keresés, ismétlődő pontokkal is."""
+    rng = np.random.default_rng(0)
+    xy = rng.uniform(-10, 10, size=(2000, 2))
+    xy[:300] = xy[0]
+    tree = spatial.KDTree(xy, leaf_size=8)
+
+    for _ in range(50):
+        (x_min, x_max), (y_min, y_max) = np.sort(rng.uniform(-12, 12, size=(2, 2)))
+        index, points = tree.within_box(x_min, x_max, y_min, y_max)
+        expected = np.flatnonzero((xy[:, 0] >= x_min) & (xy[:, 0] <= x_max) & (xy[:, 1] >= y_min) & (xy[:, 1] <= y_max))
+        np.testing.assert_array_equal(index, expected)
+        np.testing.assert_array_equal(points, xy[expected])
+
+        x, y, radius = *rng.uniform(-12, 12, size=2), rng.uniform(0, 8)
+        distance = np.hypot(xy[:, 0] - x, xy[:, 1] - y)
+        index, _ = tree.within_radius(x, y, radius)
+        np.testing.assert_array_equal(index, np.flatnonzero(distance <= radius))
+
+        k = int(rng.integers(1, 400))
+        index, points, found = tree.nearest(x, y, k)
+        expected = np.lexsort((np.arange(len(xy)), distance))[:k]
+        np.testing.assert_allclose(found, distance[expected])
+        np.testing.assert_array_equal(points, xy[index])
+
+
+def test_kdtree_handles_empty_and_small_inputs():
+    """Üres fa üres eredményt ad, a pontszámnál nagyobb k az összes pontot."""
+    empty = spatial.KDTree(np.empty((0, 2)))
+    assert len(empty.within_box(-1, 1, -1, 1)[0]) == 0
+    assert len(empty.nearest(0, 0, 3)[0]) == 0
+
+    index, _, distance = spatial.KDTree([[0.0, 0.0], [3.0, 4.0]]).nearest(0, 0, 10)
+    assert index.tolist() == [0, 1] and distance.tolist() == [0.0, 5.0]
+
+
+def test_point_grid_ranges_cover_box():
+    """A téglalap cellatartományai a belső pontok minden celláját lefedik, a rácson kívüli téglalap üres."""
+    rng = np.random.default_rng(4)
+    xy = rng.uniform(-10, 10, size=(2000, 2))
+    grid = spatial.PointGrid.for_points(spatial.extend_bounds(xy), size=8)
+    cells = grid.cells(xy)
+
+    for _ in range(50):
+        (x_min, x_max), (y_min, y_max) = np.sort(rng.uniform(-12, 12, size=(2, 2)))
+        inside = (xy[:, 0] >= x_min) & (xy[:, 0] <= x_max) & (xy[:, 1] >= y_min) & (xy[:, 1] <= y_max)
+        covered = np.zeros(len(xy), dtype=bool)
+        for lo, hi in grid.ranges(x_min, x_max, y_min, y_max):
+            covered |= (cells >= lo) & (cells <= hi)
+        assert not (inside & ~covered).any()
+
+    assert grid.ranges(11, 12, -1, 1) == []
+    assert spatial.PointGrid.for_points(None) is None
+
+
+def test_within_filters_rows_by_grid_cell(api, create_measurement, db_session):
+    """A széles, alacsony téglalapot a cella-index szűri; rács nélküli mérésnél az x-index, azonos eredménnyel."""
+    xy = np.random.default_rng(5).uniform(-100, 100, size=(5000, 2))
+    grid_id = create_measurement(xy, crud.STORAGE_ROWS)
+    legacy_id = create_measurement(xy, crud.STORAGE_ROWS)
+    db_session.execute(update(Measurement).where(Measurement.id == legacy_id).values(grid_size=None))
+    db_session.commit()
+    box = (-100, 100, 10, 12)
+    expected = xy[(xy[:, 1] >= 10) & (xy[:, 1] <= 12)]
+
+    grid = spatial.PointGrid.of(db_session.get(Measurement, grid_id))
+    for ranges in (grid.ranges(*box), grid.ranges(10, 12, -100, 100)):
+        stmt = crud.cell_ranges_stmt(grid_id, ranges)
+        sql = str(stmt.compile(db_session.get_bind(), compile_kwargs={"literal_binds": True}))
+        plan = " ".join(row[3] for row in db_session.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+        assert "ix_measurement_points_measurement_id_cell" in plan and "_id_x" not in plan
+
+    for measurement_id in (grid_id, legacy_id):
+        body = api.get(f"/measurements/{measurement_id}/points/within?x_min=-100&x_max=100&y_min=10&y_max=12").json()
+        assert body["x"] == expected[:, 0].tolist() and body["y"] == expected[:, 1].tolist()
+
+
+@pytest.mark.parametrize("storage", [crud.STORAGE_ROWS, crud.STORAGE_BLOB])
+def test_within_returns_points_in_storage_order(api, create_measurement, storage):
+    """A téglalap és a kör a tartományba eső pontokat adja tárolási sorrendben, fával és fa nélkül is."""
+    xy = np.random.default_rng(1).uniform(-100, 100, size=(1000, 2))
+    measurement_id = create_measurement(xy, storage)
+    box = xy[(xy[:, 0] >= -10) & (xy[:, 0] <= 30) & (xy[:, 1] >= 0) & (xy[:, 1] <= 50)]
+    circle = xy[np.hypot(xy[:, 0] - 5, xy[:, 1] + 5) <= 25]
+
+    for _ in range(2):
+        body = api.get(f"/measurements/{measurement_id}/points/within?x_min=-10&x_max=30&y_min=0&y_max=50").json()
+        assert body["count"] == len(box)
+        assert body["x"] == box[:, 0].tolist() and body["y"] == box[:, 1].tolist()
+
+        body = api.get(f"/measurements/{measurement_id}/points/within?x=5&y=-5&radius=25").json()
+        assert body["x"] == circle[:, 0].tolist() and body["y"] == circle[:, 1].tolist()
+        # A második körben a (kNN által felépített) fa szolgálja ki.
+        api.get(f"/measurements/{measurement_id}/points/nearest?x=0&y=0")
+
+
+@pytest.mark.parametrize("storage", [crud.STORAGE_ROWS, crud.STORAGE_BLOB])
+def test_nearest_returns_k_closest_points(api, create_measurement, storage):
+    """A nearest a k legközelebbi pontot adja távolság szerint, az indexük a mérésbeli helyük."""
+    xy = np.random.default_rng(2).uniform(-100, 100, size=(1000, 2))
+    measurement_id = create_measurement(xy, storage)
+    distance = np.hypot(xy[:, 0] - 12.5, xy[:, 1] + 3)
+    expected = np.argsort(distance)[:5]
+
+    body = api.get(f"/measurements/{measurement_id}/points/nearest?x=12.5&y=-3&k=5").json()
+
+    assert body["index"] == expected.tolist()
+    assert body["x"] == xy[expected, 0].tolist()
+    assert body["distance"] == pytest.approx(distance[expected].tolist())
+    assert spatial.snapshot()["trees"] == 1
+
+
+def test_spatial_queries_validate_parameters_and_track_deletes(api, create_measurement):
+    """Hibás paraméterre 400, ismeretlen mérésre 404; törlés után a fa is kiürül."""
+    measurement_id = create_measurement([[0.0, 0.0], [1.0, 1.0]], crud.STORAGE_ROWS)
+    url = f"/measurements/{measurement_id}/points"
+
+    assert api.get(f"{url}/within?x_min=1&x_max=0&y_min=0&y_max=1").status_code == 400
+    assert api.get(f"{url}/within?x_min=0&x_max=1").status_code == 400
+    assert api.get(f"{url}/within?x=0&y=0&radius=-1").status_code == 400
+    assert api.get(f"{url}/nearest?x=0&y=0&k=0").status_code == 400
+    assert api.get("/measurements/999/points/nearest?x=0&y=0").status_code == 404
+
+    assert api.get(f"{url}/nearest?x=0&y=0").json()["index"] == [0]
+    api.delete(f"/measurements/{measurement_id}")
+
+    assert spatial.cached_tree(measurement_id) is None
+    assert api.get(f"{url}/nearest?x=0&y=0").status_code == 404
@@ -0,0 +1,81 @@
+from sqlalchemy import create_engine, inspect, text
+
+from app import crud, migrations
+
+# Valódi (ideiglenes) SQLite adatbázison futó tesztek a két tárolási módhoz.
+
+TEST_POINTS = [{"x": 1.5, "y": -2.25}, {"x": 3.0, "y": 4.125}, {"x": 1e-300, "y": 1e300}]
+
+
+def test_get_measurement_identical_in_both_modes(api, create_measurement):
+    """A sor- és blob-tárolású mérés lekérdezése azonos választ ad."""
+    rows_id = create_measurement(TEST_POINTS, crud.STORAGE_ROWS)
+    blob_id = create_measurement(TEST_POINTS, crud.STORAGE_BLOB)
+
+    rows_body = api.get(f"/measurements/{rows_id}").json()
+    blob_body = api.get(f"/measurements/{blob_id}").json()
+
+    assert rows_body["points"] == TEST_POINTS
+    assert blob_body["points"] == rows_body["points"]
+
+
+def test_migration_roundtrip_keeps_points(api, db_session, create_measurement):
+    """A sorok blobbá alakítása és vissza nem változtat a pontokon."""
+    measurement_id = create_measurement(TEST_POINTS, crud.STORAGE_ROWS)
+
+    assert migrations.convert_to_blob(db_session) == 1
+    assert db_session.execute(text("SELECT COUNT(*) FROM measurement_points")).scalar() == 0
+    assert api.get(f"/measurements/{measurement_id}").json()["points"] == TEST_POINTS
+
+    assert migrations.convert_to_rows(db_session) == 1
+    assert db_session.execute(text("SELECT COUNT(*) FROM measurement_points")).scalar() == len(TEST_POINTS)
+    assert db_session.execute(text("SELECT COUNT(*) FROM measurement_points WHERE cell IS NULL")).scalar() == 0
+    assert api.get(f"/measurements/{measurement_id}").json()["points"] == TEST_POINTS
+
+
+def test_ensure_columns_upgrades_legacy_table(tmp_path):
+    """Régi sémájú measurements táblához felkerülnek a tárolási és a rács-oszlopok."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE measurements (id INTEGER PRIMARY KEY, timestamp DATETIME, user_id INTEGER)"))
+        conn.execute(text("INSERT INTO measurements (id, user_id) VALUES (1, 1)"))
+
+    migrations.ensure_columns(engine)
+
+    columns = {c["name"] for c in inspect(engine).get_columns("measurements")}
+    assert {"storage", "points_blob", "grid_size"} <= columns
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT storage FROM measurements")).scalar() == crud.STORAGE_ROWS
+    engine.dispose()
+
+
+def test_ensure_autoincrement_rebuilds_measurements_table(tmp_path):
+    """A régi measurements tábla AUTOINCREMENT-tel épül újra, a sorok és az indexek megmaradnak."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE measurements (id INTEGER PRIMARY KEY, timestamp DATETIME NOT NULL, user_id INTEGER)"))
+        conn.execute(text("INSERT INTO measurements (id, timestamp, user_id) VALUES (1, '2024-01-01', 1), (5, '2024-01-02', 1)"))
+
+    migrations.upgrade_schema(engine)
+    migrations.upgrade_schema(engine)
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM measurements WHERE id = 5"))
+        conn.execute(text("INSERT INTO measurements (timestamp, user_id) VALUES ('2024-01-03', 1)"))
+        assert conn.execute(text("SELECT id FROM measurements ORDER BY id")).scalars().all() == [1, 6]
+    assert "ix_measurements_user_id_timestamp" in {i["name"] for i in inspect(engine).get_indexes("measurements")}
+    engine.dispose()
+
+
+def test_build_grids_indexes_legacy_rows(api, create_measurement, db_session):
+    """A rács nélküli sor-tárolású mérés pontjai cellát kapnak, a téglalap-lekérdezés változatlan."""
+    measurement_id = create_measurement(TEST_POINTS[:2], crud.STORAGE_ROWS)
+    db_session.execute(text("UPDATE measurements SET grid_size = NULL"))
+    db_session.execute(text("UPDATE measurement_points SET cell = NULL"))
+    db_session.commit()
+
+    assert migrations.build_grids(db_session) == 1
+    assert migrations.build_grids(db_session) == 0
+    assert db_session.execute(text("SELECT COUNT(*) FROM measurement_points WHERE cell IS NULL")).scalar() == 0
+    body = api.get(f"/measurements/{measurement_id}/points/within?x_min=0&x_max=2&y_min=-3&y_max=0").json()
+    assert body["x"] == [1.5] and body["y"] == [-2.25]
@@ -0,0 +1,132 @@
+import asyncio
+import io
+
+import numpy as np
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app import crud, uploads
+from app.database import build_async_engine
+from app.models import Measurement, User
+
+# A folyamként feltöltött mérésfájlok tesztjei: CSV/TXT, .npy és nyers bináris,
+# multipart és nyers törzzsel, tetszőleges darabolás mellett.
+
+XY = np.array([[1.0, 2.0], [3.5, -4.25], [1e6, 1e-6], [0.0, 7.0]])
+CSV_TEXT = b"1,2\n3.5, -4.25\n\n# megjegyzes\n1000000,0.000001\n0,7"
+
+
+def npy_bytes(xy):
+    buffer = io.BytesIO()
+    np.save(buffer, xy)
+    return buffer.getvalue()
+
+
+async def pieces(data, size):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(blocks):
+    return np.concatenate([xy async for xy in blocks] or [np.empty((0, 2))])
+
+
+def stored_points(api, measurement_id):
+    return np.frombuffer(api.get(f"/measurements/{measurement_id}?format=binary").content, dtype="<f8").reshape(-1, 2)
+
+
+@pytest.fixture
+def user_id(api):
+    return api.post("/users/", json={"name": "Upload"}).json()["id"]
+
+
+@pytest.mark.parametrize("size", [1, 7, 1024])
+def test_parsers_are_independent_of_chunking(size):
+    """A feldolgozók eredménye független a hálózati darabok és blokkok méretétől."""
+    for parse, data in [(uploads.parse_csv, CSV_TEXT), (uploads.parse_npy, npy_bytes(XY)),
+                        (uploads.parse_binary, XY.astype("<f8").tobytes())]:
+        assert np.array_equal(asyncio.run(collect(parse(pieces(data, size), block_bytes=16))), XY)
+
+
+def test_multipart_file_is_extracted_from_any_split():
+    """A multipart törzsből a fájl-rész bájtjai jönnek, akkor is, ha a határoló darabok közé esik."""
+    body = (b"--b0\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\nhello\r\n"
+            b"--b0\r\nContent-Disposition: form-data; name=\"file\"; filename=\"p.npy\"\r\n"
+            b"Content-Type: application/octet-stream\r\n\r\n" + b"data\r\n--b1" + b"\r\n--b0--\r\n")
+
+    async def read(size):
+        filename, content_type, data = await uploads.open_multipart_file(pieces(body, size), "b0")
+        return filename, content_type, b"".join([chunk async for chunk in data])
+
+    for size in (1, 3, len(body)):
+        assert asyncio.run(read(size)) == ("p.npy", "application/octet-stream", b"data\r\n--b1")
+    assert uploads.detect_format("p.npy", "application/octet-stream") == uploads.NPY
+
+
+def test_upload_csv_and_npy_files(api, user_id):
+    """A multipart CSV és .npy fájl pontjai, valamint a nyers bináris törzs változatlanul tárolódnak."""
+    csv = api.post(f"/measurements/upload?user_id={user_id}", files={"file": ("points.txt", CSV_TEXT, "text/plain")})
+    npy = api.post(f"/measurements/upload?user_id={user_id}", files={"file": ("points.npy", npy_bytes(XY))})
+    raw = api.post(f"/measurements/upload?user_id={user_id}", content=XY.astype("<f8").tobytes(),
+                   headers={"Content-Type": "application/octet-stream"})
+
+    for response in (csv, npy, raw):
+        assert response.status_code == 200
+        assert response.json()["count"] == 4
+        assert np.array_equal(stored_points(api, response.json()["id"]), XY)
+
+
+def test_large_upload_is_inserted_in_blocks(api, user_id, monkeypatch):
+    """Nagy fájl több blokkban érkezik és íródik, a pontok sorrendje megmarad."""
+    xy = np.random.default_rng(0).normal(size=(20000, 2))
+    monkeypatch.setattr(uploads, "PARSERS", {**uploads.PARSERS, uploads.CSV: lambda chunks: uploads.parse_csv(chunks, 4096)})
+    text = "\n".join(f"{x!r},{y!r}" for x, y in xy.tolist()).encode()
+
+    response = api.post(f"/measurements/upload?user_id={user_id}&chunk_size=333", content=text,
+                        headers={"Content-Type": "text/csv"})
+
+    assert response.json()["count"] == 20000
+    assert np.array_equal(stored_points(api, response.json()["id"]), xy)
+
+
+def test_invalid_uploads_are_rejected_without_partial_writes(api, user_id, db_session):
+    """Hibás fájlra 400 és nem marad félig írt mérés; ismeretlen felhasználóra 404."""
+    bad_line = api.post(f"/measurements/upload?user_id={user_id}", content=b"1,2\n3;4\n",
+                        headers={"Content-Type": "text/csv"})
+    bad_npy = api.post(f"/measurements/upload?user_id={user_id}", files={"file": ("p.npy", npy_bytes(XY.T[:1]))})
+    truncated = api.post(f"/measurements/upload?user_id={user_id}&format=binary", content=b"\x00" * 17)
+
+    assert [r.status_code for r in (bad_line, bad_npy, truncated)] == [400, 400, 400]
+    assert db_session.scalar(select(func.count()).select_from(Measurement)) == 0
+    assert api.post("/measurements/upload?user_id=999", content=b"1,2").status_code == 404
+    assert api.post(f"/measurements/upload?user_id={user_id}&format=xls", content=b"1,2").status_code == 400
+
+
+def test_stream_holds_no_write_lock_while_reading(db_path, db_session):
+    """A folyam olvasása közben nincs nyitott írási tranzakció: közben más is írhat az adatbázisba."""
+    engine = build_async_engine(f"sqlite:///{db_path}", poolclass=NullPool)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def blocks():
+        for i in range(3):
+            yield XY
+            # Lassú kliens helyett: a következő blokk előtt egy másik író fut le.
+            async with session_factory() as other:
+                other.add(User(name=f"Közben {i}"))
+                await other.commit()
+
+    async def upload():
+        async with session_factory() as session:
+            session.add(User(name="Upload"))
+            await session.commit()
+            measurement, count = await crud.add_measurement_stream(session, 1, blocks(), chunk_size=3)
+        await engine.dispose()
+        return measurement.id, count
+
+    measurement_id, count = asyncio.run(upload())
+
+    assert count == 12
+    assert db_session.scalar(select(func.count()).select_from(User)) == 4
+    assert np.array_equal(crud.read_point_rows(db_session, measurement_id), np.concatenate([XY] * 3))